@@ -0,0 +1,68 @@
+"""
+Offline accuracy and latency of the local casual/product pre-classifier on
+a labeled set that is disjoint from config/casual_examples.yaml.
+
+    python benchmarks/bench_casual_classifier.py [--data benchmarks/data/casual_labeled.jsonl]
+
+LLM calls are counted against the all-LLM path: one classification call per
+message plus one reply call per casual message.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from casual import build_classifier  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=os.path.join("benchmarks", "data", "casual_labeled.jsonl"))
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+
+    start = time.perf_counter()
+    classifier = build_classifier()
+    train_ms = (time.perf_counter() - start) * 1000
+
+    decided = correct = ambiguous = 0
+    baseline_calls = local_calls = 0
+    errors = []
+    start = time.perf_counter()
+    for example in examples:
+        label = example["label"]
+        decision = classifier.classify(example["text"])
+        baseline_calls += 2 if label == "casual" else 1
+        if decision is None:
+            ambiguous += 1
+            # The LLM classifies it; assume it gets it right
+            local_calls += 1
+            decision = label
+        else:
+            decided += 1
+            if decision == label:
+                correct += 1
+            else:
+                errors.append((example["text"], label, decision))
+        if decision == "casual":
+            local_calls += 0 if classifier.template_reply(example["text"]) else 1
+    per_message_us = (time.perf_counter() - start) / len(examples) * 1e6
+
+    print(f"Messages:          {len(examples)}")
+    print(f"Training:          {train_ms:.1f} ms")
+    print(f"Decided locally:   {decided} ({decided / len(examples):.0%}), ambiguous -> LLM: {ambiguous}")
+    print(f"Local accuracy:    {correct}/{decided} ({correct / decided if decided else 0:.1%})")
+    print(f"Latency:           {per_message_us:.0f} us/message")
+    print(f"LLM calls:         {local_calls} vs {baseline_calls} all-LLM "
+          f"({1 - local_calls / baseline_calls:.0%} avoided)")
+    if args.show_errors:
+        for text, label, decision in errors:
+            print(f"  {label:>7} -> {decision:<7} {text}")
+
+if __name__ == "__main__":
+    main()
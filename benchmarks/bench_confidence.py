@@ -0,0 +1,126 @@
+"""
+How often the local confidence scorer settles an answer without the LLM
+grader, and how well it agrees with that grader where it does.
+
+Agreement needs real grades, recorded once with the configured answer and
+grade models (needs OPENAI_API_KEY and network):
+    python benchmarks/bench_confidence.py --record /tmp/grades.jsonl
+
+Then compare offline, as often as the scorer or its band is tuned:
+    python benchmarks/bench_confidence.py --grades /tmp/grades.jsonl [--sweep]
+
+Without --grades the answers are simulated as the first sentence of the
+context (as in bench_context_packing.py) and only the share of grader calls
+saved is reported; no grades are made up.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+
+import crew  # noqa: E402
+from confidence import GRADE_BAND_HIGH, GRADE_BAND_LOW, ConfidenceScorer, parse_confidence  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "replay_questions.jsonl")
+
+def questions():
+    with open(CORPUS, encoding="utf-8") as f:
+        seen = []
+        for line in f:
+            content = json.loads(line)["content"]
+            if content not in seen:
+                seen.append(content)
+    return seen
+
+def product_cases():
+    """(query, relevant_info) of every corpus question the pipeline would answer from context"""
+    cases = []
+    for query in questions():
+        relevant_info, _ = crew.retrieve_context(query)
+        if relevant_info and not crew._local_casual_decision(query):
+            cases.append((query, relevant_info))
+    return cases
+
+def record(path):
+    with open(path, "w", encoding="utf-8") as f:
+        for query, relevant_info in product_cases():
+            answer = crew._invoke("answer", crew._answer_prompt(query, relevant_info)).strip()
+            reply = crew._invoke("grade", crew._confidence_prompt(query, answer, relevant_info)).strip()
+            f.write(json.dumps({
+                "query": query,
+                "answer": answer,
+                "relevant_info": relevant_info,
+                "grader_reply": reply,
+                "grader_model": crew.models.settings("grade").model,
+            }, ensure_ascii=False) + "\n")
+            print(f"{parse_confidence(reply)!s:>5}  {query}")
+    print(f"Recorded to {path}")
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["query"], row["answer"], [tuple(info) for info in row["relevant_info"]],
+             parse_confidence(row["grader_reply"])) for row in rows]
+
+def simulated():
+    cases = []
+    for query, relevant_info in product_cases():
+        context = "\n".join(info[0] for info in relevant_info)
+        cases.append((query, re.split(r"(?<=[.!?])\s", context, maxsplit=1)[0], relevant_info, None))
+    return cases
+
+def bucket(confidence: float) -> str:
+    """The reply branch of crew._resolve_confidence"""
+    return "high" if confidence >= 0.8 else "medium" if confidence >= 0.5 else "low"
+
+def evaluate(cases, scorer):
+    settled = [(scorer.score(query, answer, info), grade) for query, answer, info, grade in cases]
+    local = [(score, grade) for score, grade in settled if not score.uncertain]
+    graded = [(score, grade) for score, grade in local if grade is not None]
+    return {
+        "cases": len(cases),
+        "saved": len(local) / len(cases) if cases else 0.0,
+        "graded": len(graded),
+        "agree": sum(bucket(score.confidence) == bucket(grade) for score, grade in graded),
+        "agree_escalation": sum((score.confidence >= 0.5) == (grade >= 0.5) for score, grade in graded),
+        # Posted with confidence by the scorer, escalated by the grader: the costly disagreement
+        "overconfident": sum(score.confidence >= 0.8 and grade < 0.5 for score, grade in graded),
+        "unparsed": sum(1 for *_, grade in cases if grade is None),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", help="answer and grade the corpus with the configured models into this JSONL")
+    parser.add_argument("--grades", help="JSONL written by --record")
+    parser.add_argument("--low", type=float, default=GRADE_BAND_LOW)
+    parser.add_argument("--high", type=float, default=GRADE_BAND_HIGH)
+    parser.add_argument("--sweep", action="store_true", help="also try other uncertain bands")
+    args = parser.parse_args()
+    if args.record:
+        record(args.record)
+        return
+
+    cases = load(args.grades) if args.grades else simulated()
+    bands = [(args.low, args.high)]
+    if args.sweep:
+        bands += [(low, high) for low in (0.2, 0.35, 0.5) for high in (0.7, 0.8, 0.9) if (low, high) != bands[0]]
+
+    print(f"{len(cases)} product answers, {'recorded grades' if args.grades else 'simulated answers, no grades'}")
+    print(f"{'band':>12} {'calls saved':>12} {'bucket agree':>13} {'escalate agree':>15} {'overconfident':>14}")
+    for low, high in bands:
+        result = evaluate(cases, ConfidenceScorer(low=low, high=high))
+        graded = result["graded"]
+        agree = f"{result['agree']}/{graded}" if graded else "n/a"
+        escalate = f"{result['agree_escalation']}/{graded}" if graded else "n/a"
+        overconfident = str(result["overconfident"]) if graded else "n/a"
+        print(f"{f'[{low}, {high})':>12} {result['saved']:>12.1%} {agree:>13} {escalate:>15} {overconfident:>14}")
+    if args.grades:
+        unparsed = evaluate(cases, ConfidenceScorer())["unparsed"]
+        print(f"Grader replies without a number: {unparsed} (scored 0.0 before parse_confidence)")
+
+if __name__ == "__main__":
+    main()
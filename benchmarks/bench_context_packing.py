@@ -0,0 +1,87 @@
+"""
+Measure the prompt tokens of the answer and grading prompts per question,
+with the retrieved context sent whole (as before) and packed by
+ContextPacker, on the knowledge files and Slack memory in this checkout.
+
+The answer is simulated as the first sentence of the context, like the
+fake LLM of the replay benchmark does. No LLM is called.
+
+Run from the repository root:
+    python benchmarks/bench_context_packing.py [--budget 300] [--grade-budget 200]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+
+import crew  # noqa: E402
+from context_packer import CONTEXT_TOKEN_BUDGET, GRADE_CONTEXT_TOKEN_BUDGET, ContextPacker, approximate_tokens  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "replay_questions.jsonl")
+
+def questions():
+    with open(CORPUS, encoding="utf-8") as f:
+        seen = []
+        for line in f:
+            content = json.loads(line)["content"]
+            if content not in seen:
+                seen.append(content)
+    return seen
+
+def raw_context(query):
+    """retrieve_context without packing"""
+    memory_results = crew.check_memory_for_answer(query)
+    if memory_results:
+        return memory_results
+    return crew.search_knowledge_base(query, crew.categorize_query(query))
+
+def prompt_tokens(packer, query, relevant_info, counter):
+    crew.context_packer = packer
+    relevant_info = packer.pack(relevant_info)
+    context = "\n".join(info[0] for info in relevant_info)
+    answer = re.split(r"(?<=[.!?])\s", context, maxsplit=1)[0]
+    return (counter(crew._answer_prompt(query, relevant_info)),
+            counter(crew._confidence_prompt(query, answer, relevant_info)))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET, help="context tokens in the answer prompt")
+    parser.add_argument("--grade-budget", type=int, default=GRADE_CONTEXT_TOKEN_BUDGET,
+                        help="context tokens in the grading prompt")
+    args = parser.parse_args()
+
+    whole = ContextPacker(budget=0, grade_budget=0)
+    packed = ContextPacker(budget=args.budget, grade_budget=args.grade_budget)
+    counter = packed.count
+    rows = []
+    for query in questions():
+        relevant_info = raw_context(query)
+        if not relevant_info:
+            continue
+        rows.append((prompt_tokens(whole, query, relevant_info, counter),
+                     prompt_tokens(packed, query, relevant_info, counter)))
+
+    def mean(values):
+        return sum(values) / len(values) if values else 0.0
+
+    def largest(values):
+        return max(values, default=0)
+
+    tokenizer = "approximate" if packed._counter is approximate_tokens else "tiktoken"
+    print(f"Questions with context: {len(rows)} ({tokenizer} token counts)")
+    print(f"{'':18}{'whole':>10}{'packed':>10}{'change':>10}")
+    for label, pick in (("answer prompt", lambda row, i: row[i][0]),
+                        ("grading prompt", lambda row, i: row[i][1]),
+                        ("per question", lambda row, i: row[i][0] + row[i][1])):
+        before = [pick(row, 0) for row in rows]
+        after = [pick(row, 1) for row in rows]
+        change = (mean(after) - mean(before)) / mean(before) if mean(before) else 0.0
+        print(f"{label + ' mean':18}{mean(before):>10.0f}{mean(after):>10.0f}{change:>+10.1%}")
+        print(f"{label + ' max':18}{largest(before):>10}{largest(after):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare the nested `any(keyword in text ...)` scans that categorize_query
+and the memory topic detection used with the compiled KeywordMatcher, on
+the replay questions and the knowledge sections, with the keyword tables
+of config/keywords.yaml grown by synthetic terms.
+
+Run from the repository root:
+    python benchmarks/bench_keyword_matcher.py [--extra-terms 5000] [--rounds 3]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from keywords import CATEGORY_KEYWORDS, INFLECTIONS, TOPIC_KEYWORDS, KeywordMatcher  # noqa: E402
+from knowledge_index import split_sections  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "replay_questions.jsonl")
+
+def legacy_match(tables, text):
+    """The substring scans as they were before the compiled matcher"""
+    text = text.lower()
+    return {table: tuple(label for label, keywords in entries.items() if any(keyword in text for keyword in keywords))
+            for table, entries in tables.items()}
+
+def grown(table, extra_terms, prefix):
+    """A copy of the table with `extra_terms` made-up keywords spread over its labels"""
+    table = {label: list(keywords) for label, keywords in table.items()}
+    labels = list(table)
+    for i in range(extra_terms):
+        table[labels[i % len(labels)]].append(f"{prefix}term{i}")
+    return table
+
+def texts():
+    with open(CORPUS, encoding="utf-8") as f:
+        questions = sorted({json.loads(line)["content"] for line in f})
+    sections = []
+    for name in ("product_info.txt", "announcements.txt"):
+        with open(os.path.join("knowledge", name), "r", encoding="utf-8") as f:
+            sections += split_sections(f.read())
+    return questions, sections
+
+def time_matches(match, items, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in items:
+            match(text)
+    return (time.perf_counter() - start) / (rounds * len(items))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--extra-terms", type=int, default=5000, help="synthetic keywords added to the tables")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    questions, sections = texts()
+    for extra in sorted({0, args.extra_terms}):
+        tables = {"categories": grown(CATEGORY_KEYWORDS, extra // 2, "cat"),
+                  "topics": grown(TOPIC_KEYWORDS, extra - extra // 2, "topic")}
+        terms = sum(len(keywords) for entries in tables.values() for keywords in entries.values())
+        start = time.perf_counter()
+        matcher = KeywordMatcher(tables, INFLECTIONS)
+        build = time.perf_counter() - start
+        print(f"\n{terms} keywords (matcher compiled in {build * 1000:.1f} ms)")
+        for name, items in (("questions", questions), ("sections", sections)):
+            legacy = time_matches(lambda text: legacy_match(tables, text), items, args.rounds)
+            compiled = time_matches(matcher.match, items, args.rounds)
+            print(f"  {name:10} legacy {legacy * 1e6:9.1f} us/text   compiled {compiled * 1e6:8.1f} us/text"
+                  f"   ({legacy / compiled:.1f}x)")
+
+    # Where whole-word matching disagrees with the substring scan
+    tables = {"categories": CATEGORY_KEYWORDS, "topics": TOPIC_KEYWORDS}
+    matcher = KeywordMatcher(tables, INFLECTIONS)
+    differences = [(text, legacy_match(tables, text), matcher.match(text)) for text in questions + sections]
+    differences = [item for item in differences if item[1] != item[2]]
+    print(f"\nLabels differ from the substring scan on {len(differences)}/{len(questions) + len(sections)} texts")
+    for text, old, new in differences[:5]:
+        for table in tables:
+            dropped = sorted(set(old[table]) - set(new[table]))
+            added = sorted(set(new[table]) - set(old[table]))
+            if dropped or added:
+                print(f"  {text[:60]!r}: {table} -{dropped} +{added}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Compare the original per-query scan in search_knowledge_base with the
+pre-built KnowledgeIndex on a corpus 100x the size of knowledge/*.txt.
+
+Run from the repository root:
+    python benchmarks/bench_knowledge_search.py [--copies 100] [--rounds 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from knowledge_index import CATEGORY_KEYWORDS, KnowledgeIndex  # noqa: E402
+
+QUERIES = [
+    "what is the core bank",
+    "how do I deposit into a custom bank",
+    "wen airdrop",
+    "how does multiply leverage work",
+    "what tokens are supported",
+    "can't withdraw my funds",
+    "how is liquidity fragmentation solved in the market",
+    "any new announcement or update",
+    "who operates custom banks and what is the risk",
+    "how do I earn u points by lending and borrowing",
+]
+
+def categorize_query(query):
+    query_lower = query.lower()
+    categories = [category for category, keywords in CATEGORY_KEYWORDS.items()
+                  if any(keyword in query_lower for keyword in keywords)]
+    return categories or ['general']
+
+def legacy_search(query, knowledge, categories):
+    """search_knowledge_base as it was before the inverted index"""
+    query = query.lower()
+    sections = knowledge.split('\n\n')
+    relevant_info = []
+    for section in sections:
+        if not section.strip():
+            continue
+        query_words = set(query.split())
+        section_words = set(section.lower().split())
+        matching_words = query_words.intersection(section_words)
+        base_confidence = len(matching_words) / len(query_words) if query_words else 0
+        category_boost = 0.0
+        section_lower = section.lower()
+        for category in categories:
+            if category in CATEGORY_KEYWORDS:
+                if any(keyword in section_lower for keyword in CATEGORY_KEYWORDS[category]):
+                    category_boost += 0.2
+        final_confidence = min(1.0, base_confidence + category_boost)
+        if final_confidence > 0.2:
+            section_category = 'general'
+            for cat, keywords in CATEGORY_KEYWORDS.items():
+                if any(keyword in section_lower for keyword in keywords):
+                    section_category = cat
+                    break
+            relevant_info.append((section, final_confidence, section_category))
+    relevant_info.sort(key=lambda x: x[1], reverse=True)
+    final_selection = []
+    used_categories = set()
+    for info in relevant_info:
+        if info[2] not in used_categories and len(final_selection) < 5:
+            final_selection.append(info)
+            used_categories.add(info[2])
+    for info in relevant_info:
+        if info not in final_selection and len(final_selection) < 5:
+            final_selection.append(info)
+    return final_selection
+
+def load_corpus(copies):
+    texts = []
+    for name in ("product_info.txt", "announcements.txt"):
+        with open(os.path.join("knowledge", name), "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    base = "\n\n".join(texts)
+    # Tag every copy so sections stay distinct, like a corpus of many documents
+    return "\n\n".join(base.replace("\n\n", f" doc{i}\n\n") for i in range(copies))
+
+def time_queries(search, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            search(query)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    knowledge = load_corpus(args.copies)
+    print(f"Corpus: {len(knowledge) / 1024:.0f} KiB, {args.copies}x knowledge/*.txt")
+
+    start = time.perf_counter()
+    index = KnowledgeIndex.from_text(knowledge)
+    build = time.perf_counter() - start
+    print(f"Index build: {build * 1000:.1f} ms for {len(index)} sections, {len(index.postings)} terms")
+
+    legacy = time_queries(lambda q: legacy_search(q, knowledge, categorize_query(q)), args.rounds)
+    indexed = time_queries(lambda q: index.search(q, categorize_query(q)), args.rounds)
+    print(f"Legacy scan: {legacy * 1000:8.2f} ms/query")
+    print(f"Index:       {indexed * 1000:8.2f} ms/query ({legacy / indexed:.0f}x faster)")
+
+    same_confidence = sum(
+        [round(c, 6) for _, c, _ in legacy_search(q, knowledge, categorize_query(q))]
+        == [round(c, 6) for _, c, _ in index.search(q, categorize_query(q))]
+        for q in QUERIES
+    )
+    print(f"Same top-5 confidences as the scan on {same_confidence}/{len(QUERIES)} queries")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Replay a corpus of channel questions through the bot offline and report
+throughput, latency percentiles, LLM calls per question and memory growth.
+
+The OpenAI client is replaced by the deterministic FakeChatModel with a
+configurable latency, Slack escalations go to the local fake webhook, and
+the run happens in a scratch copy of config/, knowledge/ and memory.json so
+nothing in the checkout is written to.
+
+    python benchmarks/bench_replay.py [--target async] [--questions 1000] [--latency 0.3]
+
+An LLM outage or slowdown is replayed with --failure-rate 1.0 or a --latency
+above the --deadline; the report then shows the retrieval-only answers, the
+deadline misses and the circuit breaker trips.
+
+Targets:
+    sync     get_answer_with_fallback, one question after another
+    async    aget_answer_with_fallback, up to --concurrency questions at once
+    discord  bot.on_message fed simulated discord.Message objects
+
+To compare commits, save a run on one and compare against it on another:
+    python benchmarks/bench_replay.py --save /tmp/base.json
+    git checkout my-branch
+    python benchmarks/bench_replay.py --compare /tmp/base.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_slack_webhook import FakeSlackWebhook  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "data", "replay_questions.jsonl")
+
+def load_corpus(path: str, count: int):
+    """Questions as (user, channel, content), cycled to `count` entries"""
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    rows = [(str(row.get("user", "0")), str(row.get("channel", "0")), row.get("content") or row.get("question", ""))
+            for row in rows]
+    return [rows[i % len(rows)] for i in range(count)]
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def prepare_sandbox(args, webhook_url: str) -> str:
+    """Scratch working directory and environment; must run before the bot modules are imported"""
+    sandbox = tempfile.mkdtemp(prefix="bench_replay_")
+    for name in ("config", "knowledge"):
+        shutil.copytree(os.path.join(REPO_ROOT, name), os.path.join(sandbox, name))
+    for name in ("memory.json", "memory.jsonl"):
+        if os.path.exists(os.path.join(REPO_ROOT, name)):
+            shutil.copy(os.path.join(REPO_ROOT, name), sandbox)
+    os.chdir(sandbox)
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+    os.environ["SLACK_WEBHOOK_URL"] = webhook_url
+    os.environ["SLACK_DIGEST_WINDOW_SECONDS"] = "0.05"
+    os.environ["SLACK_MIN_POST_INTERVAL_SECONDS"] = "0"
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["ANSWER_MODE"] = args.mode
+    os.environ["ANSWER_CONCURRENCY"] = str(args.concurrency)
+    os.environ["STREAM_ANSWERS"] = "1" if args.stream else "0"
+    os.environ["STREAM_EDIT_INTERVAL_SECONDS"] = "0"
+    os.environ["ANSWER_TIMEOUT_SECONDS"] = str(args.deadline)
+    if args.no_cache:
+        os.environ["ANSWER_CACHE_SIZE"] = "0"
+    if not args.rate_limits:
+        for name in ("USER_QUESTIONS_PER_MINUTE", "USER_QUESTION_BURST",
+                     "CHANNEL_QUESTIONS_PER_MINUTE", "CHANNEL_QUESTION_BURST"):
+            os.environ[name] = "1000000000"
+    return sandbox
+
+def install_fake_llm(args):
+    import crew
+    from fake_llm import FakeChatModel
+    from telemetry import telemetry
+
+    fake = FakeChatModel(latency=args.latency, jitter=args.jitter, seed=args.seed,
+                         low_confidence_rate=args.low_confidence_rate, failure_rate=args.failure_rate,
+                         callbacks=[telemetry.callback])
+    # One fake per stage, priced as the model config/models.yaml gives the stage; all share the call counts
+    crew.models.use(lambda settings: fake.model_copy(update={"model_name": settings.model,
+                                                             "temperature": settings.temperature}))
+    crew.fused_llm = crew.fused_llm_no_retries = None
+    return fake
+
+async def drive(calls, concurrency: int, rate: float):
+    """
+    Run the coroutine factories, at most `concurrency` at a time, or arriving
+    every 1/rate seconds when a rate is given. Returns per-question latencies.
+    """
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(call, arrived):
+        async with semaphore:
+            await call()
+        latencies.append(time.perf_counter() - arrived)
+
+    tasks = []
+    start = time.perf_counter()
+    for i, call in enumerate(calls):
+        if rate > 0:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(call, time.perf_counter())))
+    await asyncio.gather(*tasks)
+    return latencies
+
+def run_sync(questions):
+    from crew import get_answer_with_fallback
+
+    latencies = []
+    for user, _, content in questions:
+        start = time.perf_counter()
+        get_answer_with_fallback(content, user)
+        latencies.append(time.perf_counter() - start)
+    return latencies, {}
+
+async def run_async(questions, args):
+    from crew import aget_answer_with_fallback
+    from slack_fallback import notifier
+
+    calls = [lambda user=user, content=content: aget_answer_with_fallback(content, user)
+             for user, _, content in questions]
+    latencies = await drive(calls, args.concurrency, args.rate)
+    await notifier.aclose()
+    return latencies, {}
+
+async def run_discord(questions, args):
+    import bot
+    from fake_discord import FakeChannel, FakeGuild, FakeMessage, FakeUser
+    from slack_fallback import notifier
+
+    guild = FakeGuild(1)
+    channels, users = {}, {}
+    messages = []
+    for user, channel, content in questions:
+        channels.setdefault(channel, FakeChannel(int(channel), latency=args.discord_latency))
+        users.setdefault(user, FakeUser(int(user)))
+        messages.append(FakeMessage(content, users[user], channels[channel], guild))
+
+    calls = [lambda message=message: bot.on_message(message) for message in messages]
+    latencies = await drive(calls, args.concurrency, args.rate)
+    await notifier.aclose()
+    sent = [message for channel in channels.values() for message in channel.sent]
+    return latencies, {
+        "discord_messages_sent": len(sent),
+        "discord_edits": sum(message.edits for message in sent),
+        "unanswered_replies": sum(1 for message in sent if "get back to you" in (message.content or "")),
+    }
+
+def run(args) -> dict:
+    questions = load_corpus(args.corpus, args.questions)
+    cwd = os.getcwd()
+    webhook = FakeSlackWebhook().start()
+    sandbox = prepare_sandbox(args, webhook.url)
+    try:
+        if args.tracemalloc:
+            tracemalloc.start()
+        gc.collect()
+        rss_before = rss_bytes()
+        import_start = time.perf_counter()
+        fake = install_fake_llm(args)
+        import_seconds = time.perf_counter() - import_start
+        from slack_fallback import notifier
+        from telemetry import telemetry
+
+        gc.collect()
+        rss_ready = rss_bytes()
+        traced_ready = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+        start = time.perf_counter()
+        if args.target == "sync":
+            latencies, extra = run_sync(questions)
+        elif args.target == "async":
+            latencies, extra = asyncio.run(run_async(questions, args))
+        else:
+            latencies, extra = asyncio.run(run_discord(questions, args))
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        rss_after = rss_bytes()
+        traced_after = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+    finally:
+        webhook.stop()
+        os.chdir(cwd)
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+    llm_calls = sum(fake.calls.values())
+    lookups = telemetry.cache_lookups
+    cache_total = sum(lookups.values())
+    return {
+        "revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("save", "compare")},
+        "questions": len(latencies),
+        "seconds": elapsed,
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "llm_calls_per_question": llm_calls / len(latencies) if latencies else 0.0,
+        "llm_calls": dict(sorted(fake.calls.items())),
+        "cache_hit_rate": lookups.get("hit", 0) / cache_total if cache_total else 0.0,
+        "escalations_delivered": notifier.delivered,
+        "degraded_answers": dict(sorted(telemetry.degraded.items())),
+        "deadline_misses": dict(sorted(telemetry.deadline_misses.items())),
+        "breaker_trips": telemetry.gauges.get("bot_llm_breaker_trips", 0),
+        "webhook_posts": webhook.requests,
+        "dollars_per_answer": telemetry.summary()["dollars_per_answer"],
+        "stages": telemetry.summary()["stages"],
+        "startup_seconds": import_seconds,
+        "rss_startup_mb": (rss_ready - rss_before) / 2**20,
+        "rss_growth_mb": (rss_after - rss_ready) / 2**20,
+        "traced_growth_mb": (traced_after - traced_ready) / 2**20 if args.tracemalloc else None,
+        **extra,
+    }
+
+COMPARED = [
+    ("qps", "QPS", True),
+    ("p50_ms", "p50 ms", False),
+    ("p95_ms", "p95 ms", False),
+    ("p99_ms", "p99 ms", False),
+    ("llm_calls_per_question", "LLM calls/question", False),
+    ("cache_hit_rate", "cache hit rate", True),
+    ("dollars_per_answer", "$/answer", False),
+    ("rss_growth_mb", "RSS growth MB", False),
+]
+
+def print_result(result: dict):
+    print(f"Revision:             {result['revision']}")
+    print(f"Questions:            {result['questions']} in {result['seconds']:.2f} s ({result['qps']:.1f} QPS)")
+    print(f"Latency:              p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+          f"p99 {result['p99_ms']:.1f} ms, max {result['max_ms']:.1f} ms")
+    print(f"LLM calls/question:   {result['llm_calls_per_question']:.2f} {result['llm_calls']}")
+    print(f"Cache hit rate:       {result['cache_hit_rate']:.1%}")
+    print(f"Escalations:          {result['escalations_delivered']} in {result['webhook_posts']} webhook posts")
+    print(f"Degraded answers:     {sum(result['degraded_answers'].values())} {result['degraded_answers']}, "
+          f"breaker trips {result['breaker_trips']}")
+    print(f"Deadline misses:      {sum(result['deadline_misses'].values())} {result['deadline_misses']}")
+    print(f"Cost:                 ${result['dollars_per_answer']:.6f} per answer (price table estimate)")
+    for stage, by_model in sorted(result.get("stages", {}).items()):
+        for model, usage in by_model.items():
+            mean = f"{usage['mean_seconds'] * 1000:.1f} ms" if usage["mean_seconds"] is not None else "n/a"
+            print(f"  {stage:<9} {model:<15} {usage['calls']:>5} calls, {mean} per call, ${usage['dollars']:.6f}")
+    print(f"Startup:              {result['startup_seconds']:.2f} s, {result['rss_startup_mb']:.1f} MB")
+    growth = f"RSS {result['rss_growth_mb']:+.1f} MB"
+    if result.get("traced_growth_mb") is not None:
+        growth += f", Python heap {result['traced_growth_mb']:+.2f} MB"
+    print(f"Memory growth:        {growth}")
+    if "discord_messages_sent" in result:
+        print(f"Discord:              {result['discord_messages_sent']} messages sent, {result['discord_edits']} edits, "
+              f"{result['unanswered_replies']} 'get back to you' replies")
+
+def print_comparison(base: dict, result: dict):
+    if base.get("config") != result.get("config"):
+        print("Warning: the runs used different settings")
+    print(f"\n{'':22}{base['revision']:>16}{result['revision']:>16}{'change':>12}")
+    for key, label, higher_is_better in COMPARED:
+        old, new = base.get(key), result.get(key)
+        if old is None or new is None:
+            continue
+        change = f"{(new - old) / old:+.1%}" if old else "n/a"
+        print(f"{label:22}{old:>16.4g}{new:>16.4g}{change:>12}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=("sync", "async", "discord"), default="async")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL with user, channel and content per line")
+    parser.add_argument("--questions", type=int, default=1000, help="questions replayed, cycling the corpus")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--jitter", type=float, default=0.1, help="extra random seconds per fake LLM call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of fake LLM calls that fail")
+    parser.add_argument("--deadline", type=float, default=30.0, help="ANSWER_TIMEOUT_SECONDS per question")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--low-confidence-rate", type=float, default=0.2, help="share of questions graded low")
+    parser.add_argument("--concurrency", type=int, default=32, help="questions in flight at once (async, discord)")
+    parser.add_argument("--rate", type=float, default=0.0, help="question arrivals per second, 0 = all at once")
+    parser.add_argument("--mode", choices=("chain", "fused"), default="chain", help="ANSWER_MODE")
+    parser.add_argument("--stream", action="store_true", help="STREAM_ANSWERS for the discord target")
+    parser.add_argument("--discord-latency", type=float, default=0.0, help="seconds per Discord API call")
+    parser.add_argument("--no-cache", action="store_true", help="disable the answer cache")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the per-user and per-channel limits")
+    parser.add_argument("--tracemalloc", action="store_true", help="also measure Python heap growth (slower)")
+    parser.add_argument("--save", help="write the result as JSON")
+    parser.add_argument("--compare", help="JSON saved by an earlier run to compare against")
+    args = parser.parse_args()
+
+    result = run(args)
+    print_result(result)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Slack history backfill against a local fake Slack Web API holding a large
+channel history (100k messages by default).
+
+    python benchmarks/bench_slack_backfill.py [--messages 100000] [--burst 50]
+
+Runs, in one scratch working directory:
+    catch-up     first start with no cursor: pages conversations.history newest
+                 first until the namespace memory (1000 messages) is full
+    incremental  restart after --new more messages were posted: reads only those
+    up to date   restart with nothing new: one history call, no write, no post
+    full         memory sized to the whole history, so every message is paged
+                 through and stored, --batch per memory write
+    per-message  the old live path for comparison, one memory write and one
+                 confirmation post per message, over the first --baseline
+                 messages and extrapolated to the whole history
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_slack_api import FakeSlackApi  # noqa: E402
+
+CHANNEL = "C0000000001"
+
+def prepare_sandbox(api_url: str) -> str:
+    """Scratch working directory and environment; must run before the bot modules are imported"""
+    sandbox = tempfile.mkdtemp(prefix="bench_backfill_")
+    shutil.copytree(os.path.join(REPO_ROOT, "config"), os.path.join(sandbox, "config"))
+    os.chdir(sandbox)
+    os.environ["SLACK_BOT_TOKEN"] = "xoxb-fake"
+    os.environ["SLACK_APP_TOKEN"] = "xapp-fake"
+    os.environ["SLACK_CHANNEL_ID"] = CHANNEL
+    os.environ["SLACK_API_URL"] = api_url
+    return sandbox
+
+def count_writes():
+    """Count memory log appends, one per persisted write"""
+    from memory import MemoryStore
+
+    writes = {"count": 0}
+    append = MemoryStore._append
+
+    def counted(self, records):
+        writes["count"] += 1
+        return append(self, records)
+
+    MemoryStore._append = counted
+    return writes
+
+async def timed_backfill(api, writes, label: str):
+    import slack_handler
+
+    calls, posted, count = sum(api.calls.values()), len(api.posted), writes["count"]
+    pages = slack_handler.ingestor.history_pages
+    start = time.perf_counter()
+    stored = await slack_handler.backfill_history()
+    seconds = time.perf_counter() - start
+    print(f"{label:<12} {seconds:>8.2f} s {sum(stored.values()):>8} stored "
+          f"{slack_handler.ingestor.history_pages - pages:>6} pages {sum(api.calls.values()) - calls:>6} API calls "
+          f"{writes['count'] - count:>6} writes {len(api.posted) - posted:>4} posts")
+    return seconds
+
+async def per_message(api, writes, count: int, total: int):
+    """The pre-backfill live path: a memory write and a confirmation per message"""
+    import slack_handler
+    from memory import MemoryStore
+
+    store = MemoryStore("memory.baseline.jsonl", legacy_path="")
+    client = slack_handler._web_client(slack_handler.slack_bot_token)
+    messages = [message for message in api._history[CHANNEL][:count] if slack_handler._ingestible_text(message)]
+    calls, before = sum(api.calls.values()), writes["count"]
+    start = time.perf_counter()
+    for message in messages:
+        store.add(message["text"])
+        await client.chat_postMessage(channel=CHANNEL, text=f"✅ Message stored: {message['text'][:50]}...")
+    seconds = time.perf_counter() - start
+    print(f"{'per-message':<12} {seconds:>8.2f} s {len(messages):>8} stored {0:>6} pages "
+          f"{sum(api.calls.values()) - calls:>6} API calls {writes['count'] - before:>6} writes "
+          f"{len(messages):>4} posts")
+    print(f"{'':<12} {seconds * total / count:>8.1f} s extrapolated to {total} messages")
+
+async def run(args, api, writes):
+    import slack_handler
+    from memory import MemoryStore
+    from namespaces import get_namespace
+
+    print(f"{args.messages} messages in the fake channel, {args.page_size} per page"
+          + (f", {args.burst} API calls/s before 429" if args.burst else ""))
+    slack_handler.ingestor.page_size = args.page_size
+    slack_handler.ingestor.backfill_batch_size = args.batch
+    await timed_backfill(api, writes, "catch-up")
+    api.post_history(CHANNEL, args.new)
+    await timed_backfill(api, writes, "incremental")
+    await timed_backfill(api, writes, "up to date")
+
+    namespace = get_namespace()
+    namespace.memory_store = MemoryStore("memory.full.jsonl", legacy_path="", max_messages=args.messages + args.new)
+    slack_handler.ingestor.cursor = slack_handler.HistoryCursor("slack_cursor.full.json")
+    await timed_backfill(api, writes, "full")
+    print(f"{'':<12} {len(namespace.memory_store)} messages in memory"
+          + (f", {api.rate_limited} calls answered 429 and retried" if args.burst else ""))
+
+    if args.baseline:
+        await per_message(api, writes, args.baseline, args.messages)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=100_000, help="history of the fake channel")
+    parser.add_argument("--new", type=int, default=2500, help="messages posted before the incremental run")
+    parser.add_argument("--page-size", type=int, default=200, help="conversations.history limit")
+    parser.add_argument("--batch", type=int, default=1000, help="messages per memory write")
+    parser.add_argument("--burst", type=int, default=0, help="API calls per second before the fake answers 429")
+    parser.add_argument("--baseline", type=int, default=2000, help="messages through the per-message path, 0 to skip")
+    args = parser.parse_args()
+
+    api = FakeSlackApi(burst=args.burst)
+    api.post_history(CHANNEL, args.messages)
+    api.start()
+    cwd = os.getcwd()
+    sandbox = prepare_sandbox(api.url)
+    try:
+        writes = count_writes()
+        asyncio.run(run(args, api, writes))
+    finally:
+        api.stop()
+        os.chdir(cwd)
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
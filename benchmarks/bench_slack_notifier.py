@@ -0,0 +1,58 @@
+"""
+Push bursts of notifications through SlackNotifier against the local fake
+webhook and report how many HTTP posts, retries and digests it took.
+
+    python benchmarks/bench_slack_notifier.py [--messages 1000] [--burst 1] [--window 0.5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_slack_webhook import FakeSlackWebhook  # noqa: E402
+from slack_fallback import SlackNotifier  # noqa: E402
+
+async def run(args, webhook):
+    notifier = SlackNotifier(webhook.url, window=args.window, backoff=0.05, max_retries=8,
+                             min_interval=args.min_interval)
+    start = time.perf_counter()
+    for i in range(args.messages):
+        notifier.notify(f"New unanswered query received: 'question {i % args.distinct}'")
+        if i % args.burst_size == args.burst_size - 1:
+            await asyncio.sleep(args.gap)
+    enqueued = time.perf_counter() - start
+    await notifier.flush()
+    elapsed = time.perf_counter() - start
+    await notifier.aclose()
+    return notifier, enqueued, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--distinct", type=int, default=200, help="distinct texts among the messages")
+    parser.add_argument("--burst-size", type=int, default=100, help="messages sent back to back")
+    parser.add_argument("--gap", type=float, default=0.2, help="seconds between bursts")
+    parser.add_argument("--window", type=float, default=0.5, help="digest window in seconds")
+    parser.add_argument("--min-interval", type=float, default=1.0, help="notifier pacing between posts")
+    parser.add_argument("--burst", type=int, default=1, help="webhook posts accepted per second before 429")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="fraction of posts failing with 503")
+    args = parser.parse_args()
+
+    webhook = FakeSlackWebhook(burst=args.burst, retry_after=0.2, error_rate=args.error_rate).start()
+    try:
+        notifier, enqueued, elapsed = asyncio.run(run(args, webhook))
+    finally:
+        webhook.stop()
+
+    print(f"Notifications:      {args.messages} ({args.distinct} distinct), enqueued in {enqueued * 1000:.1f} ms")
+    print(f"Digests delivered:  {len(webhook.payloads)} in {elapsed:.2f} s")
+    print(f"HTTP posts:         {notifier.posts} ({notifier.retries} retries, "
+          f"{webhook.rate_limited} rate limited, {webhook.errors} server errors)")
+    print(f"Texts delivered:    {notifier.delivered}, failures: {notifier.failures}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Time-to-ready of a fresh bot process, offline.
+
+Each round starts a new interpreter in a scratch copy of config/, knowledge/
+and the memory, imports bot.py (everything up to `bot.run`), runs the
+background warm-up the bot starts once the gateway is connected, and then
+answers one question through the fake LLM. With --cold the question is
+asked without warming up first, to show what the first asker pays. The
+Discord gateway itself is not contacted.
+
+    python benchmarks/bench_startup.py [--rounds 5] [--cold]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+def child(cold: bool):
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+    sys.path.insert(0, BENCH_DIR)
+    import bot
+    imported = time.perf_counter()
+
+    import asyncio
+    import crew
+    from fake_llm import FakeChatModel
+
+    steps = {} if cold else crew.warm_up(bot.router.namespaces())
+    warmed = time.perf_counter()
+    fake = FakeChatModel(callbacks=[bot.telemetry.callback])
+    crew.models.use(lambda settings: fake.model_copy(update={"model_name": settings.model}))
+    asyncio.run(crew.aget_answer_with_fallback("what is the core bank", "1"))
+    answered = time.perf_counter()
+    print(json.dumps({
+        "import": imported - start,
+        "startup": dict(bot.telemetry.startup),
+        "warm_up": warmed - imported,
+        "warm_up_steps": steps,
+        "first_answer": answered - warmed,
+    }))
+
+def run_round(cold: bool) -> dict:
+    sandbox = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        for name in ("config", "knowledge"):
+            shutil.copytree(os.path.join(REPO_ROOT, name), os.path.join(sandbox, name))
+        for name in ("memory.json", "memory.jsonl"):
+            if os.path.exists(os.path.join(REPO_ROOT, name)):
+                shutil.copy(os.path.join(REPO_ROOT, name), sandbox)
+        env = dict(os.environ, METRICS_PORT="0", PYTHONDONTWRITEBYTECODE="1")
+        env.setdefault("OPENAI_API_KEY", "sk-offline")
+        command = [sys.executable, os.path.abspath(__file__), "--child"] + (["--cold"] if cold else [])
+        start = time.perf_counter()
+        output = subprocess.run(command, cwd=sandbox, env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process"] = time.perf_counter() - start
+        return result
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="answer the first question without warming up")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.cold)
+        return
+
+    rounds = [run_round(args.cold) for _ in range(args.rounds)]
+
+    def median(pick):
+        return statistics.median(pick(result) for result in rounds)
+
+    print(f"Rounds: {args.rounds} fresh processes ({'cold' if args.cold else 'warmed up'} first answer)")
+    print(f"Import bot.py:       {median(lambda r: r['import']):.3f} s "
+          f"(imports {median(lambda r: r['startup'].get('imports', 0.0)):.3f} s, "
+          f"setup {median(lambda r: r['startup'].get('setup', 0.0)):.3f} s)")
+    if not args.cold:
+        steps = sorted({step for result in rounds for step in result["warm_up_steps"]})
+        detail = ", ".join(f"{step} {median(lambda r: r['warm_up_steps'].get(step, 0.0)):.3f} s" for step in steps)
+        print(f"Background warm-up:  {median(lambda r: r['warm_up']):.3f} s ({detail})")
+    print(f"First answer:        {median(lambda r: r['first_answer']):.3f} s")
+    print(f"Whole process:       {median(lambda r: r['process']):.3f} s, interpreter start and exit included")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Minimal stand-ins for the discord.py objects `bot.on_message` touches, for
+offline benchmarks: a message with an author, guild and channel, a channel
+whose `send` and `typing` record what the bot did, and sent messages that
+can be edited. Nothing here talks to Discord.
+"""
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+_ids = itertools.count(1)
+
+class FakeUser:
+    def __init__(self, user_id: int, bot: bool = False):
+        self.id = user_id
+        self.bot = bot
+        self.mention = f"<@{user_id}>"
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+
+class FakeSentMessage:
+    def __init__(self, channel: "FakeChannel", content: str):
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, content: str = None, **kwargs):
+        await asyncio.sleep(self.channel.latency)
+        self.content = content
+        self.edits += 1
+        return self
+
+    async def delete(self):
+        await asyncio.sleep(self.channel.latency)
+        self.channel.sent.remove(self)
+
+class FakeChannel:
+    """Records every message sent; each API call takes `latency` seconds"""
+
+    def __init__(self, channel_id: int, latency: float = 0.0):
+        self.id = channel_id
+        self.latency = latency
+        self.sent: List[FakeSentMessage] = []
+        self.typing_sessions = 0
+
+    async def send(self, content: str = None, **kwargs) -> FakeSentMessage:
+        await asyncio.sleep(self.latency)
+        message = FakeSentMessage(self, content)
+        self.sent.append(message)
+        return message
+
+    @asynccontextmanager
+    async def typing(self):
+        self.typing_sessions += 1
+        yield
+
+class FakeMessage:
+    def __init__(self, content: str, author: FakeUser, channel: FakeChannel, guild: Optional[FakeGuild]):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.created_at = time.time()
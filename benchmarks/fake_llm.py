@@ -0,0 +1,171 @@
+"""
+Deterministic stand-in for ChatOpenAI, for offline benchmarks.
+
+It recognises the bot's prompts and answers them the way a well-behaved
+model would, without the network:
+
+- casual/product classification: "casual" for greetings and thanks, else "product"
+- casual replies: a fixed friendly line
+- answers: the first sentence of the CONTEXT block
+- confidence grading: a number derived from a hash of the question, so the
+  same corpus always produces the same mix of high, medium and low grades
+- the fused structured-output call: a FusedAnswer tool call built from the above
+- recheck batches: a RecheckBatch tool call answering each question the same way
+
+Every call sleeps `latency` seconds (plus up to `jitter`, seeded), reports
+token usage like the OpenAI client does and is counted per prompt kind. A
+`failure_rate` share of calls raise ConnectionError after their latency, and
+a call given a `timeout` shorter than its latency raises TimeoutError once
+the timeout has passed, as the OpenAI client does.
+"""
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+CASUAL_WORDS = {"hi", "hello", "hey", "gm", "thanks", "thank", "thx", "lol", "haha", "morning", "night", "joke"}
+
+def _message(prompt: str) -> str:
+    match = re.search(r'(?:Message|Question): "(.*?)"', prompt, re.S)
+    return match.group(1) if match else prompt
+
+def _context(prompt: str) -> str:
+    match = re.search(r"CONTEXT:\n(.*?)\n\n", prompt, re.S)
+    return match.group(1).strip() if match else ""
+
+def _stable_fraction(text: str) -> float:
+    return int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+class FakeChatModel(BaseChatModel):
+    model_name: str = "gpt-3.5-turbo"
+    # Accepted like ChatOpenAI's setting; the replies do not depend on it
+    temperature: float = 0.7
+    latency: float = 0.0
+    jitter: float = 0.0
+    seed: int = 0
+    # Share of product questions graded below 0.5, i.e. escalated to Slack
+    low_confidence_rate: float = 0.2
+    # Share of calls that fail, 1.0 for an outage
+    failure_rate: float = 0.0
+    _calls: Counter = PrivateAttr(default_factory=Counter)
+    _random: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any):
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def calls(self) -> Counter:
+        return self._calls
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+
+    def _outcome(self, timeout: Optional[float]) -> Tuple[float, Optional[Exception]]:
+        """Seconds the call takes and the error it ends with, if any"""
+        delay = self._delay()
+        if timeout is not None and delay > timeout:
+            return timeout, TimeoutError(f"Request timed out after {timeout:.2f}s")
+        with self._lock:
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+        return delay, ConnectionError("Connection error.") if failed else None
+
+    def _confidence(self, question: str) -> float:
+        fraction = _stable_fraction(question)
+        if fraction < self.low_confidence_rate:
+            return 0.3
+        return 0.6 if fraction < self.low_confidence_rate + 0.2 else 0.9
+
+    def _reply(self, prompt: str, tools: Optional[List[dict]]) -> AIMessage:
+        question = _message(prompt)
+        casual = bool(CASUAL_WORDS & set(re.findall(r"[a-z]+", question.lower())))
+        tool_calls = []
+        if tools and tools[0]["function"]["name"] == "RecheckBatch":
+            kind, content = "recheck", ""
+            items = []
+            for number, block in re.findall(r"### Question (\d+)\n(.*?)(?=\n### Question |\Z)", prompt, re.S):
+                answer = re.split(r"(?<=[.!?])\s", _context(block + "\n\n"), maxsplit=1)[0]
+                items.append({"id": int(number), "answer": answer,
+                              "confidence": self._confidence(_message(block)) if answer else 0.0})
+            tool_calls.append({"name": "RecheckBatch", "id": f"call_{uuid.uuid4().hex[:12]}", "args": {"items": items}})
+        elif tools:
+            kind = "fused"
+            context = _context(prompt)
+            answer = "Hey there! 👋" if casual else re.split(r"(?<=[.!?])\s", context, maxsplit=1)[0]
+            if not casual and context.startswith("(no matching"):
+                answer = ""
+            confidence = 1.0 if casual else (self._confidence(question) if answer else 0.0)
+            tool_calls.append({"name": tools[0]["function"]["name"], "id": f"call_{uuid.uuid4().hex[:12]}",
+                               "args": {"kind": "casual" if casual else "product", "answer": answer,
+                                        "confidence": confidence}})
+            content = ""
+        elif 'Respond with either "casual" or "product"' in prompt:
+            kind, content = "classify", "casual" if casual else "product"
+        elif "Respond with only a number between 0 and 1" in prompt:
+            kind, content = "grade", str(self._confidence(question))
+        elif "Generate a friendly, casual response" in prompt:
+            kind, content = "casual", "Hey there! 👋 How can I help you today?"
+        else:
+            kind = "answer"
+            content = re.split(r"(?<=[.!?])\s", _context(prompt), maxsplit=1)[0] or "I don't know."
+        with self._lock:
+            self._calls[kind] += 1
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": max(1, len(content) // 4),
+                 "total_tokens": len(prompt) // 4 + max(1, len(content) // 4)}
+        return AIMessage(content=content, tool_calls=tool_calls, usage_metadata=usage,
+                         response_metadata={"model_name": self.model_name})
+
+    @staticmethod
+    def _prompt(messages) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, timeout=None, **kwargs) -> ChatResult:
+        delay, error = self._outcome(timeout)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=self._reply(self._prompt(messages), tools))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None, timeout=None,
+                         **kwargs) -> ChatResult:
+        delay, error = self._outcome(timeout)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=self._reply(self._prompt(messages), tools))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None, timeout=None, **kwargs):
+        delay, error = self._outcome(timeout)
+        if error is not None:
+            await asyncio.sleep(delay)
+            raise error
+        message = self._reply(self._prompt(messages), tools)
+        words = re.findall(r"\S+\s*", message.content) or [""]
+        pause = delay / len(words)
+        for word in words:
+            await asyncio.sleep(pause)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata,
+                                                         response_metadata=message.response_metadata))
@@ -0,0 +1,185 @@
+"""
+Local stand-in for the Slack Web API, for offline benchmarks.
+
+It holds a generated channel history and serves the methods the Slack
+ingestion calls: conversations.history (newest first, paged with an opaque
+cursor, bounded by oldest/latest), chat.postMessage, auth.test and
+conversations.info. Every call is counted per method; after `burst` calls
+within one second it answers 429 with Retry-After, like Slack's per-method
+rate limits.
+
+    python benchmarks/fake_slack_api.py --port 8098 --messages 100000
+"""
+import argparse
+import base64
+import bisect
+import json
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+WORDS = ("deposit", "withdraw", "core", "bank", "custom", "vault", "apy", "rewards", "points", "badge", "bridge",
+         "usdc", "eth", "soneium", "borrow", "repay", "liquidation", "oracle", "fees", "campaign", "snapshot",
+         "migration", "wallet", "gas", "limit", "epoch", "claim", "airdrop", "governance", "proposal")
+
+class FakeSlackApi:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, burst: int = 0, retry_after: int = 1,
+                 latency: float = 0.0, seed: int = 0):
+        self.burst = burst
+        self.retry_after = retry_after
+        self.latency = latency
+        self.calls = Counter()
+        self.rate_limited = 0
+        self.posted = []
+        self._history = {}
+        self._keys = {}
+        self._window_start = 0.0
+        self._window_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    def post_history(self, channel: str, count: int, bot_share: float = 0.05, repeat_share: float = 0.02,
+                     start: float = 1_700_000_000.0, interval: float = 3.0):
+        """Append `count` generated messages to a channel, one every `interval` seconds after its newest"""
+        with self._lock:
+            messages = self._history.setdefault(channel, [])
+            keys = self._keys.setdefault(channel, [])
+            ts = Decimal(messages[-1]["ts"]) if messages else Decimal(f"{start:.6f}")
+            for _ in range(count):
+                ts += Decimal(f"{interval + self._random.random():.6f}")
+                roll = self._random.random()
+                if roll < bot_share:
+                    message = {"type": "message", "subtype": "bot_message", "bot_id": "B000", "text": "✅ Message stored"}
+                elif roll < bot_share + repeat_share and messages:
+                    message = {"type": "message", "user": "U001", "text": self._random.choice(messages)["text"]}
+                else:
+                    words = " ".join(self._random.choice(WORDS) for _ in range(self._random.randint(6, 24)))
+                    message = {"type": "message", "user": f"U{self._random.randint(1, 40):03d}",
+                               "text": f"{words} #{len(messages)}"}
+                message["ts"] = f"{ts:.6f}"
+                messages.append(message)
+                keys.append(ts)
+
+    def _limited(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            if self.burst and self._window_count >= self.burst:
+                self.rate_limited += 1
+                return True
+            self._window_count += 1
+            return False
+
+    def _conversations_history(self, params: dict) -> dict:
+        with self._lock:
+            messages = self._history.get(params.get("channel"))
+            keys = self._keys.get(params.get("channel"))
+            if messages is None:
+                return {"ok": False, "error": "channel_not_found"}
+            # Slack excludes the oldest and latest bounds unless inclusive is set
+            low = bisect.bisect_right(keys, Decimal(params["oldest"])) if params.get("oldest") else 0
+            latest = params.get("latest")
+            if params.get("cursor"):
+                # Like Slack's, the cursor names the ts the next page starts below
+                latest = base64.b64decode(params["cursor"]).decode().split(":", 1)[1]
+            high = bisect.bisect_left(keys, Decimal(latest)) if latest else len(messages)
+            limit = min(int(params.get("limit", 100)), 999)
+            start = max(low, high - limit)
+            page = messages[start:high][::-1]
+        has_more = start > low
+        response = {"ok": True, "messages": page, "has_more": has_more}
+        if has_more:
+            next_cursor = base64.b64encode(f"next_ts:{messages[start]['ts']}".encode()).decode()
+            response["response_metadata"] = {"next_cursor": next_cursor}
+        return response
+
+    def _call(self, method: str, params: dict) -> dict:
+        with self._lock:
+            self.calls[method] += 1
+        if method == "conversations.history":
+            return self._conversations_history(params)
+        if method == "chat.postMessage":
+            with self._lock:
+                self.posted.append(params)
+            return {"ok": True, "channel": params.get("channel"), "ts": f"{time.time():.6f}"}
+        if method == "auth.test":
+            return {"ok": True, "user_id": "U000", "team_id": "T000"}
+        if method == "conversations.info":
+            return {"ok": True, "channel": {"id": params.get("channel"), "name": "fake-channel"}}
+        return {"ok": False, "error": "unknown_method"}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, params: dict):
+                if api.latency:
+                    time.sleep(api.latency)
+                if api._limited():
+                    body, status = b'{"ok": false, "error": "ratelimited"}', 429
+                else:
+                    method = urlparse(self.path).path.rsplit("/", 1)[-1]
+                    body, status = json.dumps(api._call(method, params)).encode("utf-8"), 200
+                self.send_response(status)
+                if status == 429:
+                    # Whole seconds, as Slack sends it
+                    self.send_header("Retry-After", str(int(api.retry_after)))
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond(dict(parse_qsl(urlparse(self.path).query)))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(body or "{}")
+                else:
+                    params = dict(parse_qsl(body))
+                self._respond({**dict(parse_qsl(urlparse(self.path).query)), **params})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeSlackApi":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--channel", default="C0000000001")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--burst", type=int, default=0)
+    args = parser.parse_args()
+    server = FakeSlackApi(port=args.port, burst=args.burst)
+    server.post_history(args.channel, args.messages)
+    server.start()
+    print(f"Fake Slack Web API listening on {server.url} with {args.messages} messages in {args.channel}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"calls={dict(server.calls)} rate_limited={server.rate_limited}")
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,104 @@
+"""
+Local stand-in for a Slack incoming webhook, for offline benchmarks.
+
+It records every payload it accepts and can be told to rate-limit: after
+`burst` accepted posts within one second it answers 429 with Retry-After,
+like Slack's one-message-per-second webhook limit. `error_rate` makes a
+fraction of posts fail with 503.
+
+    python benchmarks/fake_slack_webhook.py --port 8099
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeSlackWebhook:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, burst: int = 0, retry_after: float = 1.0,
+                 error_rate: float = 0.0, latency: float = 0.0, seed: int = 0):
+        self.burst = burst
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.latency = latency
+        self.payloads = []
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self._window_start = 0.0
+        self._window_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/services/T000/B000/XXXX"
+
+    def _decide(self) -> int:
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            if self.burst and self._window_count >= self.burst:
+                self.rate_limited += 1
+                return 429
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                return 503
+            self._window_count += 1
+            return 200
+
+    def _handler(self):
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if webhook.latency:
+                    time.sleep(webhook.latency)
+                status = webhook._decide()
+                if status == 200:
+                    with webhook._lock:
+                        webhook.payloads.append(json.loads(body))
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", str(webhook.retry_after))
+                text = {200: b"ok", 429: b"rate_limited", 503: b"service_unavailable"}[status]
+                self.send_header("Content-Length", str(len(text)))
+                self.end_headers()
+                self.wfile.write(text)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeSlackWebhook":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeSlackWebhook(port=args.port, burst=args.burst, error_rate=args.error_rate).start()
+    print(f"Fake Slack webhook listening on {server.url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"requests={server.requests} accepted={len(server.payloads)} "
+                  f"rate_limited={server.rate_limited} errors={server.errors}")
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,235 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Questions a single user may ask: sustained rate and burst
+USER_QUESTIONS_PER_MINUTE = float(os.getenv("USER_QUESTIONS_PER_MINUTE", "4"))
+USER_QUESTION_BURST = float(os.getenv("USER_QUESTION_BURST", "3"))
+# Questions a single channel may send to the pipeline, whoever asks them
+CHANNEL_QUESTIONS_PER_MINUTE = float(os.getenv("CHANNEL_QUESTIONS_PER_MINUTE", "30"))
+CHANNEL_QUESTION_BURST = float(os.getenv("CHANNEL_QUESTION_BURST", "10"))
+# Seconds a question over its channel's limit may wait for a token before it is turned away
+CHANNEL_OVERFLOW_WAIT_SECONDS = float(os.getenv("CHANNEL_OVERFLOW_WAIT_SECONDS", "10"))
+# In-flight questions whose word sets overlap at least this much share one computation. Off (0)
+# by default: only the same normalized question is shared, since overlapping word sets can still
+# ask different things ("deposit ETH to the vault" / "withdraw ETH from the vault" score 0.82)
+COALESCE_SIMILARITY = float(os.getenv("COALESCE_SIMILARITY", "0"))
+
+class RateLimiter:
+    """
+    Token buckets keyed by user or channel id. Each bucket holds up to `burst`
+    tokens and refills at `rate` tokens per second; buckets that have been
+    full for `idle_seconds` are forgotten so the table stays small.
+    """
+
+    def __init__(self, rate: float, burst: float, idle_seconds: float = 3600):
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = idle_seconds
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._last_prune = time.monotonic()
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def available(self, key: str, now: float) -> bool:
+        return self._tokens(key, now) >= 1.0
+
+    def take(self, key: str, now: float):
+        self._buckets[key] = (self._tokens(key, now) - 1.0, now)
+        if now - self._last_prune > self.idle_seconds:
+            self._last_prune = now
+            self._buckets = {k: (tokens, updated) for k, (tokens, updated) in self._buckets.items()
+                             if self._tokens(k, now) < self.burst}
+
+    def wait_time(self, key: str, now: float) -> float:
+        """Seconds until the bucket holds a token again"""
+        missing = 1.0 - self._tokens(key, now)
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+    def usage(self, key: str, now: float) -> float:
+        """Tokens missing from the bucket; 0 for anyone who has not asked recently"""
+        return self.burst - self._tokens(key, now)
+
+# Outcomes of AdmissionController.admit
+ADMITTED = "admitted"
+USER_LIMITED = "user_limited"
+CHANNEL_BUSY = "channel_busy"
+
+class AdmissionController:
+    """
+    Decides whether a question may enter the answer pipeline. A question
+    needs a token from both its user's and its channel's bucket; nothing is
+    taken from either when one of them is empty.
+
+    Only a user flooding on their own is dropped outright. A question that
+    finds its channel's bucket empty waits up to `overflow_wait` seconds for
+    a token, so a busy channel slows down instead of losing questions, and
+    is then let in to wait for a slot by priority like any other; past that
+    it is turned away as busy, for the caller to tell the asker.
+    """
+
+    def __init__(self, user_limiter: RateLimiter, channel_limiter: RateLimiter,
+                 overflow_wait: float = CHANNEL_OVERFLOW_WAIT_SECONDS):
+        self.user_limiter = user_limiter
+        self.channel_limiter = channel_limiter
+        self.overflow_wait = overflow_wait
+        self.admitted = 0
+        self.waited_channel = 0
+        self.rejected_user = 0
+        self.rejected_channel = 0
+        self._lock = threading.Lock()
+
+    def _try_admit(self, user_id: str, channel_id: str, now: float) -> Tuple[Optional[str], float]:
+        """The outcome, or None and the seconds until the channel has a token again"""
+        with self._lock:
+            if not self.user_limiter.available(user_id, now):
+                self.rejected_user += 1
+                return USER_LIMITED, 0.0
+            if not self.channel_limiter.available(channel_id, now):
+                return None, self.channel_limiter.wait_time(channel_id, now)
+            self.user_limiter.take(user_id, now)
+            self.channel_limiter.take(channel_id, now)
+            self.admitted += 1
+            return ADMITTED, 0.0
+
+    async def admit(self, user_id: str, channel_id: str) -> str:
+        """ADMITTED, USER_LIMITED, or CHANNEL_BUSY once the channel stayed full for `overflow_wait` seconds"""
+        give_up = time.monotonic() + self.overflow_wait
+        waited = False
+        while True:
+            now = time.monotonic()
+            outcome, wait = self._try_admit(user_id, channel_id, now)
+            if outcome is not None:
+                if waited and outcome == ADMITTED:
+                    with self._lock:
+                        self.waited_channel += 1
+                return outcome
+            if now + wait > give_up:
+                with self._lock:
+                    self.rejected_channel += 1
+                return CHANNEL_BUSY
+            waited = True
+            # Waiters woken together race for the token; the others sleep again
+            await asyncio.sleep(wait)
+
+    def priority(self, user_id: str) -> float:
+        """Lower goes first: first-time and occasional askers ahead of users who keep asking"""
+        with self._lock:
+            return self.user_limiter.usage(user_id, time.monotonic())
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "waited_channel": self.waited_channel,
+            "rejected_user": self.rejected_user,
+            "rejected_channel": self.rejected_channel,
+        }
+
+class PriorityGate:
+    """
+    Concurrency limit whose waiters are let in lowest priority first (FIFO
+    among equals) instead of in arrival order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: float = 0.0):
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: float):
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we were cancelled; pass it on
+                self._release()
+            else:
+                future.cancel()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot straight to the next waiter
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+class SingleFlight:
+    """
+    Runs one computation per in-flight key; concurrent callers with the same
+    key, or with a key whose word-set Jaccard similarity reaches
+    `similarity`, await that computation instead of starting their own.
+    A caller that is cancelled does not cancel the shared computation.
+    """
+
+    def __init__(self, similarity: float = 0.0):
+        self.similarity = similarity
+        self.started = 0
+        self.coalesced = 0
+        self._flights: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def _similar(self, scope: str, key: str) -> Optional[asyncio.Task]:
+        words = set(key.split())
+        best, best_score = None, self.similarity
+        for (flight_scope, flight_key), task in self._flights.items():
+            if flight_scope != scope:
+                continue
+            flight_words = set(flight_key.split())
+            union = words | flight_words
+            score = len(words & flight_words) / len(union) if union else 0.0
+            if score >= best_score:
+                best, best_score = task, score
+        return best
+
+    async def run(self, key: str, compute: Callable[[], Awaitable], scope: str = ""):
+        task = self._flights.get((scope, key))
+        if task is None and self.similarity > 0 and key:
+            task = self._similar(scope, key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._flights[(scope, key)] = task
+            task.add_done_callback(lambda done: self._forget((scope, key), done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, flight: Tuple[str, str], task: asyncio.Task):
+        if self._flights.get(flight) is task:
+            del self._flights[flight]
+
+    def stats(self) -> dict:
+        return {"started": self.started, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+admission = AdmissionController(
+    RateLimiter(USER_QUESTIONS_PER_MINUTE / 60.0, USER_QUESTION_BURST),
+    RateLimiter(CHANNEL_QUESTIONS_PER_MINUTE / 60.0, CHANNEL_QUESTION_BURST),
+)
@@ -0,0 +1,190 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from normalize import normalize_query
+
+ANSWER_CACHE_DB = "answer_cache.db"
+
+class AnswerCache:
+    """
+    LRU cache of answers keyed on the normalized query, with a TTL per entry.
+
+    Entries are dropped wholesale whenever the Slack memory or knowledge
+    revision moves, so a cached answer never outlives the context it was
+    built from. With a fuzzy threshold > 0, a miss falls back to the cached
+    query with the highest word-set Jaccard similarity above the threshold.
+    """
+
+    def __init__(self, memory_store, knowledge_store, max_entries: int = 512, ttl_seconds: float = 3600,
+                 fuzzy_threshold: float = 0.0):
+        self.memory_store = memory_store
+        self.knowledge_store = knowledge_store
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy_threshold = fuzzy_threshold
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._revisions = None
+        self._lock = threading.Lock()
+
+    def _current_revisions(self) -> Tuple[int, int]:
+        self.knowledge_store.refresh()
+        self.memory_store.refresh()
+        return self.memory_store.revision, self.knowledge_store.revision
+
+    def _validate(self):
+        revisions = self._current_revisions()
+        if revisions != self._revisions:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._revisions = revisions
+
+    def _fuzzy_key(self, key: str) -> Optional[str]:
+        words = set(key.split())
+        best_key, best_score = None, self.fuzzy_threshold
+        for candidate in self._entries:
+            candidate_words = set(candidate.split())
+            union = words | candidate_words
+            score = len(words & candidate_words) / len(union) if union else 0.0
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def get(self, query: str) -> Optional[dict]:
+        key = normalize_query(query)
+        with self._lock:
+            self._validate()
+            if key not in self._entries and self.fuzzy_threshold > 0:
+                key = self._fuzzy_key(key) or key
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, query: str, result: dict):
+        key = normalize_query(query)
+        if not key:
+            return
+        with self._lock:
+            self._validate()
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "invalidations": self.invalidations,
+        }
+
+class SharedAnswerCache:
+    """
+    Answer cache in a SQLite database in WAL mode, shared by every bot shard.
+
+    Each entry records the memory and knowledge fingerprints it was built
+    from; a lookup only matches entries built from the content this process
+    currently holds, so shards never serve answers from stale context.
+    Outdated and expired rows are pruned every `prune_every` writes, and the
+    oldest rows beyond `max_entries` per namespace go with them. Fuzzy
+    matching is not supported here.
+    """
+
+    def __init__(self, memory_store, knowledge_store, namespace: str, path: str = ANSWER_CACHE_DB,
+                 max_entries: int = 4096, ttl_seconds: float = 3600, prune_every: int = 256):
+        self.memory_store = memory_store
+        self.knowledge_store = knowledge_store
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                   namespace TEXT NOT NULL,
+                   key TEXT NOT NULL,
+                   version TEXT NOT NULL,
+                   expires_at REAL NOT NULL,
+                   result TEXT NOT NULL,
+                   PRIMARY KEY (namespace, key)
+               ) WITHOUT ROWID"""
+        )
+
+    def _version(self) -> str:
+        self.memory_store.refresh()
+        return f"{self.memory_store.fingerprint()}/{self.knowledge_store.fingerprint()}"
+
+    def get(self, query: str) -> Optional[dict]:
+        key = normalize_query(query)
+        version = self._version()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM answers WHERE namespace = ? AND key = ? AND version = ? AND expires_at > ?",
+                (self.namespace, key, version, time.time()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, query: str, result: dict):
+        key = normalize_query(query)
+        if not key:
+            return
+        version = self._version()
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO answers (namespace, key, version, expires_at, result) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (namespace, key) DO UPDATE SET
+                       version = excluded.version, expires_at = excluded.expires_at, result = excluded.result""",
+                (self.namespace, key, version, time.time() + self.ttl_seconds, json.dumps(result)),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune(version)
+
+    def _prune(self, version: str):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM answers WHERE namespace = ? AND (version != ? OR expires_at <= ?)",
+                               (self.namespace, version, time.time()))
+            self._conn.execute(
+                """DELETE FROM answers WHERE namespace = ? AND key IN (
+                       SELECT key FROM answers WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)""",
+                (self.namespace, self.namespace, self.max_entries),
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            size = self._conn.execute("SELECT count(*) FROM answers WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size,
+        }
@@ -1,69 +1,205 @@
 import os
+import time
+
+# Start of the current startup phase; see _startup_phase
+_startup_clock = time.perf_counter()
+
 import asyncio
 import discord
-import threading
 import logging
 from discord.ext import commands
+from typing import Optional
 from dotenv import load_dotenv
-from crew import get_answer_with_fallback, reprocess_unanswered_and_notify, periodic_recheck_unanswered
+from crew import aget_answer_with_fallback, astream_answer_with_fallback, reprocess_unanswered_and_notify, periodic_recheck_unanswered, warm_up
 from memory import update_global_memory
-from slack_fallback import notify_slack
+from namespaces import load_router
+from admission import CHANNEL_BUSY, USER_LIMITED, admission
 from slack_handler import start_slack_handler
+from telemetry import METRICS_PORT, telemetry
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _startup_phase(phase: str):
+    """Record the time since the previous phase ended as `phase`"""
+    global _startup_clock
+    now = time.perf_counter()
+    telemetry.record_startup(phase, now - _startup_clock)
+    _startup_clock = now
+
+_startup_phase("imports")
+
 load_dotenv()
 
 DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-ALLOWED_CHANNEL_ID = "1355067647292866622"
+# Only used when config/channels.yaml routes no Discord channels
+ALLOWED_CHANNEL_ID = os.getenv("ALLOWED_CHANNEL_ID", "1355067647292866622")
+
+# Which channels the bot answers in, and the knowledge/memory namespace of each
+router = load_router(fallback_channel_id=ALLOWED_CHANNEL_ID, fallback_slack_channel_id=os.getenv("SLACK_CHANNEL_ID"))
+
+# Sharding: SHARD_COUNT shards in total, of which this process runs SHARD_IDS
+# (comma separated, default all). Without SHARD_COUNT Discord picks the count.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()] or None
+# Only one process of a multi-process deployment runs the recheck loop and Slack ingestion
+RUN_BACKGROUND_JOBS = os.getenv("RUN_BACKGROUND_JOBS", "1") == "1"
+
+# Post a placeholder and edit it as the answer streams in, instead of replying once it is scored
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "0") == "1"
+# Discord allows about 5 message edits per 5 seconds per channel; stay under it
+STREAM_EDIT_INTERVAL_SECONDS = float(os.getenv("STREAM_EDIT_INTERVAL_SECONDS", "1.2"))
+STREAM_PLACEHOLDER = "…"
+# Reply to a question turned away because its channel stayed over its limit
+BUSY_REPLY = "I'm answering a lot of questions right now, please ask again in a minute."
 
 # Set up the bot with minimal intents needed
 intents = discord.Intents.default()
 intents.message_content = True
 
 # Initialize the bot without a command prefix
-bot = discord.Client(intents=intents)
+bot = discord.AutoShardedClient(intents=intents, shard_count=SHARD_COUNT,
+                                shard_ids=SHARD_IDS if SHARD_COUNT else None)
+
+_startup_phase("setup")
+
+# on_ready fires again after every reconnect; background jobs must start only once
+_background_tasks = []
+_metrics_runner = None
+_warm_up_task = None
+
+async def _warm_up():
+    """Build indexes and clients off the event loop, then log the startup breakdown"""
+    steps = await asyncio.to_thread(warm_up, router.namespaces())
+    _startup_phase("warm_up")
+    for step, seconds in steps.items():
+        telemetry.record_startup(f"warm_up_{step}", seconds)
+    phases = dict(telemetry.startup)
+    ready = sum(phases.get(phase, 0.0) for phase in ("imports", "setup", "gateway"))
+    logger.info(f"Startup: ready after {ready:.2f}s (imports {phases.get('imports', 0):.2f}s, "
+                f"setup {phases.get('setup', 0):.2f}s, gateway {phases.get('gateway', 0):.2f}s), "
+                f"warmed up {phases['warm_up']:.2f}s later ("
+                + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in steps.items()) + ")")
 
 @bot.event
 async def on_ready():
-    logger.info(f"Untitled Bank Bot is ready! Logged in as {bot.user}")
+    global _metrics_runner, _warm_up_task
+    logger.info(f"Untitled Bank Bot is ready! Logged in as {bot.user} (shards {sorted(bot.shards)} of {bot.shard_count})")
+    if _warm_up_task is None:
+        _startup_phase("gateway")
+        _warm_up_task = asyncio.create_task(_warm_up())
+    # Every process serves its own metrics, background jobs or not
+    if METRICS_PORT and _metrics_runner is None:
+        try:
+            _metrics_runner = await telemetry.serve()
+        except OSError as e:
+            logger.error(f"Failed to start metrics endpoint on port {METRICS_PORT}: {e}")
+            _metrics_runner = False
+    if not RUN_BACKGROUND_JOBS or _background_tasks:
+        return
     # Start the periodic recheck of unanswered questions
-    bot.loop.create_task(periodic_recheck_unanswered())
-    
+    _background_tasks.append(bot.loop.create_task(periodic_recheck_unanswered(router.namespaces())))
+
     try:
-        # Start Slack handler in a separate thread
-        slack_thread = threading.Thread(target=start_slack_handler, daemon=True)
-        slack_thread.start()
-        logger.info("Slack handler thread started")
+        # Slack ingestion runs on this event loop
+        await start_slack_handler()
     except Exception as e:
         logger.error(f"Failed to start Slack handler: {e}")
 
+def _uncertain_reply(message: discord.Message) -> str:
+    return f"Hi {message.author.mention}, thanks for your question about Untitled Bank. I'll need to check on that and get back to you shortly!"
+
+class ProgressiveReply:
+    """
+    A reply message that is posted once and then edited as text streams in.
+    Edits are spaced at least `interval` seconds apart; text arriving in
+    between is held back and only the latest version is sent.
+    """
+
+    def __init__(self, channel, interval: float = STREAM_EDIT_INTERVAL_SECONDS):
+        self.channel = channel
+        self.interval = interval
+        self.message: Optional[discord.Message] = None
+        self.shown = ""
+        self.edits = 0
+        self._last_edit = 0.0
+
+    async def update(self, text: str):
+        text = text.strip() or STREAM_PLACEHOLDER
+        if self.message is None:
+            self.message = await self.channel.send(text)
+            self.shown, self._last_edit = text, time.monotonic()
+        elif text != self.shown and time.monotonic() - self._last_edit >= self.interval:
+            await self._edit(text)
+
+    async def finish(self, text: str):
+        """Show the final text, waiting out the edit interval if needed"""
+        if self.message is None:
+            self.message = await self.channel.send(text)
+            self.shown = text
+            return
+        if text == self.shown:
+            return
+        wait = self._last_edit + self.interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await self._edit(text)
+
+    async def _edit(self, text: str):
+        await self.message.edit(content=text)
+        self.shown, self._last_edit = text, time.monotonic()
+        self.edits += 1
+
+async def stream_reply(message: discord.Message, query: str, user_id: str, namespace: str):
+    """Stream the answer into a placeholder, then amend or retract it once it is scored"""
+    reply = ProgressiveReply(message.channel)
+    async for kind, payload in astream_answer_with_fallback(query, user_id, namespace):
+        if kind == "partial":
+            await reply.update(payload)
+            continue
+        if payload.get("uncertain"):
+            await reply.finish(_uncertain_reply(message))
+        else:
+            await reply.finish(payload.get("answer") or STREAM_PLACEHOLDER)
+
 @bot.event
 async def on_message(message: discord.Message):
     # Ignore messages from bots (including itself)
     if message.author.bot:
         return
 
-    # Check if the message is in the allowed channel
-    if str(message.channel.id) != ALLOWED_CHANNEL_ID:
+    # Check if the message is in a routed channel
+    namespace = router.route(message.guild.id if message.guild else None, message.channel.id)
+    if namespace is None:
         return
 
     query = message.content
     user_id = str(message.author.id)
 
+    # Drop floods from one user; a busy channel waits a little, then says so
+    outcome = await admission.admit(user_id, str(message.channel.id))
+    if outcome == USER_LIMITED:
+        logger.info(f"Rate limited question from {user_id} in {message.channel.id}")
+        return
+    if outcome == CHANNEL_BUSY:
+        logger.info(f"Channel {message.channel.id} busy, turned away question from {user_id}")
+        await message.channel.send(BUSY_REPLY)
+        return
+
+    if STREAM_ANSWERS:
+        await stream_reply(message, query, user_id, namespace)
+        return
+
     # Optional: Add typing indicator to make it feel more natural
     async with message.channel.typing():
-        # Process the query and check for a confident answer
-        result = get_answer_with_fallback(query, user_id)
+        # Process the query without blocking other Discord events
+        result = await aget_answer_with_fallback(query, user_id, namespace)
 
         if result.get("uncertain"):
-            reply = f"Hi {message.author.mention}, thanks for your question about Untitled Bank. I'll need to check on that and get back to you shortly!"
-            await message.channel.send(reply)
-            # Notify Slack without storing in memory
-            notify_slack(f"New question from Discord: {query}")
+            await message.channel.send(_uncertain_reply(message))
         else:
             await message.channel.send(result.get("answer"))
 
-bot.run(DISCORD_BOT_TOKEN)
+if __name__ == "__main__":
+    bot.run(DISCORD_BOT_TOKEN)
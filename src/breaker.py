@@ -0,0 +1,158 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failed LLM calls that open the breaker
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+# Seconds the breaker stays open before one call is let through as a probe
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+# A stage left with less time than this is skipped instead of started
+MIN_STAGE_SECONDS = 0.05
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+class BreakerOpen(Exception):
+    """The LLM is considered down; no call was made"""
+
+class DeadlineExceeded(Exception):
+    """The question's deadline left no time for this stage; no call was made"""
+
+class CircuitBreaker:
+    """
+    Stops calling the LLM after `failures` calls in a row failed or timed
+    out, so questions fall back to retrieval-only answers at once instead of
+    each waiting for its own timeout.
+
+    After `cooldown` seconds the breaker half-opens and lets one call through
+    as a probe: success closes it, failure opens it for another cooldown.
+    `on_change(old, new)` runs on every transition, outside the lock.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SECONDS,
+                 on_change: Optional[Callable[[str, str], None]] = None):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.on_change = on_change
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._consecutive = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set(self, state: str) -> Optional[tuple]:
+        if state == self.state:
+            return None
+        old, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+        return old, state
+
+    def _notify(self, change: Optional[tuple]):
+        if change is None:
+            return
+        logger.warning(f"LLM circuit breaker {change[0]} -> {change[1]}")
+        if self.on_change is not None:
+            try:
+                self.on_change(*change)
+            except Exception as e:
+                logger.error(f"Error in circuit breaker callback: {e}")
+
+    def available(self) -> bool:
+        """Whether a call would be let through now, without claiming the probe"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.cooldown
+            return not (self.state == HALF_OPEN and self._probing)
+
+    def _acquire(self) -> bool:
+        """Claim a call; returns whether it is the half-open probe"""
+        change = None
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                change = self._set(HALF_OPEN)
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+                self.rejected += 1
+                raise BreakerOpen("LLM circuit breaker is open")
+            probe = self.state == HALF_OPEN
+            self._probing = self._probing or probe
+        self._notify(change)
+        return probe
+
+    def _record(self, ok: bool, probe: bool):
+        with self._lock:
+            if probe:
+                self._probing = False
+            if ok:
+                self._consecutive = 0
+                change = self._set(CLOSED) if self.state == HALF_OPEN else None
+            else:
+                self._consecutive += 1
+                change = None
+                if probe or (self.state == CLOSED and self._consecutive >= self.failures):
+                    change = self._set(OPEN)
+        self._notify(change)
+
+    @contextmanager
+    def call(self):
+        """Guard one LLM call; raises BreakerOpen without running the block while open"""
+        probe = self._acquire()
+        try:
+            yield
+        except GeneratorExit:
+            # A stream abandoned by its reader says nothing about the LLM
+            if probe:
+                with self._lock:
+                    self._probing = False
+            raise
+        except BaseException:
+            # Errors and timeouts, including a deadline cancelling the call, count against the LLM
+            self._record(False, probe)
+            raise
+        else:
+            self._record(True, probe)
+
+class Deadline:
+    """
+    Time budget of one question. Each stage may spend its share of the
+    whole budget, capped by its own timeout and by what is left.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def budget(self, share: float, timeout: float) -> float:
+        """Seconds the next stage may take; raises DeadlineExceeded when too little is left"""
+        seconds = min(timeout, share * self.seconds, self.remaining())
+        if seconds < MIN_STAGE_SECONDS:
+            raise DeadlineExceeded(f"{self.remaining():.2f}s left of the {self.seconds:.0f}s deadline")
+        return seconds
+
+_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline(seconds: float):
+    """Run the block under a question deadline; tasks and asyncio.to_thread workers started inside inherit it"""
+    token = _deadline.set(Deadline(seconds))
+    try:
+        yield _deadline.get()
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            pass
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
@@ -0,0 +1,225 @@
+import os
+import re
+import math
+import random
+import threading
+from typing import Dict, List, Optional
+
+import yaml
+
+from normalize import normalize_query
+
+CASUAL_EXAMPLES_FILE = os.path.join("config", "casual_examples.yaml")
+
+# Greeting, thanks and slang words, once slang is expanded ("gm" -> "good morning");
+# small talk has at least one of them
+CASUAL_MARKERS = frozenset("""
+hi hello hey heya yo sup howdy hiya wassup morning afternoon evening night gn
+thanks thank thx ty tysm appreciate appreciated
+lol lmao rofl haha hahaha lmfao nice cool awesome love lfg moon bullish
+bye cya gg wow welcome
+""".split())
+# Words that make up pure small talk together with a marker. No question or
+# function words: "is it up?", "how" or "is this a scam" are product questions.
+CASUAL_VOCABULARY = CASUAL_MARKERS | frozenset("""
+good great so much very a lot bot see ya later take care have day
+everyone all guys team frens fren fam folks sir glad be here ok okay yes yeah yep
+""".split())
+
+def _all_casual(words: List[str]) -> bool:
+    """Only small talk vocabulary, with at least one greeting, thanks or slang word"""
+    return (all(word in CASUAL_VOCABULARY for word in words)
+            and any(word in CASUAL_MARKERS for word in words))
+
+# Domain terms that mark a message as a product question on their own
+PRODUCT_TERMS = [
+    "withdraw", "deposit", "wallet", "airdrop", "tge", "point", "card", "twitter", "transaction",
+    "error", "fail", "stuck", "can't", "cannot", "not working", "borrow", "lend", "loan", "repay",
+    "collateral", "liquidation", "liquidated", "leverage", "multiply", "bundle", "apy", "apr", "rate", "fee",
+    "token", "asset", "market", "liquidity", "core bank", "custom bank", "dao", "vote", "risk",
+    "audit", "stake", "staking", "claim", "referral", "ticket", "chain", "bridge", "position", "fund", "money",
+    "governance", "app", "website", "docs", "account",
+    # Status and security questions
+    "down", "outage", "maintenance", "paused", "scam", "legit", "phishing", "hack", "official",
+]
+_PRODUCT_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(term) for term in PRODUCT_TERMS) + r")(?:s|es|ed|ing|al)?\b"
+)
+
+# Intent patterns over the normalized message, checked in order
+INTENT_PATTERNS = [
+    ("morning", re.compile(r"\bgood morning\b|^morning\b")),
+    ("night", re.compile(r"\bgood night\b|\bgn\b")),
+    ("thanks", re.compile(r"\b(?:thanks|thank you|thx|ty|tysm|appreciate)")),
+    ("laugh", re.compile(r"\b(?:lo+l|lmf?ao|rofl|(?:ha){2,}h?)\b")),
+    ("hype", re.compile(r"\b(?:we are going to make it|lfg|moon|bullish)\b")),
+    ("farewell", re.compile(r"\b(?:bye|cya|see ya|take care)\b")),
+    ("greeting", re.compile(r"\b(?:hi|hello|hey|heya|hiya|yo|sup|howdy|wassup|what's up|whats up)\b")),
+]
+
+CASUAL_TEMPLATES = {
+    "morning": [
+        "gm! ☀️ Hope your day is off to a great start. Anything I can help you with?",
+        "Good morning! ☕ Ready when you are if you have questions about Untitled Bank.",
+        "gm gm! 🌞 What can I do for you today?",
+    ],
+    "night": [
+        "gn! 🌙 Rest up, the markets will still be here tomorrow.",
+        "Good night! 😴 Ping me anytime if you have questions.",
+    ],
+    "thanks": [
+        "Anytime! 🙌 Happy to help.",
+        "You're welcome! 😊 Let me know if anything else comes up.",
+        "Glad I could help! 💙",
+    ],
+    "laugh": [
+        "😄 Glad you're having fun!",
+        "Haha, love the energy! 😂",
+    ],
+    "hype": [
+        "WAGMI! 🚀",
+        "LFG! 🔥 Glad to have you here.",
+    ],
+    "farewell": [
+        "See you around! 👋",
+        "Take care! Come back anytime you have questions. 👋",
+    ],
+    "greeting": [
+        "Hey there! 👋 How can I help you today?",
+        "Hi! 😊 Ask me anything about Untitled Bank.",
+        "Hello! 👋 What can I do for you?",
+    ],
+    "emoji": [
+        "🙌",
+        "😄👋",
+    ],
+}
+
+def _features(query: str) -> List[str]:
+    text = normalize_query(query)
+    words = text.split()
+    features = ["bias", f"len:{min(len(words), 6)}"]
+    features += [f"w:{word}" for word in words]
+    features += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    if "?" in query:
+        features.append("question_mark")
+    if not words:
+        features.append("no_words")
+    if words and _all_casual(words):
+        features.append("all_casual_words")
+    if _PRODUCT_PATTERN.search(text):
+        features.append("product_term")
+    return features
+
+class LinearCasualModel:
+    """Logistic regression over sparse word, bigram and shape features, trained with plain SGD"""
+
+    def __init__(self):
+        self.weights: Dict[str, float] = {}
+
+    def probability(self, query: str) -> float:
+        z = sum(self.weights.get(feature, 0.0) for feature in _features(query))
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def fit(self, examples: List[tuple], epochs: int = 40, learning_rate: float = 0.3, l2: float = 1e-3,
+            seed: int = 0) -> "LinearCasualModel":
+        rng = random.Random(seed)
+        data = [(_features(text), label) for text, label in examples]
+        for _ in range(epochs):
+            rng.shuffle(data)
+            for features, label in data:
+                z = sum(self.weights.get(feature, 0.0) for feature in features)
+                error = label - 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+                for feature in features:
+                    weight = self.weights.get(feature, 0.0)
+                    self.weights[feature] = weight + learning_rate * (error - l2 * weight)
+        return self
+
+def load_examples(path: str = CASUAL_EXAMPLES_FILE) -> List[tuple]:
+    with open(path, "r", encoding="utf-8") as f:
+        labeled = yaml.safe_load(f)
+    return ([(text, 1.0) for text in labeled.get("casual", [])] +
+            [(text, 0.0) for text in labeled.get("product", [])])
+
+class CasualClassifier:
+    """
+    Local pre-classifier in front of the casual/product LLM call.
+
+    Small talk made only of greeting/slang vocabulary is casual, a message
+    with a domain term is a product question, and anything else goes to the
+    linear model: probabilities outside (`product_below`, `casual_above`)
+    are decided locally and only the band in between returns None so the
+    caller asks the LLM. Casual replies come from rotating templates.
+    """
+
+    def __init__(self, model: LinearCasualModel, casual_above: float = 0.8, product_below: float = 0.2):
+        self.model = model
+        self.casual_above = casual_above
+        self.product_below = product_below
+        self.decided_casual = 0
+        self.decided_product = 0
+        self.ambiguous = 0
+        self.llm_calls_avoided = 0
+        self._rotation: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _decide(self, query: str) -> Optional[str]:
+        text = normalize_query(query)
+        words = text.split()
+        if not words or _all_casual(words):
+            return "casual"
+        if _PRODUCT_PATTERN.search(text):
+            return "product"
+        probability = self.model.probability(query)
+        if probability >= self.casual_above:
+            return "casual"
+        if probability <= self.product_below:
+            return "product"
+        return None
+
+    def classify(self, query: str) -> Optional[str]:
+        """Return "casual", "product", or None when the LLM should decide"""
+        decision = self._decide(query)
+        with self._lock:
+            if decision == "casual":
+                self.decided_casual += 1
+            elif decision == "product":
+                self.decided_product += 1
+            else:
+                self.ambiguous += 1
+        return decision
+
+    def intent(self, query: str) -> Optional[str]:
+        text = normalize_query(query)
+        if not text:
+            return "emoji"
+        for intent, pattern in INTENT_PATTERNS:
+            if pattern.search(text):
+                return intent
+        return None
+
+    def template_reply(self, query: str) -> Optional[str]:
+        """Next canned reply for the message's intent, or None if no template fits"""
+        intent = self.intent(query)
+        if intent is None:
+            return None
+        templates = CASUAL_TEMPLATES[intent]
+        with self._lock:
+            position = self._rotation.get(intent, 0)
+            self._rotation[intent] = position + 1
+        return templates[position % len(templates)]
+
+    def record_avoided(self, calls: int = 1):
+        with self._lock:
+            self.llm_calls_avoided += calls
+
+    def stats(self) -> dict:
+        return {
+            "decided_casual": self.decided_casual,
+            "decided_product": self.decided_product,
+            "ambiguous": self.ambiguous,
+            "llm_calls_avoided": self.llm_calls_avoided,
+        }
+
+def build_classifier(path: str = CASUAL_EXAMPLES_FILE) -> CasualClassifier:
+    return CasualClassifier(LinearCasualModel().fit(load_examples(path)))
@@ -0,0 +1,147 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from context_packer import content_words
+
+# 0 always asks the LLM grader, as before
+LOCAL_GRADER = os.getenv("LOCAL_GRADER", "1") != "0"
+# Local scores inside [low, high) are unsure and go to the LLM grader
+GRADE_BAND_LOW = float(os.getenv("GRADE_BAND_LOW", "0.35"))
+GRADE_BAND_HIGH = float(os.getenv("GRADE_BAND_HIGH", "0.8"))
+# Sensitive questions need this much more before they skip the grader
+SENSITIVE_MARGIN = float(os.getenv("GRADE_SENSITIVE_MARGIN", "0.1"))
+
+# Topics where a wrong answer can cost users money, checked on the question and the answer
+SENSITIVE_PATTERN = re.compile(
+    r"\b(?:fund|withdraw|deposit|token|airdrop|tge|claim|wallet|seed phrase|private key|"
+    r"liquidat|collateral|loan|repay|bridge|stake|staking|reward|point|money|lost|stolen|hack|scam|refund)",
+    re.IGNORECASE,
+)
+# Answers that say the context does not cover the question
+REFUSAL_PATTERN = re.compile(
+    r"\b(?:i don'?t know|i'?m not sure|not sure|no information|not mentioned|doesn'?t (?:say|mention|specify)|"
+    r"does not (?:say|mention|specify)|not (?:specified|provided|available) in|unable to (?:find|answer)|"
+    r"can'?t (?:find|answer)|cannot (?:find|answer)|contact (?:support|the team))",
+    re.IGNORECASE,
+)
+# Figures and links must come from the context; an invented one is the costliest mistake
+_FACT = re.compile(r"https?://\S+|\$?\d[\d,.]*%?")
+_TRAILING = "./-%$,"
+
+# Decimal, percentage or "n/10" in a grader reply
+_GRADE = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?|\.\d+)\s*(%|/\s*10\b|out of 10\b)?")
+# The same, named as the grade: "Confidence: 0.8", "score of 0.9", "I'd rate this 0.8"
+_LABELLED_GRADE = re.compile(
+    r"\b(?:confidence|score|rating|rate(?:\s+(?:this|it))?)\s*(?:is|of|at|:|=)?\s*"
+    r"(\d+(?:\.\d+)?|\.\d+)\s*(%|/\s*10\b|out of 10\b)?",
+    re.IGNORECASE,
+)
+# "1. Answer Accuracy": numbered list items echoing the grading criteria
+_LIST_MARKER = re.compile(r"^\s*\d+[.)]\s", re.MULTILINE)
+
+def parse_confidence(response: str) -> Optional[float]:
+    """
+    Confidence in a grader reply such as "0.8", "Confidence: 0.85.", "85%",
+    "8/10" or "1. Accuracy: good\nScore: 0.9", clamped to [0, 1].
+
+    A number named as the confidence, score or rating wins, the last one if
+    several are; otherwise the reply must hold exactly one number. None for
+    replies without a number or with several unnamed ones, such as a chatty
+    reply cut off by max_tokens, so they never pass for a grade.
+    """
+    text = _LIST_MARKER.sub(" ", response or "")
+    labelled = _LABELLED_GRADE.findall(text)
+    if labelled:
+        number, unit = labelled[-1]
+    else:
+        candidates = _GRADE.findall(text)
+        if len(candidates) != 1:
+            return None
+        number, unit = candidates[0]
+    value = float(number)
+    if unit == "%":
+        value /= 100
+    elif unit:
+        value /= 10
+    elif value > 1 and value <= 10:
+        value /= 10
+    elif value > 10:
+        value /= 100
+    return min(1.0, max(0.0, value))
+
+def _stem(word: str) -> str:
+    word = word.rstrip(_TRAILING)
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+def _words(text: str) -> set:
+    """Content words with plural "s" dropped, so "deposits" in an answer supports "deposit" in the context"""
+    return {_stem(word) for word in content_words(text)} - {""}
+
+@dataclass
+class LocalScore:
+    confidence: float
+    retrieval: float
+    support: float
+    coverage: float
+    sensitive: bool
+    refusal: bool
+    unsupported_facts: int
+    uncertain: bool
+
+class ConfidenceScorer:
+    """
+    Estimates how safe an answer is to post from what retrieval already
+    produced, without another LLM call.
+
+    The score blends the best retrieval score of the context, the share of
+    the answer's content words found in the context (support) and the share
+    of the question's content words the context covers. Figures or links in
+    the answer that are not in the context, and answers that say the context
+    does not cover the question, pull it down. Sensitive topics (funds,
+    tokens, airdrops) must clear a higher bar. Scores inside the band
+    [low, high) are marked uncertain; only those need the LLM grader.
+    """
+
+    def __init__(self, low: float = GRADE_BAND_LOW, high: float = GRADE_BAND_HIGH,
+                 sensitive_margin: float = SENSITIVE_MARGIN, weights: Tuple[float, float, float] = (0.3, 0.5, 0.2)):
+        self.low = low
+        self.high = high
+        self.sensitive_margin = sensitive_margin
+        self.weights = weights
+
+    def score(self, query: str, answer: str, source_info: List[Tuple[str, float, str]]) -> LocalScore:
+        context = "\n".join(info[0] for info in source_info)
+        context_lower = context.lower()
+        sensitive = bool(SENSITIVE_PATTERN.search(query) or SENSITIVE_PATTERN.search(answer))
+        refusal = bool(REFUSAL_PATTERN.search(answer))
+
+        retrieval = max((min(1.0, max(0.0, float(info[1]))) for info in source_info), default=0.0)
+        answer_words, context_words, query_words = _words(answer), _words(context), _words(query)
+        support = len(answer_words & context_words) / len(answer_words) if answer_words else 0.0
+        coverage = len(query_words & context_words) / len(query_words) if query_words else 1.0
+        facts = {fact.rstrip(_TRAILING) for fact in _FACT.findall(answer.lower())} - {""}
+        unsupported_facts = sum(1 for fact in facts if fact not in context_lower)
+
+        w_retrieval, w_support, w_coverage = self.weights
+        confidence = w_retrieval * retrieval + w_support * support + w_coverage * coverage
+        if unsupported_facts:
+            confidence -= 0.25 * min(2, unsupported_facts)
+        if refusal or not answer.strip() or not source_info:
+            confidence = min(confidence, 0.1)
+        confidence = min(1.0, max(0.0, confidence))
+
+        high = self.high + (self.sensitive_margin if sensitive else 0.0)
+        return LocalScore(
+            confidence=confidence,
+            retrieval=retrieval,
+            support=support,
+            coverage=coverage,
+            sensitive=sensitive,
+            refusal=refusal,
+            unsupported_facts=unsupported_facts,
+            uncertain=self.low <= confidence < high,
+        )
+
+confidence_scorer = ConfidenceScorer()
@@ -0,0 +1,151 @@
+import os
+import re
+import logging
+import threading
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens the retrieved context may take in the answer prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "300"))
+# Prompt tokens of context sent along with the answer to be graded
+GRADE_CONTEXT_TOKEN_BUDGET = int(os.getenv("GRADE_CONTEXT_TOKEN_BUDGET", "200"))
+# "tiktoken" counts exactly when the encoding is available, "approx" never loads it
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "tiktoken").strip().lower()
+# A truncated excerpt shorter than this is dropped instead of sent
+MIN_EXCERPT_TOKENS = 12
+
+# Excerpts are lines of a knowledge section or the " | "-joined messages of a memory match
+_EXCERPT_SPLIT = re.compile(r"\s*\n\s*|\s+\|\s+")
+_WORDS = re.compile(r"\w+|[^\w\s]")
+_CONTENT_WORD = re.compile(r"[a-z0-9][a-z0-9$%./-]*")
+_STOP_WORDS = frozenset("""a an and are as at be by can do does for from has have how i if in is it its my of on or our
+so that the their there this to was we what when where which who why will with you your""".split())
+
+def approximate_tokens(text: str) -> int:
+    """Words and punctuation marks; close to BPE counts for English, an overestimate never far off"""
+    return len(_WORDS.findall(text))
+
+_encoder_lock = threading.Lock()
+_encoder = None
+
+def _tiktoken_counter(model: str) -> Optional[Callable[[str], int]]:
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            try:
+                import tiktoken
+                _encoder = tiktoken.encoding_for_model(model)
+            except Exception as e:
+                logger.warning(f"tiktoken encoding unavailable, approximating token counts: {e}")
+                _encoder = False
+    if _encoder is False:
+        return None
+    return lambda text: len(_encoder.encode(text, disallowed_special=()))
+
+def _key(excerpt: str) -> str:
+    return " ".join(excerpt.lower().split())
+
+def content_words(text: str) -> set:
+    """Lowercased words of a text that carry meaning, stop words left out"""
+    return {word for word in _CONTENT_WORD.findall(text.lower()) if word not in _STOP_WORDS}
+
+class ContextPacker:
+    """
+    Fits retrieved context into a token budget before it reaches a prompt.
+
+    Each (text, score, source) result is cut into excerpts. Excerpts already
+    sent, or contained in one already sent, are dropped, so overlapping
+    knowledge sections and repeated Slack messages count once. Results are
+    taken in ranking order until the budget is spent; the excerpt that does
+    not fit is truncated at a word boundary, or left out when too little of it
+    would remain. Token counts are cached per excerpt.
+
+    `excerpts_for` picks what the grader sees: the excerpts sharing content
+    words with the answer, best first, within the smaller grading budget.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, grade_budget: int = GRADE_CONTEXT_TOKEN_BUDGET,
+                 tokenizer: str = CONTEXT_TOKENIZER, model: str = "gpt-3.5-turbo", cache_size: int = 8192):
+        self.budget = budget
+        self.grade_budget = grade_budget
+        self.tokenizer = tokenizer
+        self.model = model
+        self._counter: Optional[Callable[[str], int]] = None
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        if self._counter is None:
+            counter = _tiktoken_counter(self.model) if self.tokenizer == "tiktoken" else None
+            self._counter = counter or approximate_tokens
+        return self._counter(text)
+
+    def _truncate(self, excerpt: str, tokens: int) -> str:
+        """Longest word-boundary prefix of the excerpt within `tokens`"""
+        words = excerpt.split()
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._count(" ".join(words[:middle]) + " …") <= tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low]) + " …" if low else ""
+
+    def _fit(self, excerpts: List[str], budget: int, seen: List[str]) -> Tuple[List[str], int]:
+        kept, used = [], 0
+        for excerpt in excerpts:
+            key = _key(excerpt)
+            if not key or any(key in other for other in seen):
+                continue
+            tokens = self.count(excerpt)
+            if used + tokens > budget:
+                remaining = budget - used
+                if remaining >= MIN_EXCERPT_TOKENS:
+                    truncated = self._truncate(excerpt, remaining)
+                    if truncated:
+                        kept.append(truncated)
+                        used += self.count(truncated)
+                return kept, budget
+            seen.append(key)
+            kept.append(excerpt)
+            used += tokens
+        return kept, used
+
+    def pack(self, relevant_info: List[Tuple[str, float, str]], budget: Optional[int] = None) -> List[Tuple[str, float, str]]:
+        """Deduplicated results, in order, whose text fits the budget together"""
+        budget = self.budget if budget is None else budget
+        if budget <= 0:
+            return list(relevant_info)
+        packed, seen, used = [], [], 0
+        for text, score, source in relevant_info:
+            kept, tokens = self._fit(_EXCERPT_SPLIT.split(text), budget - used, seen)
+            if kept:
+                packed.append(("\n".join(kept), score, source))
+            used += tokens
+            if used >= budget:
+                break
+        return packed
+
+    def excerpts_for(self, answer: str, relevant_info: List[Tuple[str, float, str]]) -> List[Tuple[str, float, str]]:
+        """
+        The excerpts an answer draws on, for grading. Falls back to the start of
+        the context when the answer shares no content word with any excerpt, so
+        the grader can still tell an unsupported answer from a supported one.
+        """
+        if self.grade_budget <= 0:
+            return list(relevant_info)
+        answer_words = content_words(answer)
+        scored = []
+        for rank, (text, score, source) in enumerate(relevant_info):
+            for excerpt in _EXCERPT_SPLIT.split(text):
+                overlap = len(answer_words & content_words(excerpt))
+                if overlap:
+                    scored.append((-overlap, rank, excerpt, score, source))
+        if not scored:
+            return self.pack(relevant_info, self.grade_budget)
+        scored.sort(key=lambda item: item[:2])
+        return self.pack([(excerpt, score, source) for _, _, excerpt, score, source in scored], self.grade_budget)
+
+context_packer = ContextPacker()
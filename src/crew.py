@@ -1,23 +1,31 @@
 import os
+import re
+import time
+import logging
 import yaml
 import asyncio
-from crewai import Agent, Crew, Task, Process
-from memory import load_memory
-from unanswered import add_unanswered, load_unanswered, remove_answered, reprocess_unanswered
-from slack_fallback import notify_slack, notify_unresolved_count
-from langchain_openai import ChatOpenAI
-from typing import List, Tuple, Dict
-
-# Define category keywords at module level
-CATEGORY_KEYWORDS = {
-    'core_bank': ['core bank', 'dao', 'deposit', 'lending'],
-    'custom_bank': ['custom bank', 'risk', 'operator'],
-    'market': ['market', 'liquidity', 'trading', 'borrow'],
-    'features': ['multiply', 'leverage', 'bundle', 'transaction'],
-    'assets': ['asset', 'token', 'defi', 'long-tail'],
-    'announcements': ['update', 'new', 'announcement', 'change'],
-    'general': ['bank', 'untitled', 'help', 'what', 'how', 'why', 'when', 'where']  # Added general keywords
-}
+import threading
+from functools import lru_cache, partial
+from itertools import zip_longest
+from normalize import normalize_query
+from keywords import expand_slang, match_keywords
+from namespaces import DEFAULT_NAMESPACE, get_namespace
+from answer_cache import AnswerCache, SharedAnswerCache
+from faq import FaqStore, evidence_hash
+from unanswered import add_unanswered, remove_answered, reprocess_unanswered
+from slack_fallback import notifier, notify_slack, anotify_slack, notify_unresolved_count
+from recheck import RecheckEngine
+from models import load_models
+from casual import build_classifier
+from context_packer import content_words, context_packer
+from confidence import LOCAL_GRADER, confidence_scorer, parse_confidence
+from admission import COALESCE_SIMILARITY, PriorityGate, SingleFlight, admission
+from telemetry import telemetry
+from breaker import CLOSED, HALF_OPEN, OPEN, BreakerOpen, CircuitBreaker, DeadlineExceeded, current_deadline, deadline
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Iterable, List, Tuple, Dict, Optional, Literal
+
+logger = logging.getLogger(__name__)
 
 # Comprehensive agent role and background
 AGENT_PERSONA = """
@@ -83,98 +91,223 @@ def load_config(file_path):
     with open(file_path, "r") as f:
         return yaml.safe_load(f)
 
-agents_config = load_config(os.path.join("config", "agents.yaml"))
-tasks_config = load_config(os.path.join("config", "tasks.yaml"))
+@lru_cache(maxsize=None)
+def get_agents_config() -> dict:
+    return load_config(os.path.join("config", "agents.yaml"))
+
+@lru_cache(maxsize=None)
+def get_tasks_config() -> dict:
+    return load_config(os.path.join("config", "tasks.yaml"))
+
+# Each stage calls its own client from config/models.yaml, built on first use
+# (or by warm_up), so importing this module does not pay for langchain_openai
+models = load_models()
+fused_llm = None
+fused_llm_no_retries = None
+casual_classifier = None
+_lazy_lock = threading.Lock()
+
+def get_fused_llm(retries: bool = True):
+    global fused_llm, fused_llm_no_retries
+    llm = fused_llm if retries else fused_llm_no_retries
+    if llm is None:
+        with _lazy_lock:
+            llm = fused_llm if retries else fused_llm_no_retries
+            if llm is None:
+                llm = models.client("fused", retries).with_structured_output(FusedAnswer, method="function_calling")
+                if retries:
+                    fused_llm = llm
+                else:
+                    fused_llm_no_retries = llm
+    return llm
+
+# Local pre-classifier that keeps obvious casual/product messages away from the LLM
+LOCAL_CASUAL_CLASSIFIER = os.getenv("LOCAL_CASUAL_CLASSIFIER", "1") != "0"
+
+def get_casual_classifier():
+    global casual_classifier
+    if casual_classifier is None and LOCAL_CASUAL_CLASSIFIER:
+        with _lazy_lock:
+            if casual_classifier is None:
+                casual_classifier = build_classifier()
+    return casual_classifier
+
+# Bounds for the async answer pipeline used by the Discord bot
+ANSWER_CONCURRENCY = int(os.getenv("ANSWER_CONCURRENCY", "8"))
+ANSWER_TIMEOUT_SECONDS = float(os.getenv("ANSWER_TIMEOUT_SECONDS", "30"))
+
+# Concurrency slots go to first-time askers before users who keep asking
+answer_gate = PriorityGate(ANSWER_CONCURRENCY)
+# Concurrent identical (or near-identical) questions share one pipeline run
+answer_flights = SingleFlight(COALESCE_SIMILARITY)
+
+# "chain" runs classify -> answer -> grade as separate calls, "fused" does all three in one call
+ANSWER_MODE = os.getenv("ANSWER_MODE", "chain").strip().lower()
+
+class FusedAnswer(BaseModel):
+    """Structured output of the single-call classify + answer + score mode"""
+    kind: Literal["casual", "product"] = Field(description='"casual" for greetings and small talk, "product" for anything about Untitled Bank')
+    answer: str = Field(description="The reply to send to the user, empty if the context does not answer a product question")
+    confidence: float = Field(description="Confidence from 0 to 1 that the reply is accurate and safe to post")
+
+# Questions escalated while the breaker was not closed; posted as one count once it closes again
+_held_escalations = 0
+_held_lock = threading.Lock()
+_BREAKER_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+def _breaker_changed(old: str, new: str):
+    global _held_escalations
+    telemetry.set_gauge("bot_llm_breaker_state", _BREAKER_GAUGE[new])
+    telemetry.set_gauge("bot_llm_breaker_trips", llm_breaker.trips)
+    if old == CLOSED and new == OPEN:
+        notifier.notify("The LLM is failing; answering from the knowledge base and Slack memory only. "
+                        "Escalations are queued without a message each until it recovers.")
+    elif new == CLOSED:
+        with _held_lock:
+            held, _held_escalations = _held_escalations, 0
+        notifier.notify(f"The LLM has recovered. {held} question(s) were queued while it was down; "
+                        "the recheck will go through them.")
 
-llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.7)
+# Wraps every LLM call of the answer pipeline; while open, questions get retrieval-only answers
+llm_breaker = CircuitBreaker(on_change=_breaker_changed)
+telemetry.set_gauge("bot_llm_breaker_state", _BREAKER_GAUGE[CLOSED])
 
-def get_product_knowledge():
+def _hold_escalation() -> bool:
+    """Count instead of posting an escalation while the LLM is down, so Slack is not flooded"""
+    global _held_escalations
+    if llm_breaker.state == CLOSED:
+        return False
+    with _held_lock:
+        _held_escalations += 1
+    return True
+
+def _stage_budget(stage: str) -> Optional[float]:
+    """Seconds a stage may take under the current question's deadline, None outside one"""
+    limit = current_deadline()
+    if limit is None:
+        return None
+    settings = models.settings(stage)
     try:
-        with open(os.path.join("knowledge", "product_info.txt"), "r", encoding='utf-8') as f:
-            product_info = f.read()
-        with open(os.path.join("knowledge", "announcements.txt"), "r", encoding='utf-8') as f:
-            announcements = f.read()
-        return product_info + "\n" + announcements
-    except Exception as e:
-        print(f"Error reading knowledge files: {e}")
-        return ""
+        return limit.budget(settings.deadline_share, settings.timeout)
+    except DeadlineExceeded:
+        telemetry.record_deadline_miss(stage)
+        raise
+
+def _invoke(stage: str, prompt: str) -> str:
+    """
+    Call the client of one pipeline stage, within its share of the question's
+    deadline; under a deadline the client does not retry, as a retried timeout
+    would overrun the budget
+    """
+    budget = _stage_budget(stage)
+    with llm_breaker.call():
+        return models.client(stage, retries=budget is None).invoke(
+            prompt, **({"timeout": budget} if budget else {})).content
+
+async def _ainvoke(stage: str, prompt: str) -> str:
+    """Call the client of one pipeline stage without blocking the event loop"""
+    budget = _stage_budget(stage)
+    with llm_breaker.call():
+        try:
+            response = await asyncio.wait_for(models.client(stage, retries=budget is None).ainvoke(prompt), budget)
+        except asyncio.TimeoutError:
+            telemetry.record_deadline_miss(stage)
+            raise
+    return response.content
+
+def get_product_knowledge(namespace: str = DEFAULT_NAMESPACE):
+    return get_namespace(namespace).knowledge_store.text()
+
+# "memory" keeps an LRU per process, "sqlite" shares cached answers between bot shards
+ANSWER_CACHE_BACKEND = os.getenv("ANSWER_CACHE_BACKEND", "memory").strip().lower()
+
+_answer_caches: Dict[str, object] = {}
+_answer_caches_lock = threading.Lock()
+
+def get_answer_cache(namespace: str = DEFAULT_NAMESPACE):
+    """Answer cache of a namespace, created on first use"""
+    with _answer_caches_lock:
+        cache = _answer_caches.get(namespace)
+        if cache is None:
+            stores = get_namespace(namespace)
+            ttl_seconds = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+            if ANSWER_CACHE_BACKEND == "sqlite":
+                cache = SharedAnswerCache(
+                    stores.memory_store,
+                    stores.knowledge_store,
+                    namespace,
+                    path=os.getenv("ANSWER_CACHE_DB", "answer_cache.db"),
+                    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "4096")),
+                    ttl_seconds=ttl_seconds,
+                )
+            else:
+                cache = AnswerCache(
+                    stores.memory_store,
+                    stores.knowledge_store,
+                    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+                    ttl_seconds=ttl_seconds,
+                    fuzzy_threshold=float(os.getenv("ANSWER_CACHE_FUZZY_THRESHOLD", "0")),
+                )
+            _answer_caches[namespace] = cache
+        return cache
 
 def categorize_query(query: str) -> List[str]:
     """
     Categorize the query to determine which aspects of the system it relates to
     """
-    categories = []
-    query_lower = query.lower()
-    
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        if any(keyword in query_lower for keyword in keywords):
-            categories.append(category)
-    
-    return categories or ['general']
+    return list(match_keywords(query.lower())["categories"]) or ['general']
+
+# "keyword" (word overlap and topics), "embedding" (vector search only) or
+# "hybrid" (keyword matches, with vector search covering what they miss)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "keyword").strip().lower()
+
+_retrievers: Dict[str, object] = {}
+_retriever_lock = threading.Lock()
+
+def get_retriever(namespace: str = DEFAULT_NAMESPACE):
+    """Create a namespace's embedding retriever on first use so the keyword backend never loads numpy"""
+    with _retriever_lock:
+        retriever = _retrievers.get(namespace)
+        if retriever is None:
+            from retrieval import SemanticRetriever, get_embedder
+            stores = get_namespace(namespace)
+            directory = os.getenv("EMBEDDINGS_DIR", "embeddings")
+            if namespace != DEFAULT_NAMESPACE:
+                directory = os.path.join(directory, namespace)
+            retriever = SemanticRetriever(
+                stores.memory_store,
+                stores.knowledge_store,
+                get_embedder(os.getenv("EMBEDDING_MODEL", "hashing")),
+                directory=directory,
+                min_score=float(os.getenv("SEMANTIC_MIN_SCORE", "0.2")),
+            )
+            _retrievers[namespace] = retriever
+        return retriever
 
-def search_knowledge_base(query: str, knowledge: str, categories: List[str]) -> List[Tuple[str, float, str]]:
+@telemetry.timed("knowledge_search")
+def search_knowledge_base(query: str, categories: List[str],
+                          namespace: str = DEFAULT_NAMESPACE) -> List[Tuple[str, float, str]]:
     """
     Search the knowledge base and return relevant paragraphs with confidence scores and categories
     """
-    query = query.lower()
-    sections = knowledge.split('\n\n')
-    
-    relevant_info = []
-    
-    for section in sections:
-        if not section.strip():
-            continue
-            
-        # Calculate basic relevance
-        query_words = set(query.split())
-        section_words = set(section.lower().split())
-        matching_words = query_words.intersection(section_words)
-        base_confidence = len(matching_words) / len(query_words) if query_words else 0
-        
-        # Boost confidence for categorical matches
-        category_boost = 0.0
-        section_lower = section.lower()
-        
-        # Handle category matching with fallback to general
-        for category in categories:
-            if category in CATEGORY_KEYWORDS:
-                if any(keyword in section_lower for keyword in CATEGORY_KEYWORDS[category]):
-                    category_boost += 0.2  # 20% boost per matching category
-        
-        final_confidence = min(1.0, base_confidence + category_boost)
-        
-        if final_confidence > 0.2:
-            # Determine the section category with better fallback handling
-            section_category = 'general'
-            for cat, keywords in CATEGORY_KEYWORDS.items():
-                if any(keyword in section_lower for keyword in keywords):
-                    section_category = cat
-                    break
-            relevant_info.append((section, final_confidence, section_category))
-    
-    # Sort by confidence and return top results, ensuring diverse categories
-    relevant_info.sort(key=lambda x: x[1], reverse=True)
-    
-    # Ensure we have at least one item from each relevant category if available
-    final_selection = []
-    used_categories = set()
-    
-    # First, add highest confidence item from each category
-    for info in relevant_info:
-        if info[2] not in used_categories and len(final_selection) < 5:
-            final_selection.append(info)
-            used_categories.add(info[2])
-    
-    # Then add remaining high-confidence items up to 5 total
-    for info in relevant_info:
-        if info not in final_selection and len(final_selection) < 5:
-            final_selection.append(info)
-    
-    return final_selection
+    if RETRIEVAL_BACKEND == "embedding":
+        return get_retriever(namespace).search_knowledge(query)
 
-def is_casual_chat(query: str) -> bool:
-    """Use LLM to determine if the query is a casual conversation"""
-    prompt = f"""Determine if this message is a casual conversation or a product-related question.
+    keyword_results = get_namespace(namespace).knowledge_store.index().search(query, categories)
+    if RETRIEVAL_BACKEND != "hybrid":
+        return keyword_results
+
+    # Interleave both rankings so paraphrase matches are not crowded out by word overlap
+    merged, seen = [], set()
+    for pair in zip_longest(keyword_results, get_retriever(namespace).search_knowledge(query)):
+        for info in pair:
+            if info is not None and info[0] not in seen:
+                seen.add(info[0])
+                merged.append(info)
+    return merged[:5]
+
+def _casual_chat_prompt(query: str) -> str:
+    return f"""Determine if this message is a casual conversation or a product-related question.
 
 Message: "{query}"
 
@@ -198,18 +331,64 @@ Respond with either "casual" or "product" only.
 
 Response:"""
 
+def _local_casual_decision(query: str, replaces_call: bool = False) -> Optional[bool]:
+    """
+    True/False when the local classifier is sure, None when the LLM has to
+    decide. With `replaces_call`, a decision counts as an avoided classify call.
+    """
+    classifier = get_casual_classifier()
+    if classifier is None:
+        return None
+    decision = classifier.classify(query)
+    if decision is None:
+        return None
+    if replaces_call:
+        classifier.record_avoided()
+    return decision == "casual"
+
+def _template_casual_response(query: str, replaces_call: bool = True) -> Optional[str]:
+    """Canned small talk reply; counts as an avoided LLM call when `replaces_call`"""
+    classifier = get_casual_classifier()
+    if classifier is None:
+        return None
+    reply = classifier.template_reply(query)
+    if reply is not None and replaces_call:
+        classifier.record_avoided()
+    return reply
+
+@telemetry.timed("classify")
+def is_casual_chat(query: str) -> bool:
+    """Determine if the query is a casual conversation, asking the LLM only when the local classifier is unsure"""
+    local = _local_casual_decision(query, replaces_call=True)
+    if local is not None:
+        return local
+
+    prompt = _casual_chat_prompt(query)
+
     try:
-        llm.temperature = 0.1  # Keep it consistent
-        response = llm.invoke(prompt).content.strip().lower()
+        response = _invoke("classify", prompt).strip().lower()
         return response == "casual"
     except Exception as e:
-        print(f"Error in casual chat detection: {e}")
+        logger.error(f"Error in casual chat detection: {e}")
         # If there's an error, default to treating it as a product question
         return False
 
-def get_casual_response(query: str) -> str:
-    """Generate contextual casual responses using LLM"""
-    prompt = f"""Generate a friendly, casual response to this message. Be brief, fun, and natural.
+@telemetry.timed("classify")
+async def ais_casual_chat(query: str) -> bool:
+    """Async variant of is_casual_chat"""
+    local = _local_casual_decision(query, replaces_call=True)
+    if local is not None:
+        return local
+
+    try:
+        response = (await _ainvoke("classify", _casual_chat_prompt(query))).strip().lower()
+        return response == "casual"
+    except Exception as e:
+        logger.error(f"Error in casual chat detection: {e}")
+        return False
+
+def _casual_response_prompt(query: str) -> str:
+    return f"""Generate a friendly, casual response to this message. Be brief, fun, and natural.
 
 Message: "{query}"
 
@@ -222,20 +401,39 @@ Guidelines:
 
 Response:"""
 
+@telemetry.timed("casual")
+def get_casual_response(query: str) -> str:
+    """Generate contextual casual responses, from a template when one fits and with the LLM otherwise"""
+    template = _template_casual_response(query)
+    if template is not None:
+        return template
+
+    prompt = _casual_response_prompt(query)
+
     try:
-        llm.temperature = 0.7  # Allow for more creativity in casual responses
-        response = llm.invoke(prompt).content.strip()
-        llm.temperature = 0.1  # Reset temperature
-        return response
+        return _invoke("casual", prompt).strip()
     except Exception as e:
-        print(f"Error generating casual response: {e}")
+        logger.error(f"Error generating casual response: {e}")
         return "Hey there! 👋 How can I help you today?"
 
-def evaluate_answer_confidence(query: str, answer: str, source_info: List[Tuple[str, float, str]]) -> float:
-    """Use LLM to evaluate answer confidence considering DeFi and community context"""
-    context = "\n".join([info[0] for info in source_info])
-    
-    prompt = f"""Evaluate if this answer is appropriate for a DeFi project's community support.
+@telemetry.timed("casual")
+async def aget_casual_response(query: str) -> str:
+    """Async variant of get_casual_response"""
+    template = _template_casual_response(query)
+    if template is not None:
+        return template
+
+    try:
+        return (await _ainvoke("casual", _casual_response_prompt(query))).strip()
+    except Exception as e:
+        logger.error(f"Error generating casual response: {e}")
+        return "Hey there! 👋 How can I help you today?"
+
+def _confidence_prompt(query: str, answer: str, source_info: List[Tuple[str, float, str]]) -> str:
+    # The grader only needs the excerpts the answer draws on, not the whole context again
+    context = "\n".join([info[0] for info in context_packer.excerpts_for(answer, source_info)])
+
+    return f"""Evaluate if this answer is appropriate for a DeFi project's community support.
 
 Question: "{query}"
 Proposed Answer: "{answer}"
@@ -262,20 +460,57 @@ Respond with only a number between 0 and 1.
 
 Response:"""
 
+def _local_confidence(query: str, answer: str, source_info: List[Tuple[str, float, str]]):
+    """(confidence, True) when the local scorer is sure, (fallback, False) when the LLM grader has to decide"""
+    local = confidence_scorer.score(query, answer, source_info)
+    if LOCAL_GRADER and not local.uncertain:
+        telemetry.record_grade("local")
+        return local.confidence, True
+    return (local.confidence if LOCAL_GRADER else 0.0), False
+
+def _graded(query: str, response: str, fallback: float) -> float:
+    confidence = parse_confidence(response)
+    if confidence is None:
+        logger.warning(f"Grader reply holds no confidence, using the local score for: {query}")
+        telemetry.record_grade("unparsed")
+        return fallback
+    telemetry.record_grade("llm")
+    return confidence
+
+@telemetry.timed("grade")
+def evaluate_answer_confidence(query: str, answer: str, source_info: List[Tuple[str, float, str]]) -> float:
+    """
+    Confidence that the answer is safe to post, from retrieval scores and how
+    well the context supports the answer; the LLM grader, which weighs DeFi
+    and community context, is only asked when that local score is unsure
+    """
+    local, certain = _local_confidence(query, answer, source_info)
+    if certain:
+        return local
+    prompt = _confidence_prompt(query, answer, source_info)
+
     try:
-        llm.temperature = 0.1
-        response = llm.invoke(prompt).content.strip()
-        confidence = float(response)
-        return min(1.0, max(0.0, confidence))
+        return _graded(query, _invoke("grade", prompt), local)
     except Exception as e:
-        print(f"Error in confidence evaluation: {e}")
-        return 0.0
+        logger.error(f"Error in confidence evaluation: {e}")
+        return local
 
-def format_answer(query: str, relevant_info: List[Tuple[str, float, str]], source: str) -> Tuple[str, float]:
-    """Format the answer and return with confidence score"""
+@telemetry.timed("grade")
+async def aevaluate_answer_confidence(query: str, answer: str, source_info: List[Tuple[str, float, str]]) -> float:
+    """Async variant of evaluate_answer_confidence"""
+    local, certain = _local_confidence(query, answer, source_info)
+    if certain:
+        return local
+    try:
+        return _graded(query, await _ainvoke("grade", _confidence_prompt(query, answer, source_info)), local)
+    except Exception as e:
+        logger.error(f"Error in confidence evaluation: {e}")
+        return local
+
+def _answer_prompt(query: str, relevant_info: List[Tuple[str, float, str]]) -> str:
     context = "\n".join([info[0] for info in relevant_info])
-    
-    prompt = f"""You are Untitled Bank's assistant. Be direct and concise.
+
+    return f"""You are Untitled Bank's assistant. Be direct and concise.
 
 CONTEXT:
 {context}
@@ -292,58 +527,167 @@ Instructions:
 
 Response:"""
 
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+EXTRACTIVE_PREFIX = "Here's what I found: "
+# Longest excerpt a retrieval-only answer quotes
+EXTRACTIVE_MAX_CHARS = 400
+# A quote is never posted as a confident answer: it always carries the "ask in Discord" note
+DEGRADED_MAX_CONFIDENCE = 0.79
+
+def extractive_answer(query: str, relevant_info: List[Tuple[str, float, str]]) -> str:
+    """
+    Answer without the LLM: the (at most two) sentences of the top retrieved
+    result sharing the most words with the question, in their original order
+    """
+    sentences = [sentence for sentence in _SENTENCE_SPLIT.split(relevant_info[0][0]) if sentence.strip()]
+    if not sentences:
+        return ""
+    query_words = content_words(query)
+    best = sorted(range(len(sentences)), key=lambda i: (-len(query_words & content_words(sentences[i])), i))[:2]
+    excerpt = " ".join(sentences[i].strip() for i in sorted(best))
+    if len(excerpt) > EXTRACTIVE_MAX_CHARS:
+        excerpt = excerpt[:EXTRACTIVE_MAX_CHARS].rsplit(" ", 1)[0] + " …"
+    return EXTRACTIVE_PREFIX + excerpt
+
+def _cacheable(answer: str) -> bool:
+    """Retrieval-only answers are not cached, so the LLM answers the question again once it is back"""
+    return not answer.startswith(EXTRACTIVE_PREFIX)
+
+def _degraded(query: str, relevant_info: List[Tuple[str, float, str]], reason: str) -> Tuple[str, float]:
+    """Extractive answer and its local confidence, for when the LLM could not answer in time"""
+    telemetry.record_degraded(reason)
+    answer = extractive_answer(query, relevant_info) if relevant_info else ""
+    if not answer:
+        return "", 0.0
+    return answer, min(confidence_scorer.score(query, answer, relevant_info).confidence, DEGRADED_MAX_CONFIDENCE)
+
+def _degraded_reason(error: BaseException) -> str:
+    if isinstance(error, BreakerOpen):
+        return "breaker_open"
+    if isinstance(error, (DeadlineExceeded, asyncio.TimeoutError, TimeoutError)):
+        return "deadline"
+    return "llm_error"
+
+def format_answer(query: str, relevant_info: List[Tuple[str, float, str]], source: str) -> Tuple[str, float]:
+    """Format the answer and return with confidence score; retrieval-only when the LLM fails"""
+    prompt = _answer_prompt(query, relevant_info)
+
     try:
-        llm.temperature = 0.1
-        answer = llm.invoke(prompt).content.strip()
-        
-        # Evaluate confidence
-        confidence = evaluate_answer_confidence(query, answer, relevant_info)
-        
-        return answer, confidence
+        with telemetry.span("answer"):
+            answer = _invoke("answer", prompt).strip()
     except Exception as e:
-        print(f"Error generating response: {e}")
-        return "", 0.0
+        logger.error(f"Error generating response: {e}")
+        return _degraded(query, relevant_info, _degraded_reason(e))
+
+    # Evaluate confidence
+    confidence = evaluate_answer_confidence(query, answer, relevant_info)
+    return answer, confidence
+
+async def aformat_answer(query: str, relevant_info: List[Tuple[str, float, str]], source: str) -> Tuple[str, float]:
+    """Async variant of format_answer"""
+    try:
+        with telemetry.span("answer"):
+            answer = (await _ainvoke("answer", _answer_prompt(query, relevant_info))).strip()
+    except Exception as e:
+        logger.error(f"Error generating response: {e}")
+        return _degraded(query, relevant_info, _degraded_reason(e))
+    confidence = await aevaluate_answer_confidence(query, answer, relevant_info)
+    return answer, confidence
 
-def check_memory_for_answer(query: str) -> List[Tuple[str, float, str]]:
+async def astream_format_answer(query: str, relevant_info: List[Tuple[str, float, str]]) -> AsyncIterator[str]:
+    """Stream the answer as it is generated, yielding the text so far after each token"""
+    text = ""
+    budget = _stage_budget("answer")
+    with telemetry.span("answer"), llm_breaker.call():
+        async for chunk in models.client("answer", retries=budget is None).astream(
+                _answer_prompt(query, relevant_info), **({"timeout": budget} if budget else {})):
+            if chunk.content:
+                text += chunk.content
+                yield text
+
+def _fused_prompt(query: str, relevant_info: List[Tuple[str, float, str]]) -> str:
+    context = "\n".join([info[0] for info in relevant_info]) or "(no matching context found)"
+
+    return f"""You are Untitled Bank's assistant in a DeFi community Discord. Handle this message in one step.
+
+CONTEXT:
+{context}
+
+Message: "{query}"
+
+Step 1 - Classify the message:
+- "casual": greetings, small talk, jokes, thank you messages, emojis or general chitchat
+- "product": questions about features, technical inquiries, how-to, status or support requests
+
+Step 2 - Write the answer:
+- casual: a short, friendly reply with appropriate emojis; a light banking/finance pun for joke requests
+- product: answer ONLY the specific question using the CONTEXT, in under 2 sentences. Be direct and clear.
+  For sensitive topics (funds, tokens, airdrop), be extra clear. If there's a link, just say "Here's how to [action]: [link]".
+  If the CONTEXT does not answer the question, leave the answer empty.
+
+Step 3 - Rate your confidence from 0 to 1:
+- 1.0: Perfect answer with verified information from the CONTEXT
+- 0.8: Good answer that helps the user but might need minor details
+- 0.5: Basic answer that's technically correct but might need more context
+- 0.3: Answer that might be misleading or incomplete
+- 0.0: Wrong, potentially harmful, or no answer
+Casual replies are always 1.0."""
+
+@telemetry.timed("fused")
+def fused_answer(query: str, relevant_info: List[Tuple[str, float, str]]) -> Optional[FusedAnswer]:
+    """
+    Classify, answer and score the query with a single structured-output call.
+    Returns None on failure so the caller can fall back to the three-call chain.
+    """
+    try:
+        budget = _stage_budget("fused")
+        with llm_breaker.call():
+            result = get_fused_llm(retries=budget is None).invoke(_fused_prompt(query, relevant_info),
+                                                                  **({"timeout": budget} if budget else {}))
+        result.confidence = min(1.0, max(0.0, result.confidence))
+        return result
+    except Exception as e:
+        logger.error(f"Error in fused answer generation: {e}")
+        return None
+
+@telemetry.timed("fused")
+async def afused_answer(query: str, relevant_info: List[Tuple[str, float, str]]) -> Optional[FusedAnswer]:
+    """Async variant of fused_answer"""
+    try:
+        budget = _stage_budget("fused")
+        with llm_breaker.call():
+            result = await asyncio.wait_for(
+                get_fused_llm(retries=budget is None).ainvoke(_fused_prompt(query, relevant_info)), budget)
+        result.confidence = min(1.0, max(0.0, result.confidence))
+        return result
+    except Exception as e:
+        logger.error(f"Error in fused answer generation: {e}")
+        return None
+
+@telemetry.timed("memory_search")
+def check_memory_for_answer(query: str, namespace: str = DEFAULT_NAMESPACE) -> List[Tuple[str, float, str]]:
     """
     Check memory for relevant Slack messages, prioritizing recent ones
     """
-    memory = load_memory()
+    if RETRIEVAL_BACKEND == "embedding":
+        return get_retriever(namespace).search_memory(query)
+
+    keyword_results = _keyword_memory_matches(query, namespace)
+    if keyword_results or RETRIEVAL_BACKEND != "hybrid":
+        return keyword_results
+    return get_retriever(namespace).search_memory(query)
+
+def _keyword_memory_matches(query: str, namespace: str = DEFAULT_NAMESPACE) -> List[Tuple[str, float, str]]:
+    """Match memory by topic keywords, falling back to word overlap"""
+    memory = {"global": get_namespace(namespace).memory_store.messages()}
     if not memory:
         return []
 
     relevant_info = []
-    query_lower = query.lower()
-    
-    # Define main topics and their related terms, including crypto slang
-    topics = {
-        "wallet": ["wallet", "connect", "address"],
-        "twitter": ["twitter", "social", "tweet"],
-        "points": ["point", "reward", "earn"],
-        "card": ["card", "upgrade"],
-        "withdraw": ["withdraw", "fund"],
-        "airdrop": ["airdrop", "wen", "when airdrop", "drop"],
-        "error": ["error", "can't", "cannot", "issue", "problem"]
-    }
-    
-    # Common crypto slang replacements
-    slang_map = {
-        "wen": "when",
-        "ser": "sir",
-        "gm": "good morning",
-        "wagmi": "we are going to make it"
-    }
-    
-    # Preprocess query to handle slang
-    for slang, formal in slang_map.items():
-        query_lower = query_lower.replace(slang, formal)
-    
-    # Identify the query topic
-    query_topic = None
-    for topic, keywords in topics.items():
-        if any(keyword in query_lower for keyword in keywords):
-            query_topic = topic
-            break
+    # Expand whole slang words only, then take the first topic (config/keywords.yaml) the query matches
+    query_lower = expand_slang(query.lower())
+    query_topics = match_keywords(query_lower)["topics"]
+    query_topic = query_topics[0] if query_topics else None
     
     # Check messages in reverse order (newest first)
     for message in reversed(memory.get("global", [])):
@@ -351,7 +695,7 @@ def check_memory_for_answer(query: str) -> List[Tuple[str, float, str]]:
         
         # If we found a topic match, only look for messages about that topic
         if query_topic:
-            if any(keyword in message_lower for keyword in topics[query_topic]):
+            if query_topic in match_keywords(message_lower)["topics"]:
                 # For airdrop questions, combine relevant messages
                 if query_topic == "airdrop":
                     airdrop_messages = [msg for msg in memory.get("global", []) 
@@ -376,71 +720,391 @@ def check_memory_for_answer(query: str) -> List[Tuple[str, float, str]]:
     
     return relevant_info[:1]  # Limit to 1 most relevant message
 
-def simulate_agent_answer(query: str) -> Tuple[str, float]:
-    # Always check memory first
-    memory_results = check_memory_for_answer(query)
+def retrieve_context(query: str, namespace: str = DEFAULT_NAMESPACE) -> Tuple[List[Tuple[str, float, str]], str]:
+    """
+    Find context for the query: Slack memory first, then the knowledge base.
+    The context is deduplicated and packed into CONTEXT_TOKEN_BUDGET tokens.
+    """
+    memory_results = check_memory_for_answer(query, namespace)
     if memory_results:
-        return format_answer(query, memory_results, "memory")
-    
-    # Only if no memory matches, check knowledge base
-    knowledge = get_product_knowledge()
-    if knowledge:
-        knowledge_results = search_knowledge_base(query, knowledge, categorize_query(query))
-        if knowledge_results:
-            return format_answer(query, knowledge_results, "knowledge")
-    
+        return context_packer.pack(memory_results), "memory"
+
+    knowledge_results = search_knowledge_base(query, categorize_query(query), namespace)
+    if knowledge_results:
+        return context_packer.pack(knowledge_results), "knowledge"
+
+    return [], ""
+
+# Answers learned from resolved questions are served before the cache and the pipeline; 0 disables them
+FAQ_STORE = os.getenv("FAQ_STORE", "1") != "0"
+
+_faq_stores: Dict[str, FaqStore] = {}
+_faq_stores_lock = threading.Lock()
+
+def get_faq_store(namespace: str = DEFAULT_NAMESPACE) -> FaqStore:
+    """FAQ store of a namespace, created on first use"""
+    with _faq_stores_lock:
+        store = _faq_stores.get(namespace)
+        if store is None:
+            stores = get_namespace(namespace)
+            store = FaqStore(
+                stores.memory_store,
+                stores.knowledge_store,
+                namespace,
+                lambda query: evidence_hash(retrieve_context(query, namespace)[0]),
+                path=os.getenv("FAQ_DB", "faq.db"),
+                max_entries=int(os.getenv("FAQ_SIZE", "4096")),
+            )
+            _faq_stores[namespace] = store
+        return store
+
+def update_faq_memory(query: str, answer: str, namespace: str = DEFAULT_NAMESPACE, source: str = "reprocess",
+                      confidence: float = 1.0) -> bool:
+    """Remember the answer to a resolved question, backed by the context retrieval finds for it now"""
+    return get_faq_store(namespace).record(query, answer, source, confidence)
+
+def learn_slack_answer(query: str, answer: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+    """
+    Resolve a question with a teammate's Slack reply to its escalation, and
+    learn the reply when the local scorer finds it backed by the context;
+    returns whether it was learned
+    """
+    remove_answered(query, answer, namespace)
+    if not FAQ_STORE:
+        return False
+    relevant_info, _ = retrieve_context(query, namespace)
+    confidence = confidence_scorer.score(query, answer, relevant_info).confidence
+    return get_faq_store(namespace).record(query, answer, "slack", confidence, evidence_hash(relevant_info))
+
+def _faq_reply(query: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[dict]:
+    """Reply dict from a learned answer, without calling the LLM, or None"""
+    if not FAQ_STORE:
+        return None
+    try:
+        entry = get_faq_store(namespace).lookup(query)
+    except Exception as e:
+        logger.error(f"Error looking up FAQ store: {e}")
+        return None
+    telemetry.record_faq(entry is not None)
+    if entry is None:
+        return None
+    telemetry.record_confidence("faq")
+    result, _ = _resolve_confidence(query, entry["answer"], entry["confidence"])
+    return result
+
+def simulate_agent_answer(query: str, namespace: str = DEFAULT_NAMESPACE) -> Tuple[str, float]:
+    relevant_info, source = retrieve_context(query, namespace)
+    if relevant_info:
+        return format_answer(query, relevant_info, source)
     return "", 0.0
 
-def get_answer_with_fallback(query: str, user_id: str) -> dict:
+async def asimulate_agent_answer(query: str, namespace: str = DEFAULT_NAMESPACE) -> Tuple[str, float]:
+    """Async variant of simulate_agent_answer; file access runs in a worker thread"""
+    relevant_info, source = await asyncio.to_thread(retrieve_context, query, namespace)
+    if relevant_info:
+        return await aformat_answer(query, relevant_info, source)
+    return "", 0.0
+
+def _resolve_confidence(query: str, answer: str, confidence: float) -> Tuple[dict, Optional[str]]:
+    """
+    Map an answer and its confidence to the reply dict.
+    Also returns the Slack escalation text, or None when no escalation is needed.
+    """
+    if confidence >= 0.8:  # High confidence
+        return {"answer": answer, "uncertain": False}, None
+    elif confidence >= 0.5:  # Medium confidence
+        return {"answer": f"{answer}\n\nNote: Feel free to ask in our Discord if you need more details.", "uncertain": False}, None
+    elif answer and confidence > 0:  # Low confidence but have some answer
+        return ({"answer": "I might not have the complete information. The team will provide more details, but here's what I know: " + answer, "uncertain": True},
+                f"Low confidence answer provided for: {query}")
+    else:  # No confidence or no answer
+        return {"answer": "The team will be here shortly to help you with this question.", "uncertain": True}, query
+
+def _confidence_bucket(answer: str, confidence: float, casual: bool) -> str:
+    """Bucket of the final reply, matching the branches of _resolve_confidence"""
+    if casual:
+        return "casual"
+    if confidence >= 0.8:
+        return "high"
+    if confidence >= 0.5:
+        return "medium"
+    if answer and confidence > 0:
+        return "low"
+    return "none"
+
+def _degraded_answer(query: str, namespace: str, reason: str) -> Tuple[str, float, bool]:
+    """_answer_query without the LLM: casual templates and extractive answers only"""
+    if _local_casual_decision(query):
+        # No LLM call would have been made, so nothing counts as avoided
+        reply = _template_casual_response(query, replaces_call=False)
+        return reply or "Hey there! 👋 How can I help you today?", 1.0, True
+    relevant_info, _ = retrieve_context(query, namespace)
+    answer, confidence = _degraded(query, relevant_info, reason)
+    return answer, confidence, False
+
+def _answer_query(query: str, namespace: str = DEFAULT_NAMESPACE) -> Tuple[str, float, bool]:
+    """Run the LLM pipeline for one query; returns (answer, confidence, is_casual)"""
+    if not llm_breaker.available():
+        return _degraded_answer(query, namespace, "breaker_open")
+
+    if ANSWER_MODE == "fused":
+        if _local_casual_decision(query):
+            template = _template_casual_response(query)
+            if template is not None:
+                return template, 1.0, True
+        relevant_info, _ = retrieve_context(query, namespace)
+        fused = fused_answer(query, relevant_info)
+        if fused is not None:
+            return fused.answer.strip(), fused.confidence, fused.kind == "casual"
+
     # First check if it's a casual conversation using LLM
     if is_casual_chat(query):
-        casual_response = get_casual_response(query)
-        return {"answer": casual_response, "uncertain": False}
-    
+        return get_casual_response(query), 1.0, True
+
     # If not casual, proceed with normal flow
-    answer, confidence = simulate_agent_answer(query)
-    
+    answer, confidence = simulate_agent_answer(query, namespace)
+    return answer, confidence, False
+
+@telemetry.traced
+def get_answer_with_fallback(query: str, user_id: str, namespace: str = DEFAULT_NAMESPACE) -> dict:
+    learned = _faq_reply(query, namespace)
+    if learned is not None:
+        return learned
+
+    cache = get_answer_cache(namespace)
+    cached = cache.get(query)
+    telemetry.record_cache(cached is not None)
+    if cached is not None:
+        telemetry.record_confidence("cached")
+        return cached
+
+    with deadline(ANSWER_TIMEOUT_SECONDS):
+        answer, confidence, casual = _answer_query(query, namespace)
+    telemetry.record_confidence(_confidence_bucket(answer, confidence, casual))
+    if casual:
+        # Not cached, so repeated small talk keeps rotating through the templates
+        return {"answer": answer, "uncertain": False}
+
     # Handle response based on confidence
-    if confidence >= 0.8:  # High confidence
+    result, escalation = _resolve_confidence(query, answer, confidence)
+    if escalation:
+        add_unanswered(query, user_id, namespace)
+        if not _hold_escalation():
+            notify_slack(escalation)
+    elif _cacheable(answer):
+        cache.put(query, result)
+    return result
+
+async def _aanswer_query(query: str, namespace: str = DEFAULT_NAMESPACE) -> Tuple[str, float, bool]:
+    """Async variant of _answer_query"""
+    if not llm_breaker.available():
+        return await asyncio.to_thread(_degraded_answer, query, namespace, "breaker_open")
+
+    if ANSWER_MODE == "fused":
+        if _local_casual_decision(query):
+            template = _template_casual_response(query)
+            if template is not None:
+                return template, 1.0, True
+        relevant_info, _ = await asyncio.to_thread(retrieve_context, query, namespace)
+        fused = await afused_answer(query, relevant_info)
+        if fused is not None:
+            return fused.answer.strip(), fused.confidence, fused.kind == "casual"
+
+    if await ais_casual_chat(query):
+        return await aget_casual_response(query), 1.0, True
+    answer, confidence = await asimulate_agent_answer(query, namespace)
+    return answer, confidence, False
+
+@telemetry.traced
+async def aget_answer_with_fallback(query: str, user_id: str, namespace: str = DEFAULT_NAMESPACE) -> dict:
+    """
+    Non-blocking version of get_answer_with_fallback for the Discord event loop.
+    At most ANSWER_CONCURRENCY questions are processed at once, waiting ones
+    are let in by the asker's admission priority, and each one is bounded by
+    ANSWER_TIMEOUT_SECONDS, shared out between its LLM calls; a question that
+    runs out of time is answered from retrieval alone. Askers of the same
+    question at the same time share one pipeline run, and each of them is
+    recorded if it gets escalated; only the asker whose run it was caches it.
+    """
+    learned = await asyncio.to_thread(_faq_reply, query, namespace)
+    if learned is not None:
+        return learned
+
+    cached = await asyncio.to_thread(get_answer_cache(namespace).get, query)
+    telemetry.record_cache(cached is not None)
+    if cached is not None:
+        telemetry.record_confidence("cached")
+        return cached
+
+    led = False
+
+    async def compute() -> Tuple[str, float, bool]:
+        nonlocal led
+        led = True
+        async with answer_gate.slot(admission.priority(user_id)):
+            try:
+                with deadline(ANSWER_TIMEOUT_SECONDS):
+                    return await asyncio.wait_for(_aanswer_query(query, namespace), ANSWER_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out answering query after {ANSWER_TIMEOUT_SECONDS}s: {query}")
+                telemetry.record_deadline_miss("question")
+                return await asyncio.to_thread(_degraded_answer, query, namespace, "deadline")
+
+    answer, confidence, casual = await answer_flights.run(normalize_query(query), compute, scope=namespace)
+    # A coalesced answer was computed for the leader's question, so it is cached under that one only
+    return await _afinish_answer(query, user_id, answer, confidence, casual, namespace, cache_result=led)
+
+async def _afinish_answer(query: str, user_id: str, answer: str, confidence: float, casual: bool,
+                          namespace: str = DEFAULT_NAMESPACE, cache_result: bool = True) -> dict:
+    """Turn a scored answer into the reply dict, caching it (with `cache_result`) or escalating it"""
+    telemetry.record_confidence(_confidence_bucket(answer, confidence, casual))
+    cache = get_answer_cache(namespace)
+    if casual:
+        # Not cached, so repeated small talk keeps rotating through the templates
         return {"answer": answer, "uncertain": False}
-    elif confidence >= 0.5:  # Medium confidence
-        return {"answer": f"{answer}\n\nNote: Feel free to ask in our Discord if you need more details.", "uncertain": False}
-    elif answer and confidence > 0:  # Low confidence but have some answer
-        add_unanswered(query, user_id)
-        notify_slack(f"Low confidence answer provided for: {query}")
-        return {"answer": "I might not have the complete information. The team will provide more details, but here's what I know: " + answer, "uncertain": True}
-    else:  # No confidence or no answer
-        add_unanswered(query, user_id)
-        notify_slack(query)
-        return {"answer": "The team will be here shortly to help you with this question.", "uncertain": True}
 
-async def periodic_recheck_unanswered():
+    result, escalation = _resolve_confidence(query, answer, confidence)
+    if escalation:
+        await asyncio.to_thread(add_unanswered, query, user_id, namespace)
+        if not _hold_escalation():
+            await anotify_slack(escalation)
+    elif cache_result and _cacheable(answer):
+        await asyncio.to_thread(cache.put, query, result)
+    return result
+
+async def astream_answer_with_fallback(query: str, user_id: str,
+                                      namespace: str = DEFAULT_NAMESPACE) -> AsyncIterator[Tuple[str, object]]:
     """
-    Periodically recheck unanswered questions and update memory with new information
+    Streaming variant of aget_answer_with_fallback.
+
+    Yields ("partial", text so far) while a product answer is generated, then
+    one ("final", reply dict). Confidence is only scored once the full text
+    has been yielded, so the caller can show the answer first and amend or
+    retract it when the final reply differs. Learned FAQ answers, cached and
+    casual replies are yielded as "final" straight away. The whole question,
+    including the time spent streaming, is bounded by ANSWER_TIMEOUT_SECONDS
+    and traced as one question. When the LLM is down or out of time, the final
+    reply is an extractive answer from the retrieved context.
     """
+    with telemetry.question(query):
+        learned = await asyncio.to_thread(_faq_reply, query, namespace)
+        if learned is not None:
+            yield "final", learned
+            return
+
+        cached = await asyncio.to_thread(get_answer_cache(namespace).get, query)
+        telemetry.record_cache(cached is not None)
+        if cached is not None:
+            telemetry.record_confidence("cached")
+            yield "final", cached
+            return
+
+        answer, confidence, casual = "", 0.0, False
+        relevant_info = []
+        async with answer_gate.slot(admission.priority(user_id)):
+            with deadline(ANSWER_TIMEOUT_SECONDS) as limit:
+                try:
+                    if not llm_breaker.available():
+                        answer, confidence, casual = await asyncio.to_thread(
+                            _degraded_answer, query, namespace, "breaker_open")
+                    elif await asyncio.wait_for(ais_casual_chat(query), limit.remaining()):
+                        answer = await asyncio.wait_for(aget_casual_response(query), limit.remaining())
+                        confidence, casual = 1.0, True
+                    else:
+                        relevant_info, _ = await asyncio.to_thread(retrieve_context, query, namespace)
+                        if relevant_info:
+                            yield "partial", ""
+                            stream = astream_format_answer(query, relevant_info).__aiter__()
+                            while True:
+                                try:
+                                    answer = await asyncio.wait_for(stream.__anext__(), limit.remaining())
+                                except StopAsyncIteration:
+                                    break
+                                yield "partial", answer
+                            answer = answer.strip()
+                            confidence = await asyncio.wait_for(
+                                aevaluate_answer_confidence(query, answer, relevant_info), limit.remaining())
+                except asyncio.TimeoutError:
+                    logger.warning(f"Timed out answering query after {ANSWER_TIMEOUT_SECONDS}s: {query}")
+                    telemetry.record_deadline_miss("question")
+                    answer, confidence = _degraded(query, relevant_info, "deadline")
+                    casual = False
+                except Exception as e:
+                    logger.error(f"Error generating response: {e}")
+                    answer, confidence = _degraded(query, relevant_info, _degraded_reason(e))
+                    casual = False
+
+        yield "final", await _afinish_answer(query, user_id, answer, confidence, casual, namespace)
+
+RECHECK_INTERVAL_SECONDS = float(os.getenv("RECHECK_INTERVAL_SECONDS", "300"))
+
+_recheck_engines: Dict[str, RecheckEngine] = {}
+_recheck_engines_lock = threading.Lock()
+
+def get_recheck_engine(namespace: str = DEFAULT_NAMESPACE) -> RecheckEngine:
+    """Recheck engine for the queued questions of one namespace, created on first use"""
+    with _recheck_engines_lock:
+        engine = _recheck_engines.get(namespace)
+        if engine is not None:
+            return engine
+        stores = get_namespace(namespace)
+        engine = RecheckEngine(
+            partial(retrieve_context, namespace=namespace),
+            partial(models.client, "recheck"),
+            stores.memory_store,
+            stores.knowledge_store,
+            batch_size=int(os.getenv("RECHECK_BATCH_SIZE", "8")),
+            concurrency=int(os.getenv("RECHECK_CONCURRENCY", "2")),
+            namespace=namespace,
+            faq_store=get_faq_store(namespace) if FAQ_STORE else None,
+        )
+        _recheck_engines[namespace] = engine
+    return engine
+
+async def periodic_recheck_unanswered(namespaces: Iterable[str] = (DEFAULT_NAMESPACE,)):
+    """
+    Periodically recheck unanswered questions against new memory and knowledge
+    """
+    engines = [get_recheck_engine(namespace) for namespace in namespaces]
     while True:
-        unanswered = load_unanswered()
-        memory = load_memory()
-        global_messages = memory.get("global", [])
-        
-        # Check if there are new answers in global memory for unanswered questions
-        for query, info in unanswered.items():
-            # First try to find a direct answer from memory
-            for message in global_messages:
-                if query.lower() in message.lower():
-                    remove_answered(query)
-                    # Send confirmation to Slack
-                    notify_slack(f"Found answer in Slack for: {query}")
-                    break
-            
-            # If no direct match, try normal answer generation
-            answer, confidence = simulate_agent_answer(query)
-            if answer:
-                remove_answered(query)
-                # Send confirmation to Slack
-                notify_slack(f"Generated answer for: {query}")
-        
-        await asyncio.sleep(300)  # Check every 5 minutes
+        for engine in engines:
+            try:
+                await engine.run_pass()
+            except Exception as e:
+                logger.error(f"Error rechecking unanswered questions in {engine.namespace}: {e}")
+        await asyncio.sleep(RECHECK_INTERVAL_SECONDS)  # Check every 5 minutes by default
+
+def warm_up(namespaces: Iterable[str] = (DEFAULT_NAMESPACE,)) -> Dict[str, float]:
+    """
+    Build everything the first question would otherwise wait for: knowledge
+    indexes, memory, answer caches, the local classifier, the token counter
+    and the LLM clients. Blocking; the bot runs it in a worker thread once
+    connected. Returns the seconds spent per step.
+    """
+    steps: Dict[str, float] = {}
+
+    def step(name, func, *args):
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error(f"Warm-up step {name} failed: {e}")
+        steps[name] = steps.get(name, 0.0) + time.perf_counter() - start
+
+    for namespace in namespaces:
+        stores = get_namespace(namespace)
+        step("knowledge_index", stores.knowledge_store.index)
+        step("memory", stores.memory_store.messages)
+        step("answer_cache", get_answer_cache, namespace)
+        if RETRIEVAL_BACKEND != "keyword":
+            step("embeddings", get_retriever, namespace)
+    step("casual_classifier", get_casual_classifier)
+    step("token_counter", context_packer.count, "warm up")
+    if ANSWER_MODE == "fused":
+        step("llm_clients", get_fused_llm)
+        step("llm_clients", get_fused_llm, False)
+    step("llm_clients", models.warm_up)
+    return steps
 
 def reprocess_unanswered_and_notify() -> int:
     unresolved = reprocess_unanswered()
@@ -0,0 +1,179 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from normalize import normalize_query
+
+FAQ_DB = "faq.db"
+# Confidence an answer needs to be learned; FAQ answers are served before the pipeline runs,
+# so only answers that would have been posted without a note qualify
+FAQ_LEARN_CONFIDENCE = max(0.8, float(os.getenv("FAQ_LEARN_CONFIDENCE", "0.8")))
+
+def evidence_hash(relevant_info: List[Tuple[str, float, str]]) -> str:
+    """Fingerprint of the context an answer was built from"""
+    return hashlib.sha1("\x00".join(info[0] for info in relevant_info).encode("utf-8")).hexdigest()
+
+def question_key(query: str) -> str:
+    """Hash of the normalized question: "GM, wen airdrop??" and "gm when airdrop" share it"""
+    return hashlib.sha1((normalize_query(query) or query.strip().lower()).encode("utf-8")).hexdigest()
+
+# Words that can be left out of a question without changing what it asks; interrogatives
+# ("how", "when", "why") and negations ("not", "no", "don't") are never among them
+_FILLER_WORDS = frozenset("""
+a an the please pls plz hey hi hello so just um uh anyone guys fam ser sir
+""".split())
+
+def question_signature(query: str) -> Optional[str]:
+    """
+    Near-duplicate signature: the normalized question's words in order,
+    filler words left out, so "hey, how do I claim the rewards?" and "how do
+    i claim rewards" match while "how do I deposit ETH" and "when can I
+    deposit ETH", or "withdraw usdc then deposit eth" and "deposit usdc then
+    withdraw eth", do not. None for questions with fewer than two words left,
+    which are too vague to match on anything but the exact key.
+    """
+    words = [word for word in normalize_query(query).split() if word not in _FILLER_WORDS]
+    if len(words) < 2:
+        return None
+    # Versioned, so rows signed by the earlier bag-of-words scheme never match
+    return hashlib.sha1(("v2 " + " ".join(words)).encode("utf-8")).hexdigest()
+
+class FaqStore:
+    """
+    Answers learned from resolved questions, in a SQLite database in WAL mode
+    shared by every bot shard.
+
+    An entry is written when a queued question is resolved, by the recheck
+    engine or a teammate's Slack message, and keeps the question, answer,
+    confidence, source and a hash of the context that backed the answer.
+    Lookups go by normalized-question hash, then by near-duplicate
+    signature, and call no LLM.
+
+    Only answers scored at `learn_threshold` or above are written.
+
+    Each entry also records the memory and knowledge version it was checked
+    against. When either has moved, the entry's evidence is recomputed with
+    `evidence` (retrieval for its question) once: unchanged evidence carries
+    the entry over to the new version, changed evidence deletes it. Beyond
+    `max_entries` per namespace the least recently used entries go.
+    """
+
+    def __init__(self, memory_store, knowledge_store, namespace: str, evidence: Callable[[str], str],
+                 path: str = FAQ_DB, max_entries: int = 4096, learn_threshold: float = FAQ_LEARN_CONFIDENCE):
+        self.memory_store = memory_store
+        self.knowledge_store = knowledge_store
+        self.namespace = namespace
+        self.evidence = evidence
+        self.max_entries = max_entries
+        self.learn_threshold = learn_threshold
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS faq (
+                   namespace TEXT NOT NULL,
+                   key TEXT NOT NULL,
+                   signature TEXT,
+                   query TEXT NOT NULL,
+                   answer TEXT NOT NULL,
+                   confidence REAL NOT NULL,
+                   source TEXT NOT NULL,
+                   evidence TEXT NOT NULL,
+                   version TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   last_used REAL NOT NULL,
+                   uses INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (namespace, key)
+               ) WITHOUT ROWID;
+               CREATE INDEX IF NOT EXISTS faq_by_signature ON faq (namespace, signature);
+               CREATE INDEX IF NOT EXISTS faq_by_use ON faq (namespace, last_used);"""
+        )
+
+    def _version(self) -> str:
+        self.memory_store.refresh()
+        return f"{self.memory_store.fingerprint()}/{self.knowledge_store.fingerprint()}"
+
+    def record(self, query: str, answer: str, source: str, confidence: float = 1.0,
+               evidence: Optional[str] = None) -> bool:
+        """Store or replace the answer to a question; returns False for empty or unconfident ones"""
+        answer = answer.strip()
+        if not answer or not normalize_query(query) or confidence < self.learn_threshold:
+            return False
+        version = self._version()
+        evidence = evidence if evidence is not None else self.evidence(query)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                """INSERT INTO faq (namespace, key, signature, query, answer, confidence, source, evidence, version,
+                                    created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (namespace, key) DO UPDATE SET
+                       signature = excluded.signature, query = excluded.query, answer = excluded.answer,
+                       confidence = excluded.confidence, source = excluded.source, evidence = excluded.evidence,
+                       version = excluded.version, created_at = excluded.created_at, last_used = excluded.last_used""",
+                (self.namespace, question_key(query), question_signature(query), query, answer, confidence, source,
+                 evidence, version, now, now),
+            )
+            self._conn.execute(
+                """DELETE FROM faq WHERE namespace = ? AND key IN (
+                       SELECT key FROM faq WHERE namespace = ? ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                (self.namespace, self.namespace, self.max_entries),
+            )
+        return True
+
+    def _find(self, query: str) -> Optional[sqlite3.Row]:
+        row = self._conn.execute("SELECT * FROM faq WHERE namespace = ? AND key = ?",
+                                 (self.namespace, question_key(query))).fetchone()
+        if row is None:
+            signature = question_signature(query)
+            if signature is not None:
+                row = self._conn.execute(
+                    "SELECT * FROM faq WHERE namespace = ? AND signature = ? ORDER BY last_used DESC LIMIT 1",
+                    (self.namespace, signature)).fetchone()
+        return row
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """{"query", "answer", "confidence", "source"} of the learned answer, or None"""
+        version = self._version()
+        with self._lock:
+            row = self._find(query)
+        if row is not None and row["version"] != version:
+            # Memory or knowledge moved since the entry was checked: keep it only if its evidence did not
+            if self.evidence(row["query"]) == row["evidence"]:
+                with self._lock:
+                    self._conn.execute("UPDATE faq SET version = ? WHERE namespace = ? AND key = ?",
+                                       (version, self.namespace, row["key"]))
+            else:
+                with self._lock:
+                    self._conn.execute("DELETE FROM faq WHERE namespace = ? AND key = ?", (self.namespace, row["key"]))
+                    self.invalidations += 1
+                row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE faq SET last_used = ?, uses = uses + 1 WHERE namespace = ? AND key = ?",
+                               (time.time(), self.namespace, row["key"]))
+        return {"query": row["query"], "answer": row["answer"], "confidence": row["confidence"], "source": row["source"]}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            size = self._conn.execute("SELECT count(*) FROM faq WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size,
+            "invalidations": self.invalidations,
+        }
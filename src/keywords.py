@@ -0,0 +1,113 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+import yaml
+
+KEYWORDS_FILE = os.path.join("config", "keywords.yaml")
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Alternation of the words with shared prefixes factored out, so the regex
+    engine rejects a position after a character or two instead of trying
+    every keyword there. Spaces match any run of whitespace.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        optional = "" in node
+        branches = [(r"\s+" if char == " " else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    return build(trie)
+
+class KeywordMatcher:
+    """
+    Matches every keyword of several labelled tables in one pass over a text.
+
+    All keywords are compiled into a single regex, an alternation factored
+    into a prefix trie, that only matches whole words, optionally followed by
+    one of `inflections`.
+    Because a match consumes its text, a multi-word keyword also carries the
+    labels of the keywords it contains ("core bank" reports the "bank"
+    label too), so the result is the same as testing each keyword on its own.
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, List[str]]], inflections: Iterable[str] = ()):
+        self.tables = tables
+        self._order: Dict[Tuple[str, str], int] = {}
+        labels: Dict[str, set] = {}
+        for table, entries in tables.items():
+            for label, keywords in entries.items():
+                self._order[(table, label)] = len(self._order)
+                for keyword in keywords:
+                    key = self._key(keyword)
+                    if key:
+                        labels.setdefault(key, set()).add((table, label))
+
+        self._labels: Dict[str, FrozenSet[Tuple[str, str]]] = {}
+        for key in labels:
+            words = key.split()
+            combined = set(labels[key])
+            for start in range(len(words)):
+                for end in range(start + 1, len(words) + 1):
+                    combined |= labels.get(" ".join(words[start:end]), set())
+            self._labels[key] = frozenset(combined)
+
+        alternation = _trie_pattern(self._labels)
+        endings = _trie_pattern(inflections)
+        self._pattern = re.compile(rf"(?<!\w)({alternation})(?:{endings})?(?!\w)" if endings
+                                   else rf"(?<!\w)({alternation})(?!\w)") if self._labels else None
+
+    @staticmethod
+    def _key(keyword: str) -> str:
+        return " ".join(keyword.lower().split())
+
+    def match(self, text: str) -> Dict[str, Tuple[str, ...]]:
+        """Labels found in the text per table, in the tables' order"""
+        found = set()
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text.lower()):
+                found |= self._labels[self._key(match.group(1))]
+        result: Dict[str, List[str]] = {table: [] for table in self.tables}
+        for table, label in sorted(found, key=self._order.__getitem__):
+            result[table].append(label)
+        return {table: tuple(labels) for table, labels in result.items()}
+
+def load_keywords(path: str = KEYWORDS_FILE) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+_config = load_keywords()
+
+CATEGORY_KEYWORDS: Dict[str, List[str]] = _config.get("categories") or {}
+TOPIC_KEYWORDS: Dict[str, List[str]] = _config.get("topics") or {}
+SLANG_MAP: Dict[str, str] = _config.get("slang") or {}
+INFLECTIONS: List[str] = _config.get("inflections") or []
+
+keyword_matcher = KeywordMatcher({"categories": CATEGORY_KEYWORDS, "topics": TOPIC_KEYWORDS}, INFLECTIONS)
+
+_SLANG = re.compile(r"(?<!\w)(" + "|".join(re.escape(slang) for slang in SLANG_MAP) + r")(?!\w)") if SLANG_MAP else None
+
+def expand_slang(text: str) -> str:
+    """Replace whole slang words only, so "wen" inside "between" stays put"""
+    if _SLANG is None:
+        return text
+    return _SLANG.sub(lambda match: SLANG_MAP[match.group(1)], text)
+
+@lru_cache(maxsize=65536)
+def match_keywords(text: str) -> Dict[str, Tuple[str, ...]]:
+    """Categories and topics of a text; cached, since memory messages are matched on every question"""
+    return keyword_matcher.match(text)
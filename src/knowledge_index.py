@@ -0,0 +1,144 @@
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+# Category keywords live in config/keywords.yaml
+from keywords import CATEGORY_KEYWORDS, INFLECTIONS, KeywordMatcher, keyword_matcher
+
+# Boost added to a section's confidence for each query category it mentions
+CATEGORY_BOOST = 0.2
+MIN_CONFIDENCE = 0.2
+MAX_RESULTS = 5
+
+def split_sections(knowledge: str) -> List[str]:
+    """Split knowledge text into paragraphs separated by blank lines"""
+    return [section for section in knowledge.split('\n\n') if section.strip()]
+
+class KnowledgeIndex:
+    """
+    Inverted index over knowledge sections, built once per corpus.
+
+    Terms map to postings of (section id -> precomputed BM25 weight), and
+    sections are grouped by the set of categories whose keywords they
+    mention, so a query only visits the postings of its own terms plus one
+    entry per category group. Section categories come from one pass of the
+    compiled keyword matcher while the index is built. Confidence keeps the scan's definition (query
+    term coverage plus a category boost) and BM25 orders sections with
+    equal confidence.
+    """
+
+    def __init__(self, sections: Iterable[str], category_keywords: Dict[str, List[str]] = CATEGORY_KEYWORDS,
+                 k1: float = 1.5, b: float = 0.75):
+        self.sections: List[str] = []
+        self.section_categories: List[str] = []
+        self.section_groups: List[FrozenSet[str]] = []
+        self.postings: Dict[str, Dict[int, float]] = {}
+        # category set -> primary category -> section ids in document order
+        self.category_groups: Dict[FrozenSet[str], Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        matcher = keyword_matcher if category_keywords is CATEGORY_KEYWORDS else \
+            KeywordMatcher({"categories": category_keywords}, INFLECTIONS)
+
+        term_frequencies: Dict[str, Dict[int, int]] = defaultdict(dict)
+        lengths: List[int] = []
+        for section in sections:
+            if not section.strip():
+                continue
+            section_id = len(self.sections)
+            section_lower = section.lower()
+            words = section_lower.split()
+
+            self.sections.append(section)
+            lengths.append(len(words))
+            for word in words:
+                frequencies = term_frequencies[word]
+                frequencies[section_id] = frequencies.get(section_id, 0) + 1
+
+            matched = matcher.match(section_lower)["categories"]
+            category = matched[0] if matched else 'general'
+            group = frozenset(matched)
+            self.section_categories.append(category)
+            self.section_groups.append(group)
+            self.category_groups[group][category].append(section_id)
+
+        avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        for term, frequencies in term_frequencies.items():
+            df = len(frequencies)
+            idf = math.log(1 + (len(self.sections) - df + 0.5) / (df + 0.5))
+            self.postings[term] = {
+                section_id: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[section_id] / avg_length))
+                for section_id, tf in frequencies.items()
+            }
+
+    @classmethod
+    def from_text(cls, knowledge: str, **kwargs) -> "KnowledgeIndex":
+        return cls(split_sections(knowledge), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def _category_boost(self, group: FrozenSet[str], categories: List[str]) -> float:
+        boost = 0.0
+        for category in categories:
+            if category in group:
+                boost += CATEGORY_BOOST
+        return boost
+
+    def search(self, query: str, categories: List[str], limit: int = MAX_RESULTS) -> List[Tuple[str, float, str]]:
+        """Return up to `limit` (section, confidence, category) tuples, one per category first"""
+        query_words = set(query.lower().split())
+
+        matched_terms: Dict[int, int] = defaultdict(int)
+        bm25: Dict[int, float] = defaultdict(float)
+        for term in query_words:
+            for section_id, weight in self.postings.get(term, {}).items():
+                matched_terms[section_id] += 1
+                bm25[section_id] += weight
+
+        scored = []
+        group_boosts = {}
+        for group, by_category in self.category_groups.items():
+            boost = group_boosts[group] = self._category_boost(group, categories)
+            if min(1.0, boost) <= MIN_CONFIDENCE:
+                continue
+            # Sections matching no query term all share the group's confidence and
+            # ties keep document order, so `limit` of them per category is enough
+            for section_ids in by_category.values():
+                taken = 0
+                for section_id in section_ids:
+                    if taken == limit:
+                        break
+                    if section_id not in matched_terms:
+                        scored.append((-min(1.0, boost), 0.0, section_id))
+                        taken += 1
+
+        for section_id, matched in matched_terms.items():
+            boost = group_boosts[self.section_groups[section_id]]
+            confidence = min(1.0, matched / len(query_words) + boost)
+            if confidence > MIN_CONFIDENCE:
+                scored.append((-confidence, -bm25[section_id], section_id))
+
+        return self._select_diverse(scored, limit)
+
+    def _select_diverse(self, scored: List[Tuple[float, float, int]], limit: int) -> List[Tuple[str, float, str]]:
+        """
+        Pick the best section of each category first, then fill up with the best
+        remaining ones. `scored` holds (-confidence, -bm25, section id) sort keys.
+        """
+        best_per_category: Dict[str, Tuple[float, float, int]] = {}
+        for key in scored:
+            category = self.section_categories[key[2]]
+            if category not in best_per_category or key < best_per_category[category]:
+                best_per_category[category] = key
+
+        selected = sorted(best_per_category.values())[:limit]
+        chosen = {key[2] for key in selected}
+        for key in heapq.nsmallest(limit, scored):
+            if len(selected) >= limit:
+                break
+            if key[2] not in chosen:
+                selected.append(key)
+                chosen.add(key[2])
+
+        return [(self.sections[section_id], -neg_confidence, self.section_categories[section_id])
+                for neg_confidence, _, section_id in selected]
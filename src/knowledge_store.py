@@ -0,0 +1,110 @@
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from knowledge_index import KnowledgeIndex, split_sections
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DIR = "knowledge"
+
+@dataclass
+class KnowledgeFile:
+    """One parsed knowledge file and the stat/hash it was parsed from"""
+    path: str
+    mtime_ns: int
+    size: int
+    digest: str
+    text: str
+    sections: List[str]
+
+class KnowledgeStore:
+    """
+    Keeps the knowledge directory parsed and indexed in memory.
+
+    `refresh` stats the files (at most once per `check_interval` seconds) and
+    re-reads only files whose mtime or size changed; a file whose content hash
+    is unchanged is not re-parsed. The index is rebuilt and `revision` bumped
+    only when some file's content actually changed, was added or was removed.
+    """
+
+    def __init__(self, directory: str = KNOWLEDGE_DIR, pattern: str = "*.txt", check_interval: float = 2.0):
+        self.directory = directory
+        self.pattern = pattern
+        self.check_interval = check_interval
+        self.revision = 0
+        self._files: Dict[str, KnowledgeFile] = {}
+        self._index: Optional[KnowledgeIndex] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _read(self, path: str, stat: os.stat_result) -> Optional[KnowledgeFile]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.error(f"Error reading knowledge file {path}: {e}")
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        previous = self._files.get(path)
+        if previous is not None and previous.digest == digest:
+            previous.mtime_ns, previous.size = stat.st_mtime_ns, stat.st_size
+            return previous
+        text = data.decode("utf-8", errors="replace")
+        return KnowledgeFile(path, stat.st_mtime_ns, stat.st_size, digest, text, split_sections(text))
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload changed files; returns True if the knowledge content changed"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._index is not None and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+
+            changed = False
+            files: Dict[str, KnowledgeFile] = {}
+            for path in sorted(glob.glob(os.path.join(self.directory, self.pattern))):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                current = self._files.get(path)
+                if current is not None and current.mtime_ns == stat.st_mtime_ns and current.size == stat.st_size:
+                    files[path] = current
+                    continue
+                loaded = self._read(path, stat)
+                if loaded is None:
+                    if current is not None:
+                        files[path] = current
+                    continue
+                changed = changed or loaded is not current
+                files[path] = loaded
+
+            if files.keys() != self._files.keys():
+                changed = True
+            self._files = files
+
+            if changed or self._index is None:
+                self._index = KnowledgeIndex(section for f in files.values() for section in f.sections)
+                self.revision += 1
+            return changed
+
+    def index(self) -> KnowledgeIndex:
+        """Return the index over all knowledge sections, reloading changed files first"""
+        self.refresh()
+        return self._index
+
+    def text(self) -> str:
+        """Return the concatenated text of all knowledge files"""
+        self.refresh()
+        return "\n".join(f.text for f in self._files.values())
+
+    def fingerprint(self) -> str:
+        """Content version that is the same in every process reading the same files"""
+        self.refresh()
+        return hashlib.sha1("".join(f.digest for f in self._files.values()).encode("utf-8")).hexdigest()
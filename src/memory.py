@@ -1,51 +1,227 @@
 import os
 import json
-from datetime import datetime
+import time
+import hashlib
+import threading
+from collections import deque
+from typing import Deque, Iterable, List, Set
 
+# Legacy snapshot file, imported once when no log exists yet
 MEMORY_FILE = "memory.json"
+MEMORY_LOG_FILE = "memory.jsonl"
+MAX_MESSAGES = 1000
+# Rewrite the log once it holds this many records more than the live messages
+COMPACT_SLACK = 1000
+
+def message_hash(message: str) -> str:
+    return hashlib.sha1(message.encode("utf-8")).hexdigest()
+
+class MemoryStore:
+    """
+    Slack messages held in memory and persisted as an append-only JSONL log.
+
+    Each new message is one appended line, deduplicated by hash in O(1). The
+    newest `max_messages` are kept as a ring buffer; once the log grows
+    `COMPACT_SLACK` records past that, it is rewritten to the live messages
+    through a temp file and an atomic rename. All methods are thread-safe.
+
+    Other processes sharing the log (bot shards) pick up appended lines with
+    `refresh`, which reads only the bytes past the last offset it saw and
+    reloads from scratch when the file was compacted underneath it.
+    """
+
+    def __init__(self, log_path: str = MEMORY_LOG_FILE, legacy_path: str = MEMORY_FILE,
+                 max_messages: int = MAX_MESSAGES, check_interval: float = 1.0):
+        self.log_path = log_path
+        self.legacy_path = legacy_path
+        self.max_messages = max_messages
+        self.check_interval = check_interval
+        self.revision = 0
+        self._messages: Deque[str] = deque()
+        self._hashes: Set[str] = set()
+        self._log_records = 0
+        self._log_offset = 0
+        self._log_inode = None
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self._load()
+
+    def _apply_add(self, message: str) -> bool:
+        digest = message_hash(message)
+        if digest in self._hashes:
+            return False
+        self._messages.append(message)
+        self._hashes.add(digest)
+        if len(self._messages) > self.max_messages:
+            self._hashes.discard(message_hash(self._messages.popleft()))
+        return True
+
+    def _apply_clear(self):
+        self._messages.clear()
+        self._hashes.clear()
+
+    def _read_log(self) -> int:
+        """Apply log records past the current offset; returns how many messages were new"""
+        added = 0
+        with open(self.log_path, "rb") as f:
+            self._log_inode = os.fstat(f.fileno()).st_ino
+            f.seek(self._log_offset)
+            data = f.read()
+        # Only consume complete lines; a partial last line is still being written
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn line from a crash mid-append
+                continue
+            self._log_records += 1
+            if "text" in record:
+                added += self._apply_add(record["text"])
+        self._log_offset += end
+        return added
+
+    def _load(self):
+        if os.path.exists(self.log_path):
+            self._read_log()
+        elif os.path.exists(self.legacy_path):
+            with open(self.legacy_path, "r") as f:
+                for message in json.load(f).get("global", []):
+                    self._apply_add(message)
+            self.compact()
+        self.revision += 1
+
+    def _append(self, records: List[dict]):
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        with open(self.log_path, "a+b") as f:
+            start = f.seek(0, os.SEEK_END)
+            if start:
+                # Never glue a record onto a torn line left by a crash
+                f.seek(start - 1)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            if self._log_inode is None:
+                self._log_inode = os.fstat(f.fileno()).st_ino
+        # Skip our own lines on the next refresh unless another writer appended before them
+        if start == self._log_offset:
+            self._log_offset = start + len(data)
+        self._log_records += len(records)
+        if self._log_records > len(self._messages) + COMPACT_SLACK:
+            self.compact()
+
+    def add(self, message: str) -> bool:
+        """Store a message; returns False if it was already stored"""
+        return self.extend([message]) == 1
+
+    def extend(self, messages: Iterable[str]) -> int:
+        """Store several messages with a single log write; returns how many were new"""
+        with self._lock:
+            now = time.time()
+            records = [{"op": "add", "ts": now, "text": message} for message in messages if self._apply_add(message)]
+            if records:
+                self._append(records)
+                self.revision += 1
+            return len(records)
+
+    def replace(self, messages: Iterable[str]):
+        """Replace all stored messages"""
+        with self._lock:
+            self._apply_clear()
+            for message in messages:
+                self._apply_add(message)
+            self.compact()
+            self.revision += 1
+
+    def compact(self):
+        """Rewrite the log so it holds only the live messages"""
+        with self._lock:
+            tmp_path = self.log_path + ".tmp"
+            now = time.time()
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for message in self._messages:
+                    f.write(json.dumps({"op": "add", "ts": now, "text": message}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.log_path)
+            stat = os.stat(self.log_path)
+            self._log_inode, self._log_offset = stat.st_ino, stat.st_size
+            self._log_records = len(self._messages)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Pick up messages other processes appended to the log; returns True if any were new"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+            try:
+                stat = os.stat(self.log_path)
+            except OSError:
+                return False
+            if stat.st_ino != self._log_inode or stat.st_size < self._log_offset:
+                # Compacted or replaced by another process: read it again from the start
+                self._apply_clear()
+                self._log_records = self._log_offset = 0
+                self._read_log()
+                self.revision += 1
+                return True
+            if stat.st_size == self._log_offset or not self._read_log():
+                return False
+            self.revision += 1
+            return True
+
+    def fingerprint(self) -> str:
+        """Content version that is the same in every process holding the same messages"""
+        with self._lock:
+            last = message_hash(self._messages[-1]) if self._messages else ""
+            return f"{len(self._messages)}:{last}"
+
+    def messages(self) -> List[str]:
+        """Snapshot of stored messages, oldest first"""
+        self.refresh()
+        with self._lock:
+            return list(self._messages)
+
+    def __contains__(self, message: str) -> bool:
+        return message_hash(message) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+_memory_store = None
+_memory_store_lock = threading.Lock()
+
+def get_memory_store() -> MemoryStore:
+    """The default memory log, opened on first use so importing this module touches no file"""
+    global _memory_store
+    if _memory_store is None:
+        with _memory_store_lock:
+            if _memory_store is None:
+                _memory_store = MemoryStore()
+    return _memory_store
 
 def load_memory():
-    """Load messages from memory file, always reading fresh data"""
-    try:
-        with open(MEMORY_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"global": []}
+    """Return stored messages in the legacy {"global": [...]} shape"""
+    return {"global": get_memory_store().messages()}
 
 def save_memory(memory):
-    """Save messages to memory file immediately"""
-    with open(MEMORY_FILE, "w") as f:
-        json.dump(memory, f, indent=2)
+    """Replace stored messages with the ones in a {"global": [...]} dict"""
+    get_memory_store().replace(memory.get("global", []))
 
 def get_faq_answer(query: str) -> str:
-    memory = load_memory()
     # Only check global memory (Slack messages)
-    global_messages = memory.get("global", [])
-    for message in global_messages:
-        if query.lower() in message.lower():
+    query_lower = query.lower()
+    for message in get_memory_store().messages():
+        if query_lower in message.lower():
             return message
     return ""
 
-def update_global_memory(message: str):
-    """Add a new Slack message to memory with timestamp"""
-    memory = load_memory()
-    global_messages = memory.get("global", [])
-    
-    # Add message if it's new
-    if message not in global_messages:
-        global_messages.append(message)
-        # Keep only the last 1000 messages to prevent file from growing too large
-        if len(global_messages) > 1000:
-            global_messages = global_messages[-1000:]
-        memory["global"] = global_messages
-        save_memory(memory)
-    
-    return memory
+def update_global_memory(message: str) -> bool:
+    """Add a new Slack message to memory with timestamp; returns False for duplicates"""
+    return get_memory_store().add(message)
 
 def clear_memory():
     """Clear all memory except structure"""
-    save_memory({"global": []})
-
-# Initialize memory file if it doesn't exist
-if not os.path.exists(MEMORY_FILE):
-    save_memory({"global": []})
+    get_memory_store().replace([])
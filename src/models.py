@@ -0,0 +1,122 @@
+import os
+import logging
+import threading
+from dataclasses import dataclass, fields, replace
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+MODELS_FILE = os.getenv("MODELS_FILE", os.path.join("config", "models.yaml"))
+
+# Stages of the answer pipeline that call an LLM
+STAGES = ("classify", "casual", "answer", "grade", "fused", "recheck")
+
+@dataclass(frozen=True)
+class StageModel:
+    """Settings of the client one stage calls; fixed once the client is built"""
+    stage: str
+    model: str = "gpt-3.5-turbo"
+    temperature: float = 0.1
+    max_tokens: Optional[int] = None
+    timeout: float = 30.0
+    max_retries: int = 2
+    # Share of a question's deadline this stage may spend
+    deadline_share: float = 1.0
+    # OpenAI-compatible server for a local model (llama.cpp, vLLM, Ollama), None for OpenAI
+    base_url: Optional[str] = None
+    # Environment variable holding the key for base_url, OPENAI_API_KEY when unset
+    api_key_env: Optional[str] = None
+
+def _openai_client(settings: StageModel):
+    from langchain_openai import ChatOpenAI
+    from telemetry import telemetry
+
+    kwargs = {}
+    if settings.base_url:
+        kwargs["base_url"] = settings.base_url
+        kwargs["api_key"] = os.getenv(settings.api_key_env or "OPENAI_API_KEY", "unused")
+    return ChatOpenAI(
+        model_name=settings.model,
+        temperature=settings.temperature,
+        max_tokens=settings.max_tokens,
+        timeout=settings.timeout,
+        max_retries=settings.max_retries,
+        stream_usage=True,
+        callbacks=[telemetry.callback],
+        **kwargs,
+    )
+
+class ModelRouter:
+    """
+    One chat client per pipeline stage, each with its own model, temperature,
+    max_tokens and timeout from config/models.yaml.
+
+    A client is built on first use and never changed afterwards, so concurrent
+    questions cannot see each other's settings. Stages sharing identical
+    settings share a client. `factory` builds a client from a StageModel; the
+    benchmarks swap in a fake one.
+
+    `client(stage, retries=False)` is the same client with max_retries 0, for
+    calls bounded by a deadline: the OpenAI client retries a request that
+    timed out, so a retrying call can take (max_retries + 1) times its timeout.
+    """
+
+    def __init__(self, stages: Dict[str, StageModel], factory: Callable[[StageModel], object] = _openai_client):
+        self.stages = stages
+        self.factory = factory
+        self._clients: Dict[Tuple[str, bool], object] = {}
+        self._built: Dict[StageModel, object] = {}
+        self._lock = threading.Lock()
+
+    def settings(self, stage: str) -> StageModel:
+        return self.stages.get(stage) or StageModel(stage)
+
+    def client(self, stage: str, retries: bool = True):
+        client = self._clients.get((stage, retries))
+        if client is None:
+            with self._lock:
+                client = self._clients.get((stage, retries))
+                if client is None:
+                    # Settings that do not reach the client do not split it
+                    key = replace(self.settings(stage), stage="", deadline_share=1.0)
+                    if not retries:
+                        key = replace(key, max_retries=0)
+                    client = self._built.get(key)
+                    if client is None:
+                        client = self._built[key] = self.factory(key)
+                    self._clients[(stage, retries)] = client
+        return client
+
+    def use(self, factory: Callable[[StageModel], object]):
+        """Build every client with `factory` from now on"""
+        with self._lock:
+            self.factory = factory
+            self._clients.clear()
+            self._built.clear()
+
+    def warm_up(self, stages: Iterable[str] = STAGES):
+        for stage in stages:
+            self.client(stage)
+            self.client(stage, retries=False)
+
+def load_models(path: str = MODELS_FILE) -> ModelRouter:
+    """Router for the stages in `path`; unknown keys are ignored, missing stages take the defaults"""
+    config = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    else:
+        logger.warning(f"{path} not found, every stage uses the default model")
+
+    known = {field.name for field in fields(StageModel)} - {"stage"}
+    defaults = {key: value for key, value in (config.get("defaults") or {}).items() if key in known}
+    stages = {}
+    for stage in STAGES:
+        overrides = {key: value for key, value in ((config.get("stages") or {}).get(stage) or {}).items() if key in known}
+        stages[stage] = StageModel(stage, **{**defaults, **overrides})
+        env_model = os.getenv(f"{stage.upper()}_MODEL")
+        if env_model:
+            stages[stage] = replace(stages[stage], model=env_model)
+    return ModelRouter(stages)
@@ -0,0 +1,105 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import yaml
+
+from memory import MemoryStore, get_memory_store
+from knowledge_store import KnowledgeStore
+
+DEFAULT_NAMESPACE = "default"
+CHANNELS_FILE = os.path.join("config", "channels.yaml")
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", "knowledge")
+
+_NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+@dataclass
+class Namespace:
+    """Knowledge and Slack memory answering the channels routed to one namespace"""
+    name: str
+    memory_store: MemoryStore
+    knowledge_store: KnowledgeStore
+
+_namespaces: Dict[str, Namespace] = {}
+_namespaces_lock = threading.Lock()
+
+def get_namespace(name: str = DEFAULT_NAMESPACE) -> Namespace:
+    """
+    Return the stores of a namespace, opening them on first use.
+
+    The default namespace is the existing `knowledge/` directory and
+    `memory.jsonl` log; any other namespace reads `knowledge/<name>/*.txt`
+    and keeps its Slack memory in `memory.<name>.jsonl`.
+    """
+    with _namespaces_lock:
+        namespace = _namespaces.get(name)
+        if namespace is None:
+            if not _NAME_PATTERN.match(name):
+                raise ValueError(f"Invalid namespace name: {name!r}")
+            if name == DEFAULT_NAMESPACE:
+                namespace = Namespace(name, get_memory_store(), KnowledgeStore(KNOWLEDGE_DIR))
+            else:
+                namespace = Namespace(
+                    name,
+                    MemoryStore(f"memory.{name}.jsonl", legacy_path=""),
+                    KnowledgeStore(os.path.join(KNOWLEDGE_DIR, name)),
+                )
+            _namespaces[name] = namespace
+        return namespace
+
+class ChannelRouter:
+    """
+    Maps Discord channels and guilds, and Slack channels, to namespaces.
+
+    A Discord message is answered if its channel is listed, or else if its
+    guild is listed (every channel of that guild); anything else is ignored.
+    """
+
+    def __init__(self, channels: Dict[str, str], guilds: Optional[Dict[str, str]] = None,
+                 slack_channels: Optional[Dict[str, str]] = None):
+        self.channels = {str(key): value for key, value in channels.items()}
+        self.guilds = {str(key): value for key, value in (guilds or {}).items()}
+        self.slack_channels = {str(key): value for key, value in (slack_channels or {}).items()}
+        for name in self.namespaces():
+            if not _NAME_PATTERN.match(name):
+                raise ValueError(f"Invalid namespace name in channel routing: {name!r}")
+
+    def route(self, guild_id: Optional[str], channel_id: str) -> Optional[str]:
+        """Namespace answering a Discord channel, or None if the bot should stay quiet there"""
+        namespace = self.channels.get(str(channel_id))
+        if namespace is None and guild_id is not None:
+            namespace = self.guilds.get(str(guild_id))
+        return namespace
+
+    def slack_namespace(self, channel_id: str) -> Optional[str]:
+        """Namespace whose memory a Slack channel feeds, or None if it is not ingested"""
+        return self.slack_channels.get(str(channel_id))
+
+    def namespaces(self) -> List[str]:
+        names = [*self.channels.values(), *self.guilds.values(), *self.slack_channels.values()]
+        return list(dict.fromkeys(names)) or [DEFAULT_NAMESPACE]
+
+def load_router(path: str = CHANNELS_FILE, fallback_channel_id: Optional[str] = None,
+                fallback_slack_channel_id: Optional[str] = None) -> ChannelRouter:
+    """
+    Read channel routing from YAML. When the file or one of its sections is
+    missing, the single fallback Discord or Slack channel is routed to the
+    default namespace instead.
+    """
+    config = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            config = yaml.safe_load(f) or {}
+    discord_config = config.get("discord") or {}
+    slack_config = config.get("slack") or {}
+
+    channels = discord_config.get("channels") or {}
+    guilds = discord_config.get("guilds") or {}
+    if not channels and not guilds and fallback_channel_id:
+        channels = {fallback_channel_id: DEFAULT_NAMESPACE}
+    slack_channels = slack_config.get("channels") or {}
+    if not slack_channels and fallback_slack_channel_id:
+        slack_channels = {fallback_slack_channel_id: DEFAULT_NAMESPACE}
+    return ChannelRouter(channels, guilds, slack_channels)
@@ -0,0 +1,14 @@
+import re
+
+# Common crypto slang replacements, from config/keywords.yaml
+from keywords import SLANG_MAP
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a question for exact-match lookups: lowercase, punctuation
+    dropped, whitespace collapsed and slang words expanded via SLANG_MAP.
+    """
+    words = _NON_WORD.sub(" ", query.lower()).split()
+    return " ".join(SLANG_MAP.get(word, word) for word in words)
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from pydantic import BaseModel, Field
+
+from faq import evidence_hash
+from memory import message_hash
+from namespaces import DEFAULT_NAMESPACE
+from unanswered import load_unanswered, remove_answered
+from slack_fallback import anotify_slack
+from telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+class RecheckItem(BaseModel):
+    id: int = Field(description="Number of the question being answered")
+    answer: str = Field(description="Answer in under 2 sentences, empty if the context does not answer it")
+    confidence: float = Field(description="Confidence from 0 to 1 that the answer is accurate and safe to post")
+
+class RecheckBatch(BaseModel):
+    """Answers for a batch of queued questions"""
+    items: List[RecheckItem]
+
+def _batch_prompt(batch: List[Tuple[str, List[Tuple[str, float, str]]]]) -> str:
+    questions = []
+    for number, (query, relevant_info) in enumerate(batch, 1):
+        context = "\n".join(info[0] for info in relevant_info)
+        questions.append(f"### Question {number}\nCONTEXT:\n{context}\n\nQuestion: \"{query}\"")
+
+    return f"""You are Untitled Bank's assistant. Answer each question below using ONLY its own CONTEXT.
+
+{chr(10).join(questions)}
+
+For every question return its number, an answer and a confidence:
+1. Answer ONLY the specific question asked, in under 2 sentences, direct and clear
+2. For sensitive topics (funds, tokens, airdrop), be extra clear
+3. If the CONTEXT does not answer the question, leave the answer empty
+4. Confidence: 1.0 verified by the context, 0.8 good but might need minor details,
+   0.5 technically correct but might need more context, 0.3 possibly misleading, 0.0 wrong or no answer"""
+
+class RecheckEngine:
+    """
+    Re-evaluates queued questions only when their evidence changed.
+
+    Each pass scans only Slack messages that arrived since the previous pass
+    for a direct match, then re-runs retrieval for the remaining questions and
+    fingerprints the context found. Questions whose fingerprint matches the
+    one they were last graded with are skipped; the rest are answered in
+    batches of `batch_size` per LLM call, at most `concurrency` calls at a
+    time. Blocking work runs in worker threads, off the event loop. One
+    engine serves the queued questions of one namespace. The LLM client
+    comes from `llm_factory` on the first batch.
+
+    A Slack message containing a question only resolves it; the message is
+    not an answer to learn. Generated answers graded at `resolve_threshold`
+    resolve their question, and those the FAQ store's stricter learning
+    threshold accepts are recorded in `faq_store`, so the next asker is
+    answered without the pipeline.
+    """
+
+    def __init__(self, retrieve_context: Callable[[str], Tuple[List[Tuple[str, float, str]], str]], llm_factory: Callable,
+                 memory_store, knowledge_store, batch_size: int = 8, concurrency: int = 2,
+                 resolve_threshold: float = 0.5, namespace: str = DEFAULT_NAMESPACE, faq_store=None):
+        self.namespace = namespace
+        self.faq_store = faq_store
+        self.retrieve_context = retrieve_context
+        self.llm_factory = llm_factory
+        self._batch_llm = None
+        self.memory_store = memory_store
+        self.knowledge_store = knowledge_store
+        self.batch_size = batch_size
+        self.resolve_threshold = resolve_threshold
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._seen_messages: set = set()
+        self._revisions = None
+        self._fingerprints: Dict[str, str] = {}
+
+    def batch_llm(self):
+        if self._batch_llm is None:
+            self._batch_llm = self.llm_factory().with_structured_output(RecheckBatch, method="function_calling")
+        return self._batch_llm
+
+    def _new_messages(self) -> List[str]:
+        messages = self.memory_store.messages()
+        new = [message for message in messages if message_hash(message) not in self._seen_messages]
+        self._seen_messages = {message_hash(message) for message in messages}
+        return new
+
+    def _collect(self, queries: List[str], revisions_changed: bool) -> Tuple[List[Tuple[str, str]], List[Tuple[str, List, str]]]:
+        """Return (question, message) for questions quoted by new messages, and the ones to regrade"""
+        new_messages = self._new_messages()
+        direct, to_grade = [], []
+        for query in queries:
+            message = next((message for message in new_messages if query.lower() in message.lower()), None)
+            if message is not None:
+                direct.append((query, message))
+                continue
+            if query in self._fingerprints and not revisions_changed:
+                continue
+            relevant_info, _ = self.retrieve_context(query)
+            fingerprint = evidence_hash(relevant_info)
+            if not relevant_info or self._fingerprints.get(query) == fingerprint:
+                self._fingerprints[query] = fingerprint
+                continue
+            to_grade.append((query, relevant_info, fingerprint))
+        return direct, to_grade
+
+    async def _grade_batch(self, batch: List[Tuple[str, List, str]]) -> List[Tuple[str, str, float, str]]:
+        async with self._semaphore:
+            try:
+                with telemetry.span("recheck"):
+                    result = await self.batch_llm().ainvoke(_batch_prompt([(query, info) for query, info, _ in batch]))
+            except Exception as e:
+                logger.error(f"Error rechecking unanswered batch: {e}")
+                return []
+        # Remember what each question was graded against so unchanged ones are skipped next time
+        for query, _, fingerprint in batch:
+            self._fingerprints[query] = fingerprint
+        answered = []
+        for item in result.items:
+            if 1 <= item.id <= len(batch) and item.answer.strip() and item.confidence >= self.resolve_threshold:
+                query, _, fingerprint = batch[item.id - 1]
+                answered.append((query, item.answer.strip(), item.confidence, fingerprint))
+        return answered
+
+    async def run_pass(self) -> List[Tuple[str, str]]:
+        """Run one recheck pass; returns (query, answer) for each resolved question"""
+        queue = await asyncio.to_thread(load_unanswered, self.namespace)
+        queries = list(queue)
+        self._fingerprints = {query: fp for query, fp in self._fingerprints.items() if query in queue}
+
+        await asyncio.to_thread(self.knowledge_store.refresh)
+        await asyncio.to_thread(self.memory_store.refresh)
+        revisions = (self.memory_store.revision, self.knowledge_store.revision)
+        revisions_changed = revisions != self._revisions
+        self._revisions = revisions
+
+        direct, to_grade = await asyncio.to_thread(self._collect, queries, revisions_changed)
+        batches = [to_grade[i:i + self.batch_size] for i in range(0, len(to_grade), self.batch_size)]
+        graded = await asyncio.gather(*(self._grade_batch(batch) for batch in batches))
+
+        resolved = []
+        for query, message in direct:
+            await asyncio.to_thread(remove_answered, query, None, self.namespace)
+            self._fingerprints.pop(query, None)
+            await anotify_slack(f"Found answer in Slack for: {query}")
+            resolved.append((query, ""))
+        for query, answer, confidence, fingerprint in (item for answered in graded for item in answered):
+            await asyncio.to_thread(remove_answered, query, answer, self.namespace)
+            await self._learn(query, answer, "recheck", confidence, fingerprint)
+            self._fingerprints.pop(query, None)
+            await anotify_slack(f"Generated answer for: {query}")
+            resolved.append((query, answer))
+        return resolved
+
+    async def _learn(self, query: str, answer: str, source: str, confidence: float, evidence: str):
+        if self.faq_store is None:
+            return
+        try:
+            await asyncio.to_thread(self.faq_store.record, query, answer, source, confidence, evidence)
+        except Exception as e:
+            logger.error(f"Error recording FAQ answer for {query}: {e}")
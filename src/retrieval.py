@@ -0,0 +1,223 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from memory import message_hash
+from normalize import normalize_query
+
+EMBEDDINGS_DIR = "embeddings"
+
+# Words too common to say anything about what a message is about
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from get has have how i if in into is it its me my
+not of on or our so that the their them then there they this to was we what when where which
+who why will with you your
+""".split())
+
+class HashingEmbedder:
+    """
+    Deterministic offline embedder: signed feature hashing of content words,
+    word bigrams and (down-weighted) character trigrams into a fixed number of
+    dimensions. The trigrams let "withdraw" and "withdrawal" share features.
+    """
+
+    def __init__(self, dim: int = 1024, trigram_weight: float = 0.3):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.id = f"hashing-{dim}-{trigram_weight}"
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        words = [word for word in normalize_query(text).split() if word not in STOPWORDS]
+        features = [(word, 1.0) for word in words]
+        features += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"#{word}#"
+            features += [(padded[i:i + 3], self.trigram_weight) for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                matrix[row, h % self.dim] += weight if h >> 63 else -weight
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model; `model` is a local path or an already cached model name"""
+
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.id = f"st-{os.path.basename(model.rstrip('/'))}-{self.dim}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+def get_embedder(spec: str = "hashing"):
+    """"hashing" or "hashing:<dim>" for the built-in embedder, anything else is a local model"""
+    if spec == "hashing" or spec.startswith("hashing:"):
+        _, _, dim = spec.partition(":")
+        return HashingEmbedder(int(dim) if dim else 1024)
+    return SentenceTransformerEmbedder(spec)
+
+class VectorIndex:
+    """
+    Embeddings for a collection of texts, kept in a memory-mapped float32 file.
+
+    Rows are keyed by text hash and only ever appended, so `sync` embeds just
+    the texts it has not seen before and a restart re-uses everything already
+    on disk. Rows that no longer belong to the synced collection are dropped
+    when the file grows to twice the live size.
+
+    The files have a single owner: row numbers live in memory and compaction
+    deletes them, so two processes must not share a directory (shards.py
+    gives each process its own).
+    """
+
+    def __init__(self, name: str, embedder, directory: str = EMBEDDINGS_DIR):
+        self.embedder = embedder
+        self.directory = directory
+        self._vectors_path = os.path.join(directory, f"{name}.f32")
+        self._keys_path = os.path.join(directory, f"{name}.keys")
+        self._meta_path = os.path.join(directory, f"{name}.meta.json")
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        # (texts, their vectors) swapped in as one tuple so searches never see a half-synced state
+        self._snapshot: Tuple[List[str], np.ndarray] = ([], np.zeros((0, embedder.dim), dtype=np.float32))
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {"embedder": self.embedder.id, "dim": self.embedder.dim}
+        try:
+            with open(self._meta_path, "r") as f:
+                stored_meta = json.load(f)
+        except (OSError, ValueError):
+            stored_meta = None
+        if stored_meta != meta:
+            # Different embedder or no index yet: start from scratch
+            for path in (self._vectors_path, self._keys_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            with open(self._meta_path, "w") as f:
+                json.dump(meta, f)
+            return
+
+        keys = []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "r") as f:
+                keys = f.read().split()
+        row_bytes = 4 * self.embedder.dim
+        stored_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        # Vectors are written before keys, so a crash can only leave extra vectors; drop them
+        keys = keys[:stored_rows]
+        if stored_rows > len(keys):
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(len(keys) * row_bytes)
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._open_matrix(len(keys))
+
+    def _open_matrix(self, rows: int):
+        if rows:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.embedder.dim))
+        else:
+            self._matrix = None
+
+    def _append(self, keys: List[str], vectors: np.ndarray):
+        with open(self._vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._keys_path, "a") as f:
+            f.write("".join(key + "\n" for key in keys))
+        start = len(self._rows)
+        for offset, key in enumerate(keys):
+            self._rows[key] = start + offset
+        self._open_matrix(len(self._rows))
+
+    def _compact(self, live_keys: List[str]):
+        vectors = np.asarray(self._matrix[[self._rows[key] for key in live_keys]]) if live_keys else None
+        self._matrix = None
+        for path in (self._vectors_path, self._keys_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._rows = {}
+        if live_keys:
+            self._append(live_keys, vectors)
+
+    def sync(self, texts: Sequence[str]):
+        """Make `texts` the searchable collection, embedding only unseen ones"""
+        with self._lock:
+            keys = [message_hash(text) for text in texts]
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            if missing:
+                self._append(list(missing), self.embedder.embed(list(missing.values())))
+
+            live_keys = list(dict.fromkeys(keys))
+            if len(self._rows) > 2 * len(live_keys) + 1024:
+                self._compact(live_keys)
+
+            if keys:
+                active = np.asarray(self._matrix[[self._rows[key] for key in keys]])
+            else:
+                active = np.zeros((0, self.embedder.dim), dtype=np.float32)
+            self._snapshot = (list(texts), active)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float, int]]:
+        """Return (text, cosine similarity, position in the synced texts) of the top `k` texts"""
+        texts, active = self._snapshot
+        if not len(active):
+            return []
+        scores = active @ self.embedder.embed([query])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(texts[position], float(scores[position]), int(position)) for position in top]
+
+class SemanticRetriever:
+    """
+    Embedding search over Slack memory and knowledge sections. Each
+    collection is re-synced only when its store's revision changes, so new
+    Slack messages are embedded incrementally as they arrive.
+    """
+
+    def __init__(self, memory_store, knowledge_store, embedder, directory: str = EMBEDDINGS_DIR,
+                 min_score: float = 0.2):
+        self.memory_store = memory_store
+        self.knowledge_store = knowledge_store
+        self.min_score = min_score
+        self.memory_index = VectorIndex("memory", embedder, directory)
+        self.knowledge_index = VectorIndex("knowledge", embedder, directory)
+        self._memory_revision = None
+        self._knowledge_revision = None
+        self._section_categories: List[str] = []
+        self._lock = threading.Lock()
+
+    def search_memory(self, query: str, k: int = 1) -> List[Tuple[str, float, str]]:
+        self.memory_store.refresh()
+        with self._lock:
+            if self.memory_store.revision != self._memory_revision:
+                self._memory_revision = self.memory_store.revision
+                self.memory_index.sync(self.memory_store.messages())
+        return [(text, score, 'semantic')
+                for text, score, _ in self.memory_index.search(query, k) if score >= self.min_score]
+
+    def search_knowledge(self, query: str, k: int = 5) -> List[Tuple[str, float, str]]:
+        with self._lock:
+            index = self.knowledge_store.index()
+            if self.knowledge_store.revision != self._knowledge_revision:
+                self._knowledge_revision = self.knowledge_store.revision
+                self.knowledge_index.sync(index.sections)
+                self._section_categories = list(index.section_categories)
+            categories = self._section_categories
+        return [(text, score, categories[position])
+                for text, score, position in self.knowledge_index.search(query, k) if score >= self.min_score]
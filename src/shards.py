@@ -0,0 +1,65 @@
+"""
+Run the Discord bot as several processes, each owning a slice of the shards.
+
+    SHARD_PROCESSES=4 SHARD_COUNT=8 python src/shards.py
+
+Shard ids are dealt round-robin over the processes. Only the first process
+runs the recheck loop and Slack ingestion; the others see new Slack memory
+by tailing the shared memory log. The answer cache defaults to the shared
+SQLite backend so every process serves what any of them already answered.
+The embedding index of RETRIEVAL_BACKEND=embedding|hybrid is the exception:
+its files are rewritten in place by their one writer, so process n keeps its
+own under EMBEDDINGS_DIR/process-n and embeds the shared memory itself.
+Process n serves its Prometheus metrics on METRICS_PORT + n.
+"""
+import os
+import sys
+import signal
+import subprocess
+import logging
+from typing import List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+
+def shard_slices(shard_count: int, processes: int) -> List[List[int]]:
+    """Deal shard ids round-robin over the processes"""
+    return [list(range(first, shard_count, processes)) for first in range(min(processes, shard_count))]
+
+def main():
+    processes = int(os.getenv("SHARD_PROCESSES", str(os.cpu_count() or 1)))
+    shard_count = int(os.getenv("SHARD_COUNT", str(processes)))
+    # Each process serves its metrics on its own port, counting up from METRICS_PORT
+    metrics_port = int(os.getenv("METRICS_PORT", "9108"))
+    embeddings_dir = os.getenv("EMBEDDINGS_DIR", "embeddings")
+
+    children = []
+    for number, shard_ids in enumerate(shard_slices(shard_count, processes)):
+        env = dict(os.environ)
+        env["SHARD_COUNT"] = str(shard_count)
+        env["SHARD_IDS"] = ",".join(str(shard_id) for shard_id in shard_ids)
+        env["RUN_BACKGROUND_JOBS"] = "1" if number == 0 else "0"
+        env.setdefault("ANSWER_CACHE_BACKEND", "sqlite")
+        env["EMBEDDINGS_DIR"] = os.path.join(embeddings_dir, f"process-{number}")
+        if metrics_port:
+            env["METRICS_PORT"] = str(metrics_port + number)
+        logger.info(f"Starting bot process {number} with shards {shard_ids} of {shard_count}")
+        children.append(subprocess.Popen([sys.executable, BOT_SCRIPT], env=env))
+
+    def stop(signum, frame):
+        for child in children:
+            if child.poll() is None:
+                child.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    exit_code = 0
+    for child in children:
+        exit_code = child.wait() or exit_code
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
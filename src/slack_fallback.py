@@ -1,35 +1,209 @@
 import os
+import logging
+import random
+import re
+import asyncio
+import threading
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
+SLACK_TIMEOUT_SECONDS = float(os.getenv("SLACK_TIMEOUT_SECONDS", "10"))
+# Notifications arriving within this many seconds are sent as one digest message
+SLACK_DIGEST_WINDOW_SECONDS = float(os.getenv("SLACK_DIGEST_WINDOW_SECONDS", "5"))
+# Slack allows about one incoming-webhook post per second
+SLACK_MIN_POST_INTERVAL_SECONDS = float(os.getenv("SLACK_MIN_POST_INTERVAL_SECONDS", "1"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class SlackNotifier:
+    """
+    Posts webhook notifications from a background task on the event loop.
+
+    Callers only enqueue text, from the loop or from any thread. The sender
+    waits `window` seconds after the first queued message, then sends what
+    arrived, de-duplicated, as one digest over a pooled aiohttp session,
+    leaving at least `min_interval` seconds between posts. 429 and 5xx responses are retried with exponential backoff, honouring
+    Retry-After. Without a running event loop, messages are posted
+    synchronously through a pooled requests session with the same retry
+    policy.
+    """
+
+    def __init__(self, webhook_url: Optional[str], window: float = SLACK_DIGEST_WINDOW_SECONDS,
+                 timeout: float = SLACK_TIMEOUT_SECONDS, max_retries: int = 5, backoff: float = 1.0,
+                 max_batch: int = 100, min_interval: float = SLACK_MIN_POST_INTERVAL_SECONDS):
+        self.webhook_url = webhook_url
+        self.window = window
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+        self.posts = 0
+        self.retries = 0
+        self.failures = 0
+        self.delivered = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sync_session: Optional[requests.Session] = None
+        self._last_post = 0.0
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self, loop: asyncio.AbstractEventLoop):
+        with self._start_lock:
+            if self._task is None or self._task.done() or self._loop is not loop:
+                self._loop = loop
+                self._queue = asyncio.Queue()
+                self._task = loop.create_task(self._run())
+
+    def notify(self, text: str):
+        """Queue a message; safe to call from the event loop or any other thread"""
+        if not self.webhook_url:
+            logger.warning("No Slack webhook URL configured.")
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is not None:
+            self._ensure_started(running)
+            self._queue.put_nowait(text)
+        elif self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, text)
+        else:
+            self._post_sync(text)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            messages = list(dict.fromkeys(batch))
+            try:
+                if await self._post(self._digest(messages)):
+                    self.delivered += len(messages)
+            except Exception as e:
+                logger.error(f"Error notifying Slack: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _digest(self, messages: List[str]) -> dict:
+        if len(messages) == 1:
+            return {"text": messages[0]}
+        return {"text": f"{len(messages)} notifications:\n" + "\n".join(f"• {message}" for message in messages)}
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def _post(self, payload: dict) -> bool:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        for attempt in range(self.max_retries + 1):
+            wait = self._last_post + self.min_interval - self._loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_post = self._loop.time()
+            self.posts += 1
+            try:
+                async with self._session.post(self.webhook_url, json=payload) as response:
+                    if response.status == 200:
+                        return True
+                    body = await response.text()
+                    retry_after = response.headers.get("Retry-After")
+                    if response.status not in RETRY_STATUSES:
+                        self.failures += 1
+                        logger.error(f"Slack notification failed: {response.status}, {body}")
+                        return False
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retry_after = None
+                logger.error(f"Error notifying Slack: {e}")
+            if attempt < self.max_retries:
+                self.retries += 1
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        self.failures += 1
+        logger.error("Slack notification dropped after retries")
+        return False
+
+    def _post_sync(self, text: str):
+        if self._sync_session is None:
+            self._sync_session = requests.Session()
+            retry = Retry(total=self.max_retries, backoff_factor=self.backoff, status_forcelist=RETRY_STATUSES,
+                          allowed_methods=None, respect_retry_after_header=True)
+            self._sync_session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=4))
+            self._sync_session.mount("http://", HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        try:
+            self.posts += 1
+            response = self._sync_session.post(self.webhook_url, json={"text": text}, timeout=self.timeout)
+            if response.status_code == 200:
+                self.delivered += 1
+            else:
+                self.failures += 1
+                logger.error(f"Slack notification failed: {response.status_code}, {response.text}")
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error notifying Slack: {e}")
+
+    async def flush(self):
+        """Wait until every queued message has been sent"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def aclose(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+notifier = SlackNotifier(SLACK_WEBHOOK_URL)
+
+def _unanswered_message(query: str) -> str:
+    return f"New unanswered query received: '{query}'. Please update the knowledge base if possible."
+
+_ESCALATION = re.compile(r"New unanswered query received: '(.*?)'\. Please update the knowledge base")
+_LOW_CONFIDENCE_PREFIX = "Low confidence answer provided for: "
+
+def escalated_queries(text: str) -> List[str]:
+    """Questions escalated in a notification or digest posted by notify_slack"""
+    queries = []
+    for query in _ESCALATION.findall(text):
+        if query.startswith(_LOW_CONFIDENCE_PREFIX):
+            query = query[len(_LOW_CONFIDENCE_PREFIX):]
+        queries.append(query)
+    return queries
 
 def notify_slack(query: str):
-    if not SLACK_WEBHOOK_URL:
-        print("No Slack webhook URL configured.")
-        return
-    message = {
-        "text": f"New unanswered query received: '{query}'. Please update the knowledge base if possible."
-    }
-    try:
-        response = requests.post(SLACK_WEBHOOK_URL, json=message)
-        if response.status_code != 200:
-            print(f"Slack notification failed: {response.status_code}, {response.text}")
-    except Exception as e:
-        print(f"Error notifying Slack: {e}")
+    notifier.notify(_unanswered_message(query))
+
+async def anotify_slack(query: str):
+    """Async variant of notify_slack; only queues the message"""
+    notifier.notify(_unanswered_message(query))
 
 def notify_unresolved_count(count: int):
-    if not SLACK_WEBHOOK_URL:
-        print("No Slack webhook URL configured.")
-        return
-    message = {
-        "text": f"Current unresolved queries count: {count}. Please review these questions in the knowledge base."
-    }
-    try:
-        response = requests.post(SLACK_WEBHOOK_URL, json=message)
-        if response.status_code != 200:
-            print(f"Slack unresolved count notification failed: {response.status_code}, {response.text}")
-    except Exception as e:
-        print(f"Error notifying Slack: {e}")
+    notifier.notify(f"Current unresolved queries count: {count}. Please review these questions in the knowledge base.")
@@ -1,107 +1,376 @@
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
+"""
+Slack ingestion: stores the messages of routed Slack channels in memory.
+
+Messages posted while the bot was offline are caught up on at start, or
+with the backfill command:
+
+    python src/slack_handler.py [channel ...] [--quiet]
+"""
 import os
-from dotenv import load_dotenv
-from memory import update_global_memory
+import json
+import time
+import asyncio
+import argparse
 import logging
-import sys
-
-# Set up logging with more detail
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout
-)
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from namespaces import get_namespace, load_router
+from slack_fallback import escalated_queries
+
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Log environment variables (excluding sensitive values)
 slack_bot_token = os.environ.get("SLACK_BOT_TOKEN")
 slack_app_token = os.environ.get("SLACK_APP_TOKEN")
 slack_channel_id = os.environ.get("SLACK_CHANNEL_ID")
+# Web API base URL; the benchmarks point it at a local fake
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
 
-logger.info(f"Slack Channel ID configured: {slack_channel_id}")
-logger.info(f"Slack Bot Token present: {'Yes' if slack_bot_token else 'No'}")
-logger.info(f"Slack App Token present: {'Yes' if slack_app_token else 'No'}")
+# Slack channels whose messages are stored, and the memory namespace of each
+router = load_router(fallback_slack_channel_id=slack_channel_id)
 
-# Initialize the Slack app with your bot token
-app = App(token=slack_bot_token)
+# Messages stored in one memory write at most
+INGEST_BATCH_SIZE = int(os.getenv("SLACK_INGEST_BATCH_SIZE", "100"))
+# Messages stored in one memory write at most when catching up on history
+BACKFILL_BATCH_SIZE = int(os.getenv("SLACK_BACKFILL_BATCH_SIZE", "1000"))
+# Messages per conversations.history page; Slack recommends at most 200
+HISTORY_PAGE_SIZE = int(os.getenv("SLACK_HISTORY_PAGE_SIZE", "200"))
+# Seconds between catch-up retries for channels whose backfill failed
+BACKFILL_RETRY_SECONDS = float(os.getenv("SLACK_BACKFILL_RETRY_SECONDS", "60"))
+# Retries of a rate limited (429) Web API call, honouring Retry-After
+SLACK_API_MAX_RETRIES = int(os.getenv("SLACK_API_MAX_RETRIES", "5"))
+# Newest stored message of each channel, where the next catch-up starts
+SLACK_CURSOR_FILE = os.getenv("SLACK_CURSOR_FILE", "slack_cursor.json")
 
-@app.middleware
-def log_request(logger, body, next):
-    logger.debug(f"Incoming Slack event: {body}")
-    return next()
+def _web_client(token: Optional[str]):
+    from slack_sdk.http_retry.builtin_async_handlers import AsyncRateLimitErrorRetryHandler
+    from slack_sdk.web.async_client import AsyncWebClient
 
-# Listen to all messages
-@app.message("")
-def handle_all_messages(message, say, logger):
-    try:
-        logger.debug(f"Received message: {message}")
-        
-        # Ignore bot messages
-        if message.get("bot_id") or message.get("subtype") == "bot_message":
-            logger.debug("Ignoring bot message")
+    client = AsyncWebClient(token=token, base_url=SLACK_API_URL)
+    client.retry_handlers.append(AsyncRateLimitErrorRetryHandler(max_retry_count=SLACK_API_MAX_RETRIES))
+    return client
+
+def _ingestible_text(message: dict) -> str:
+    """Text of a message worth storing, "" for bot messages and empty ones"""
+    if message.get("bot_id") or message.get("subtype") == "bot_message":
+        return ""
+    return message.get("text", "")
+
+class HistoryCursor:
+    """
+    Timestamp (`ts`) of the newest stored message of each Slack channel, in a
+    JSON file replaced atomically. It only moves forward, so the live
+    listener and a backfill run can both advance it.
+    """
+
+    def __init__(self, path: str = SLACK_CURSOR_FILE):
+        self.path = path
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, channel_id: str) -> Optional[str]:
+        return self._read().get(channel_id)
+
+    def advance(self, newest: Dict[str, str]):
+        """Move each channel in `newest` to its ts, unless its cursor is already past it"""
+        cursors = self._read()
+        changed = False
+        for channel_id, ts in newest.items():
+            if channel_id not in cursors or Decimal(ts) > Decimal(cursors[channel_id]):
+                cursors[channel_id] = ts
+                changed = True
+        if not changed:
             return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cursors, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
 
-        channel_id = message.get("channel")
-        text = message.get("text", "")
-        user = message.get("user")
-        
-        logger.info(f"Processing message from {user} in {channel_id}: {text[:50]}...")
-        
-        if channel_id == slack_channel_id and text:
-            logger.info("Updating memory with message")
-            update_global_memory(text)
-            say(f"✅ Message stored: {text[:50]}...")
-            logger.info("Memory updated and confirmation sent")
-        else:
-            logger.warning(f"Message ignored. Expected channel: {slack_channel_id}, Got: {channel_id}")
-            
-    except Exception as e:
-        logger.exception("Error processing message")
-        say("Error processing message. Please try again.")
+class SlackIngestor:
+    """
+    Slack listener running on the bot's event loop.
 
-# Listen to mentions
-@app.event("app_mention")
-def handle_mentions(body, say, logger):
-    try:
-        event = body["event"]
-        channel_id = event.get("channel")
-        text = event.get("text", "")
-        logger.info(f"Bot mentioned in {channel_id}: {text}")
-        say("I'm here! I'll store any messages sent in this channel.")
-    except Exception as e:
-        logger.exception("Error handling mention")
+    Bolt's AsyncApp receives events over an async Socket Mode connection and
+    only puts (channel, namespace, ts, text, say) on an in-process queue. One
+    consumer task drains the queue, writes each namespace's messages to
+    memory in a single batch from a worker thread and then sends one
+    confirmation per channel. `start` is idempotent, so a Discord reconnect
+    firing `on_ready` again does not open a second connection.
 
-def start_slack_handler():
-    """Start the Slack event listener"""
-    try:
-        logger.info("Initializing Slack handler...")
-        if not slack_bot_token or not slack_app_token:
-            raise ValueError("Missing required Slack tokens")
-            
-        # Test the tokens before starting
-        app.client.auth_test()
-        logger.info("Auth test successful")
-
-        # Test channel access
+    Messages posted while the bot was offline are caught up on by `backfill`,
+    which the consumer runs once before draining the queue, so history is
+    stored before what arrived live. Until a channel's backfill succeeded,
+    live messages from it are stored but do not move its cursor, which would
+    skip the messages posted while the bot was offline; the consumer retries
+    the backfill of such channels every `backfill_retry` seconds.
+    """
+
+    def __init__(self, bot_token: Optional[str], app_token: Optional[str], router, batch_size: int = INGEST_BATCH_SIZE,
+                 cursor: Optional[HistoryCursor] = None, backfill_batch_size: int = BACKFILL_BATCH_SIZE,
+                 page_size: int = HISTORY_PAGE_SIZE, backfill_retry: float = BACKFILL_RETRY_SECONDS):
+        self.bot_token = bot_token
+        self.app_token = app_token
+        self.router = router
+        self.batch_size = batch_size
+        self.cursor = cursor or HistoryCursor()
+        self.backfill_batch_size = backfill_batch_size
+        self.page_size = page_size
+        self.backfill_retry = backfill_retry
+        self.stored = 0
+        self.backfilled = 0
+        self.history_pages = 0
+        self.app = None
+        self._handler = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        # Channels backfilled since start; only their cursor follows live messages
+        self._caught_up = set()
+
+    def _build_app(self):
+        from slack_bolt.async_app import AsyncApp
+
+        app = AsyncApp(token=self.bot_token, client=_web_client(self.bot_token))
+
+        # Listen to all messages
+        @app.message("")
+        async def handle_all_messages(message, say):
+            # "" for bot messages, which are not stored
+            text = _ingestible_text(message)
+            channel_id = message.get("channel")
+            namespace = self.router.slack_namespace(channel_id)
+            if namespace is None or not text:
+                logger.debug(f"Message ignored. Channel {channel_id} is not routed to a namespace")
+                return
+            self._queue.put_nowait((channel_id, namespace, message.get("ts"), text, say))
+            thread_ts = message.get("thread_ts")
+            if thread_ts and thread_ts != message.get("ts"):
+                await self._answer_reply(channel_id, namespace, thread_ts, text)
+
+        # Listen to mentions
+        @app.event("app_mention")
+        async def handle_mentions(body, say):
+            logger.info(f"Bot mentioned in {body['event'].get('channel')}")
+            await say("I'm here! I'll store any messages sent in this channel.")
+
+        return app
+
+    async def start(self):
+        """Connect to Slack and start the memory consumer; later calls do nothing"""
+        async with self._start_lock:
+            if self._handler is not None:
+                return
+            if not self.bot_token or not self.app_token:
+                raise ValueError("Missing required Slack tokens")
+            from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+
+            self.app = self._build_app()
+            # Test the tokens and channel access before starting
+            await self.app.client.auth_test()
+            logger.info("Auth test successful")
+            for channel_id in self.router.slack_channels:
+                try:
+                    result = await self.app.client.conversations_info(channel=channel_id)
+                    logger.info(f"Successfully connected to channel: {result['channel']['name']}")
+                except Exception as e:
+                    logger.error(f"Cannot access channel {channel_id}: {e}")
+                    raise
+
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+            self._handler = AsyncSocketModeHandler(self.app, self.app_token)
+            await self._handler.connect_async()
+            logger.info("Slack handler started successfully")
+            # Catch up only once connected, so nothing posted in between is missed
+            if self._consumer is None:
+                self._consumer = asyncio.create_task(self._consume())
+
+    async def _catch_up(self):
+        """Backfill the routed channels not caught up on yet"""
+        pending = [channel_id for channel_id in self.router.slack_channels if channel_id not in self._caught_up]
+        if not pending:
+            return
+        try:
+            await self.backfill(self.app.client, pending)
+        except Exception:
+            logger.exception(f"Error catching up on Slack history, retrying in {self.backfill_retry:.0f}s")
+
+    async def _consume(self):
+        await self._catch_up()
+        retry_at = time.monotonic() + self.backfill_retry
+        while True:
+            if self._caught_up.issuperset(self.router.slack_channels):
+                batch = [await self._queue.get()]
+            else:
+                # A quiet channel must not hold up the retry, so wait for messages with a timeout
+                try:
+                    batch = [await asyncio.wait_for(self._queue.get(), max(0.0, retry_at - time.monotonic()))]
+                except asyncio.TimeoutError:
+                    batch = []
+            if time.monotonic() >= retry_at:
+                await self._catch_up()
+                retry_at = time.monotonic() + self.backfill_retry
+            if not batch:
+                continue
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._store(batch)
+            except Exception:
+                logger.exception("Error storing Slack messages")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _store(self, batch: List[Tuple[str, str, Optional[str], str, Callable]]):
+        by_namespace, by_channel, newest = {}, {}, {}
+        for channel_id, namespace, ts, text, say in batch:
+            by_namespace.setdefault(namespace, []).append(text)
+            by_channel.setdefault(channel_id, (say, []))[1].append(text)
+            # The cursor stays before the offline gap until backfill covers it
+            if channel_id not in self._caught_up:
+                continue
+            if ts and (channel_id not in newest or Decimal(ts) > Decimal(newest[channel_id])):
+                newest[channel_id] = ts
+        for namespace, texts in by_namespace.items():
+            added = await asyncio.to_thread(get_namespace(namespace).memory_store.extend, texts)
+            self.stored += added
+            logger.info(f"Stored {added} new Slack message(s) in {namespace} memory")
+        await asyncio.to_thread(self.cursor.advance, newest)
+        # One confirmation per channel and batch instead of one per message
+        for say, texts in by_channel.values():
+            try:
+                if len(texts) == 1:
+                    await say(f"✅ Message stored: {texts[0][:50]}...")
+                else:
+                    await say(f"✅ {len(texts)} messages stored")
+            except Exception as e:
+                logger.error(f"Failed to confirm stored messages: {e}")
+
+    async def _answer_reply(self, channel_id: str, namespace: str, thread_ts: str, text: str):
+        """A teammate's thread reply to a single escalation answers the escalated question"""
         try:
-            result = app.client.conversations_info(channel=slack_channel_id)
-            logger.info(f"Successfully connected to channel: {result['channel']['name']}")
+            replies = await self.app.client.conversations_replies(channel=channel_id, ts=thread_ts, limit=1)
         except Exception as e:
-            logger.error(f"Cannot access channel {slack_channel_id}: {e}")
-            raise
-        
-        handler = SocketModeHandler(
-            app=app,
-            app_token=slack_app_token
-        )
-        
-        logger.info("Starting Slack handler...")
-        handler.start()
-        logger.info("Slack handler started successfully")
-        
+            logger.error(f"Failed to read thread {thread_ts} in {channel_id}: {e}")
+            return
+        parent = (replies.get("messages") or [{}])[0]
+        if _ingestible_text(parent):
+            # Started by a person, not by an escalation
+            return
+        queries = escalated_queries(parent.get("text", ""))
+        if len(queries) != 1:
+            return
+        from crew import learn_slack_answer
+
+        learned = await asyncio.to_thread(learn_slack_answer, queries[0], text, namespace)
+        logger.info(f"Teammate answered escalated question {queries[0]!r}" + (", learned as FAQ" if learned else ""))
+
+    async def _history(self, client, channel_id: str, limit: int) -> Tuple[List[str], Optional[str]]:
+        """
+        Texts of the messages posted in a channel since its cursor, newest
+        first, paging conversations.history until `limit` distinct texts were
+        found or the history is exhausted; also returns the newest `ts` seen
+        """
+        texts, seen, newest, page = [], set(), None, None
+        oldest = self.cursor.get(channel_id)
+        while True:
+            response = await client.conversations_history(channel=channel_id, oldest=oldest, cursor=page,
+                                                          limit=self.page_size)
+            self.history_pages += 1
+            for message in response.get("messages", []):
+                ts = message.get("ts")
+                if ts and (newest is None or Decimal(ts) > Decimal(newest)):
+                    newest = ts
+                text = _ingestible_text(message)
+                if text and text not in seen:
+                    seen.add(text)
+                    texts.append(text)
+            page = (response.get("response_metadata") or {}).get("next_cursor")
+            if not response.get("has_more") or not page or len(texts) >= limit:
+                return texts[:limit], newest
+
+    async def backfill(self, client, channels: Optional[Iterable[str]] = None, announce: bool = True) -> Dict[str, int]:
+        """
+        Store the messages posted in routed Slack channels since their cursor;
+        returns how many were new per channel.
+
+        conversations.history pages run newest first, and memory keeps only
+        the newest `max_messages` of a namespace, so paging stops once that
+        many were found: anything older would be evicted right away. They are
+        written oldest first, `backfill_batch_size` per memory write, and the
+        cursor moves past them once all are stored. A rerun after a crash
+        fetches the same messages again, which memory deduplicates. With
+        `announce`, each channel that had new messages gets one summary.
+        Needs the channels:history scope.
+        """
+        stored = {}
+        for channel_id in channels or list(self.router.slack_channels):
+            namespace = self.router.slack_namespace(channel_id)
+            if namespace is None:
+                logger.warning(f"Slack channel {channel_id} is not routed to a namespace, not backfilled")
+                continue
+            memory_store = get_namespace(namespace).memory_store
+            texts, newest = await self._history(client, channel_id, memory_store.max_messages)
+            texts.reverse()
+            added = 0
+            for start in range(0, len(texts), self.backfill_batch_size):
+                added += await asyncio.to_thread(memory_store.extend, texts[start:start + self.backfill_batch_size])
+            if newest is not None:
+                await asyncio.to_thread(self.cursor.advance, {channel_id: newest})
+            self._caught_up.add(channel_id)
+            stored[channel_id] = added
+            self.backfilled += added
+            logger.info(f"Backfilled {added} new Slack message(s) from {channel_id} into {namespace} memory")
+            if announce and added:
+                try:
+                    await client.chat_postMessage(channel=channel_id,
+                                                  text=f"✅ Caught up: {added} message(s) posted while I was offline stored")
+                except Exception as e:
+                    logger.error(f"Failed to post backfill summary: {e}")
+        return stored
+
+    async def stop(self):
+        """Store what is still queued, then disconnect"""
+        if self._handler is None:
+            return
+        await self._handler.close_async()
+        await self._queue.join()
+        self._consumer.cancel()
+        self._handler = self._consumer = None
+
+ingestor = SlackIngestor(slack_bot_token, slack_app_token, router)
+
+async def backfill_history(channels: Optional[Iterable[str]] = None, announce: bool = True) -> Dict[str, int]:
+    """Catch up on Slack history over the Web API alone, without a Socket Mode connection"""
+    if not slack_bot_token:
+        raise ValueError("Missing SLACK_BOT_TOKEN")
+    return await ingestor.backfill(_web_client(slack_bot_token), channels, announce)
+
+async def start_slack_handler():
+    """Start the Slack event listener on the running event loop"""
+    logger.info("Initializing Slack handler...")
+    try:
+        await ingestor.start()
     except Exception as e:
         logger.exception(f"Failed to start Slack handler: {e}")
-        raise 
\ No newline at end of file
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Store Slack messages posted since the last stored one")
+    parser.add_argument("channels", nargs="*", help="channel ids, every routed Slack channel by default")
+    parser.add_argument("--quiet", action="store_true", help="do not post a summary in the channels")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    stored = asyncio.run(backfill_history(args.channels or None, announce=not args.quiet))
+    print(f"Stored {sum(stored.values())} new message(s) from {len(stored)} channel(s)")
+
+if __name__ == "__main__":
+    main()
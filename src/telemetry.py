@@ -0,0 +1,453 @@
+import os
+import json
+import time
+import bisect
+import asyncio
+import functools
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# Local Prometheus endpoint; 0 disables it
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+# Optional JSONL file with one line per answered question
+TRACE_LOG = os.getenv("TRACE_LOG", "")
+# Questions kept for the latency and cost percentiles
+QUANTILE_WINDOW = int(os.getenv("METRICS_QUANTILE_WINDOW", "2048"))
+
+# Dollars per 1K (prompt, completion) tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4.1-mini": (0.0004, 0.0016),
+    "gpt-4.1": (0.002, 0.008),
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+def price_of(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Dollar cost of one call; dated model names fall back to their base name"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        base = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+        prices = MODEL_PRICES.get(base, (0.0, 0.0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000.0
+
+def quantile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Span:
+    """One pipeline stage of a question: wall time plus the LLM usage recorded inside it"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.models: List[str] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "seconds": round(self.seconds, 6),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": self.cost,
+            "models": self.models,
+        }
+
+class Trace:
+    """Everything recorded while answering one question"""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.started = time.time()
+        self.seconds = 0.0
+        self.spans: List[Span] = []
+        self.cache: Optional[str] = None
+        self.confidence: Optional[str] = None
+
+    @property
+    def cost(self) -> float:
+        return sum(span.cost for span in self.spans)
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": self.started,
+            "query": self.query,
+            "seconds": round(self.seconds, 6),
+            "cache": self.cache,
+            "confidence": self.confidence,
+            "cost": self.cost,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+class Telemetry:
+    """
+    Collects per-stage spans and per-question traces and keeps the counters
+    behind the Prometheus endpoint.
+
+    `question` opens a trace for one question and `span` times a stage inside
+    it; both travel through context variables, so worker threads started with
+    asyncio.to_thread and tasks created inside them report into the same
+    trace. LLM token usage arrives through `callback`, attached to every chat
+    model, and is charged to the innermost open span.
+    """
+
+    def __init__(self, trace_log: str = TRACE_LOG, window: int = QUANTILE_WINDOW):
+        self.stage_seconds: Dict[str, Histogram] = {}
+        self.question_seconds = Histogram()
+        self.tokens: Dict[Tuple[str, str, str], int] = {}
+        self.llm_calls: Dict[Tuple[str, str], int] = {}
+        self.cost: Dict[Tuple[str, str], float] = {}
+        self.llm_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self.cache_lookups: Dict[str, int] = {}
+        self.faq_lookups: Dict[str, int] = {}
+        self.answers: Dict[str, int] = {}
+        self.grades: Dict[str, int] = {}
+        self.deadline_misses: Dict[str, int] = {}
+        self.degraded: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.startup: Dict[str, float] = {}
+        self._recent_seconds: Deque[float] = deque(maxlen=window)
+        self._recent_cost: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._trace_log = trace_log
+        self._trace_file = None
+        self.callback = _UsageCallback(self)
+
+    @contextmanager
+    def question(self, query: str):
+        """Trace one question from arrival to reply"""
+        trace = Trace(query)
+        token = _trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            trace.seconds = time.perf_counter() - start
+            try:
+                _trace.reset(token)
+            except ValueError:
+                pass
+            self._finish(trace)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time one stage; LLM calls made inside it are charged to it"""
+        span = Span(stage)
+        token = _span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - start
+            try:
+                _span.reset(token)
+            except ValueError:
+                # An abandoned stream closed from another context
+                pass
+            with self._lock:
+                self.stage_seconds.setdefault(stage, Histogram()).observe(span.seconds)
+            trace = _trace.get()
+            if trace is not None:
+                trace.spans.append(span)
+
+    def timed(self, stage: str):
+        """Decorator running a function, sync or async, inside a span"""
+        def decorate(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(stage):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def traced(self, func):
+        """Decorator opening a question trace around a function whose first argument is the query"""
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(query, *args, **kwargs):
+                with self.question(query):
+                    return await func(query, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(query, *args, **kwargs):
+            with self.question(query):
+                return func(query, *args, **kwargs)
+        return wrapper
+
+    def record_cache(self, hit: bool):
+        result = "hit" if hit else "miss"
+        with self._lock:
+            self.cache_lookups[result] = self.cache_lookups.get(result, 0) + 1
+        trace = _trace.get()
+        if trace is not None:
+            trace.cache = result
+
+    def record_faq(self, hit: bool):
+        """Lookup in the learned FAQ store, made before the answer cache"""
+        result = "hit" if hit else "miss"
+        with self._lock:
+            self.faq_lookups[result] = self.faq_lookups.get(result, 0) + 1
+        trace = _trace.get()
+        if trace is not None and hit:
+            trace.cache = "faq"
+
+    def record_confidence(self, bucket: str):
+        """Final confidence bucket of the reply: high, medium, low, none, casual, cached or faq"""
+        trace = _trace.get()
+        if trace is not None:
+            trace.confidence = bucket
+
+    def record_grade(self, grader: str):
+        """Who settled an answer's confidence: local, llm, or unparsed (LLM reply without a number)"""
+        with self._lock:
+            self.grades[grader] = self.grades.get(grader, 0) + 1
+
+    def record_deadline_miss(self, stage: str):
+        """A stage skipped or cut off by its question's deadline; "question" when the whole question ran out"""
+        with self._lock:
+            self.deadline_misses[stage] = self.deadline_misses.get(stage, 0) + 1
+
+    def record_degraded(self, reason: str):
+        """A product answer taken from retrieval without the LLM: breaker_open, deadline or llm_error"""
+        with self._lock:
+            self.degraded[reason] = self.degraded.get(reason, 0) + 1
+
+    def record_startup(self, phase: str, seconds: float):
+        """Wall time of one startup phase of this process"""
+        with self._lock:
+            self.startup[phase] = seconds
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def record_llm(self, model: str, prompt_tokens: int, completion_tokens: int, span: Optional[Span] = None,
+                   seconds: Optional[float] = None):
+        span = span or _span.get()
+        stage = span.stage if span is not None else "other"
+        cost = price_of(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            for kind, count in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+                self.tokens[(stage, model, kind)] = self.tokens.get((stage, model, kind), 0) + count
+            self.llm_calls[(stage, model)] = self.llm_calls.get((stage, model), 0) + 1
+            self.cost[(stage, model)] = self.cost.get((stage, model), 0.0) + cost
+            if seconds is not None:
+                self.llm_seconds.setdefault((stage, model), Histogram()).observe(seconds)
+        if span is not None:
+            span.prompt_tokens += prompt_tokens
+            span.completion_tokens += completion_tokens
+            span.cost += cost
+            span.models.append(model)
+
+    def _finish(self, trace: Trace):
+        bucket = trace.confidence or "unknown"
+        with self._lock:
+            self.question_seconds.observe(trace.seconds)
+            self.answers[bucket] = self.answers.get(bucket, 0) + 1
+            self._recent_seconds.append(trace.seconds)
+            self._recent_cost.append(trace.cost)
+            if self._trace_log:
+                try:
+                    if self._trace_file is None:
+                        self._trace_file = open(self._trace_log, "a", encoding="utf-8")
+                    self._trace_file.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+                    self._trace_file.flush()
+                except OSError as e:
+                    logger.error(f"Error writing trace log: {e}")
+
+    def summary(self) -> dict:
+        """Latency percentiles and cost per answer over the recent questions, and LLM calls per stage"""
+        with self._lock:
+            seconds, costs = list(self._recent_seconds), list(self._recent_cost)
+            answers = sum(self.answers.values())
+            total_cost = sum(self.cost.values())
+            stages = {}
+            for (stage, model), calls in sorted(self.llm_calls.items()):
+                histogram = self.llm_seconds.get((stage, model))
+                stages.setdefault(stage, {})[model] = {
+                    "calls": calls,
+                    "mean_seconds": histogram.sum / histogram.count if histogram and histogram.count else None,
+                    "dollars": self.cost.get((stage, model), 0.0),
+                }
+        return {
+            "questions": answers,
+            **{f"p{int(q * 100)}_seconds": quantile(seconds, q) for q in QUANTILES},
+            "dollars_per_answer": total_cost / answers if answers else 0.0,
+            "recent_dollars_per_answer": sum(costs) / len(costs) if costs else 0.0,
+            "total_dollars": total_cost,
+            "stages": stages,
+        }
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += ["# HELP bot_stage_seconds Wall time of each answer pipeline stage",
+                      "# TYPE bot_stage_seconds histogram"]
+            for stage, histogram in sorted(self.stage_seconds.items()):
+                lines += _histogram_lines("bot_stage_seconds", histogram, f'stage="{stage}"')
+            lines += ["# HELP bot_question_seconds Wall time from question to reply",
+                      "# TYPE bot_question_seconds histogram"]
+            lines += _histogram_lines("bot_question_seconds", self.question_seconds, "")
+            seconds, costs = list(self._recent_seconds), list(self._recent_cost)
+            lines += ["# HELP bot_question_seconds_recent Reply time percentiles over recent questions",
+                      "# TYPE bot_question_seconds_recent summary"]
+            lines += [f'bot_question_seconds_recent{{quantile="{q}"}} {quantile(seconds, q)}' for q in QUANTILES]
+            lines += ["# HELP bot_question_dollars_recent LLM cost percentiles per question over recent questions",
+                      "# TYPE bot_question_dollars_recent summary"]
+            lines += [f'bot_question_dollars_recent{{quantile="{q}"}} {quantile(costs, q)}' for q in QUANTILES]
+            lines += ["# HELP bot_llm_call_seconds Latency of single LLM calls by stage and model",
+                      "# TYPE bot_llm_call_seconds histogram"]
+            for (stage, model), histogram in sorted(self.llm_seconds.items()):
+                lines += _histogram_lines("bot_llm_call_seconds", histogram, f'stage="{stage}",model="{model}"')
+            lines += ["# HELP bot_llm_tokens_total LLM tokens by stage, model and kind",
+                      "# TYPE bot_llm_tokens_total counter"]
+            lines += [f'bot_llm_tokens_total{{stage="{stage}",model="{model}",kind="{kind}"}} {count}'
+                      for (stage, model, kind), count in sorted(self.tokens.items())]
+            lines += ["# HELP bot_llm_calls_total LLM calls by stage and model", "# TYPE bot_llm_calls_total counter"]
+            lines += [f'bot_llm_calls_total{{stage="{stage}",model="{model}"}} {count}'
+                      for (stage, model), count in sorted(self.llm_calls.items())]
+            lines += ["# HELP bot_llm_cost_dollars_total Estimated LLM spend by stage and model",
+                      "# TYPE bot_llm_cost_dollars_total counter"]
+            lines += [f'bot_llm_cost_dollars_total{{stage="{stage}",model="{model}"}} {cost:.8f}'
+                      for (stage, model), cost in sorted(self.cost.items())]
+            lines += ["# HELP bot_cache_lookups_total Answer cache lookups", "# TYPE bot_cache_lookups_total counter"]
+            lines += [f'bot_cache_lookups_total{{result="{result}"}} {count}'
+                      for result, count in sorted(self.cache_lookups.items())]
+            lines += ["# HELP bot_faq_lookups_total Learned FAQ store lookups", "# TYPE bot_faq_lookups_total counter"]
+            lines += [f'bot_faq_lookups_total{{result="{result}"}} {count}'
+                      for result, count in sorted(self.faq_lookups.items())]
+            lines += ["# HELP bot_answers_total Questions answered by final confidence bucket",
+                      "# TYPE bot_answers_total counter"]
+            lines += [f'bot_answers_total{{confidence="{bucket}"}} {count}'
+                      for bucket, count in sorted(self.answers.items())]
+            lines += ["# HELP bot_grades_total Answer confidences by who settled them",
+                      "# TYPE bot_grades_total counter"]
+            lines += [f'bot_grades_total{{grader="{grader}"}} {count}' for grader, count in sorted(self.grades.items())]
+            lines += ["# HELP bot_deadline_misses_total Stages skipped or cut off by the question deadline",
+                      "# TYPE bot_deadline_misses_total counter"]
+            lines += [f'bot_deadline_misses_total{{stage="{stage}"}} {count}'
+                      for stage, count in sorted(self.deadline_misses.items())]
+            lines += ["# HELP bot_degraded_answers_total Answers taken from retrieval without the LLM, by reason",
+                      "# TYPE bot_degraded_answers_total counter"]
+            lines += [f'bot_degraded_answers_total{{reason="{reason}"}} {count}'
+                      for reason, count in sorted(self.degraded.items())]
+            lines += ["# HELP bot_startup_seconds Wall time of each startup phase of this process",
+                      "# TYPE bot_startup_seconds gauge"]
+            lines += [f'bot_startup_seconds{{phase="{phase}"}} {seconds}' for phase, seconds in self.startup.items()]
+            for name, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        """Serve /metrics (Prometheus) and /summary (JSON) on the running event loop"""
+        from aiohttp import web
+
+        async def metrics(request):
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+        async def summary(request):
+            return web.json_response(self.summary())
+
+        app = web.Application()
+        app.router.add_get("/metrics", metrics)
+        app.router.add_get("/summary", summary)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+        return runner
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str) -> List[str]:
+    prefix = labels + "," if labels else ""
+    lines, cumulative = [], 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
+
+class _UsageCallback(BaseCallbackHandler):
+    """
+    Reads token usage and latency off every finished chat model call. The
+    span is taken when the call starts, since a streamed call may finish in
+    another task.
+    """
+
+    # Run in the caller's context so the usage lands in the caller's span
+    run_inline = True
+
+    def __init__(self, telemetry: Telemetry):
+        self.telemetry = telemetry
+        self._spans: Dict[object, Tuple[Optional[Span], float]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._spans[run_id] = (_span.get(), time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._spans[run_id] = (_span.get(), time.perf_counter())
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._spans.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        span, start = self._spans.pop(run_id, (None, None))
+        seconds = time.perf_counter() - start if start is not None else None
+        llm_output = response.llm_output or {}
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    model = (message.response_metadata or {}).get("model_name") or llm_output.get("model_name", "unknown")
+                    self.telemetry.record_llm(model, usage.get("input_tokens", 0), usage.get("output_tokens", 0), span, seconds)
+                    return
+        token_usage = llm_output.get("token_usage")
+        if token_usage:
+            self.telemetry.record_llm(llm_output.get("model_name", "unknown"),
+                                      token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0), span, seconds)
+
+telemetry = Telemetry()
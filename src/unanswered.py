@@ -1,43 +1,193 @@
 import os
 import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional
 
+from normalize import normalize_query
+from namespaces import DEFAULT_NAMESPACE
+
+# Legacy queue file, imported once into the database
 UNANSWERED_FILE = "unanswered.json"
+UNANSWERED_DB = "unanswered.db"
 
-def load_unanswered():
-    try:
-        with open(UNANSWERED_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    first_asked REAL NOT NULL,
+    last_asked REAL NOT NULL,
+    ask_count INTEGER NOT NULL DEFAULT 1,
+    answer TEXT,
+    resolved_at REAL,
+    namespace TEXT NOT NULL DEFAULT 'default'
+);
+CREATE INDEX IF NOT EXISTS questions_by_status ON questions (status, first_asked);
+CREATE TABLE IF NOT EXISTS askers (
+    key TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    asked_at REAL NOT NULL,
+    PRIMARY KEY (key, user_id)
+) WITHOUT ROWID;
+"""
 
-def save_unanswered(queue):
-    with open(UNANSWERED_FILE, "w") as f:
-        json.dump(queue, f)
+def queue_key(query: str, namespace: str = DEFAULT_NAMESPACE) -> str:
+    """Dedup key for a question, so "gm" and "GM " are one entry within a namespace"""
+    key = normalize_query(query) or query.strip().lower()
+    return key if namespace == DEFAULT_NAMESPACE else f"{namespace}:{key}"
 
-def add_unanswered(query: str, user_id: str):
-    queue = load_unanswered()
-    # Use query text as key; store user id and query.
-    if query not in queue:
-        queue[query] = {"user_id": user_id, "query": query}
-    save_unanswered(queue)
+class UnansweredQueue:
+    """
+    Unanswered questions in a SQLite database in WAL mode.
 
-def remove_answered(query: str):
-    queue = load_unanswered()
-    if query in queue:
-        del queue[query]
-        save_unanswered(queue)
+    Questions are keyed on their normalized text and carry timestamps, an
+    ask count and the ids of everyone who asked. Every change is a single
+    transaction on primary-key or status indexes, so concurrent writers
+    (threads or processes, such as bot shards) never see a half-written
+    queue. Questions belong to the namespace of the channel they came from.
+    """
+
+    def __init__(self, path: str = UNANSWERED_DB, legacy_path: str = UNANSWERED_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._import_legacy(legacy_path)
+
+    def _migrate(self):
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(questions)")}
+        if "namespace" not in columns:
+            self._conn.execute("ALTER TABLE questions ADD COLUMN namespace TEXT NOT NULL DEFAULT 'default'")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS questions_by_namespace ON questions (namespace, status, first_asked)")
+
+    def _import_legacy(self, legacy_path: str):
+        if not os.path.exists(legacy_path):
+            return
+        if self._conn.execute("SELECT 1 FROM questions LIMIT 1").fetchone():
+            return
+        with open(legacy_path, "r") as f:
+            queue = json.load(f)
+        for query, info in queue.items():
+            self.add(info.get("query", query), info.get("user_id", ""))
+
+    def add(self, query: str, user_id: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        """Queue a question or count another ask of it; returns True if it was not pending yet"""
+        key, now = queue_key(query, namespace), time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT status FROM questions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                """INSERT INTO questions (key, query, first_asked, last_asked, namespace) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                       ask_count = ask_count + 1,
+                       last_asked = excluded.last_asked,
+                       status = 'pending',
+                       answer = NULL,
+                       resolved_at = NULL""",
+                (key, query, now, now, namespace),
+            )
+            if user_id:
+                self._conn.execute("INSERT OR IGNORE INTO askers (key, user_id, asked_at) VALUES (?, ?, ?)",
+                                   (key, user_id, now))
+            return row is None or row["status"] != "pending"
+
+    def resolve(self, query: str, answer: Optional[str] = None, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        """Mark a pending question as answered; returns False if it was not pending"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE questions SET status = 'resolved', answer = ?, resolved_at = ? WHERE key = ? AND status = 'pending'",
+                (answer, time.time(), queue_key(query, namespace)),
+            )
+            return cursor.rowcount > 0
+
+    def pending(self, namespace: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Pending questions, oldest first, keyed by the text they were first
+        asked with; only those of `namespace` unless it is None, in which
+        case questions outside the default namespace get a "<namespace>:" prefix
+        """
+        where, params = "q.status = 'pending'", ()
+        if namespace is not None:
+            where, params = "q.namespace = ? AND q.status = 'pending'", (namespace,)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT q.key, q.query, q.first_asked, q.last_asked, q.ask_count, q.namespace,
+                           (SELECT group_concat(user_id) FROM
+                               (SELECT user_id FROM askers a WHERE a.key = q.key ORDER BY asked_at)) AS user_ids
+                    FROM questions q WHERE {where} ORDER BY q.first_asked""",
+                params,
+            ).fetchall()
+        queue = {}
+        for row in rows:
+            user_ids = row["user_ids"].split(",") if row["user_ids"] else []
+            query = row["query"]
+            if namespace is None and row["namespace"] != DEFAULT_NAMESPACE:
+                # Keep same-text questions of different namespaces apart
+                query = f"{row['namespace']}:{query}"
+            queue[query] = {
+                "user_id": user_ids[0] if user_ids else "",
+                "user_ids": user_ids,
+                "query": row["query"],
+                "ask_count": row["ask_count"],
+                "first_asked": row["first_asked"],
+                "last_asked": row["last_asked"],
+                "namespace": row["namespace"],
+            }
+        return queue
+
+    def pending_count(self, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            if namespace is None:
+                return self._conn.execute("SELECT count(*) FROM questions WHERE status = 'pending'").fetchone()[0]
+            return self._conn.execute("SELECT count(*) FROM questions WHERE namespace = ? AND status = 'pending'",
+                                      (namespace,)).fetchone()[0]
+
+_unanswered_queue = None
+_unanswered_queue_lock = threading.Lock()
+
+def get_unanswered_queue() -> UnansweredQueue:
+    """The question queue, opened on first use so importing this module touches no file"""
+    global _unanswered_queue
+    if _unanswered_queue is None:
+        with _unanswered_queue_lock:
+            if _unanswered_queue is None:
+                _unanswered_queue = UnansweredQueue()
+    return _unanswered_queue
+
+def load_unanswered(namespace: Optional[str] = None):
+    return get_unanswered_queue().pending(namespace)
+
+def add_unanswered(query: str, user_id: str, namespace: str = DEFAULT_NAMESPACE):
+    get_unanswered_queue().add(query, user_id, namespace)
+
+def remove_answered(query: str, answer: Optional[str] = None, namespace: str = DEFAULT_NAMESPACE):
+    get_unanswered_queue().resolve(query, answer, namespace)
+
+# Confidence a reprocessed answer needs to resolve its question, as for a first-time answer posted without a note
+REPROCESS_RESOLVE_CONFIDENCE = 0.8
 
 def reprocess_unanswered():
-    # Reprocess all unanswered queries.
+    """
+    Answer every pending question again with the full pipeline; confident
+    answers resolve their question and are learned as FAQ answers. Returns
+    the questions still unresolved.
+    """
     queue = load_unanswered()
     unresolved = {}
     from crew import simulate_agent_answer, update_faq_memory
-    for query, info in queue.items():
-        answer = simulate_agent_answer(query)
-        if answer:
-            update_faq_memory(query, answer)
-            # Remove answered query.
-            remove_answered(query)
+    for key, info in queue.items():
+        query, namespace = info["query"], info["namespace"]
+        answer, confidence = simulate_agent_answer(query, namespace)
+        if answer and confidence >= REPROCESS_RESOLVE_CONFIDENCE:
+            update_faq_memory(query, answer, namespace, source="reprocess", confidence=confidence)
+            remove_answered(query, answer, namespace)
         else:
-            unresolved[query] = info
+            unresolved[key] = info
     return unresolved